@@ -0,0 +1,188 @@
+import threading
+
+import numpy as np
+from database import order_collection, menu_collection, table_collection, parse_dishes
+
+def to_datetimes(values):
+    # Строки вида "YYYY-MM-DD HH:MM:SS" -> datetime64[s]; битые значения становятся NaT
+    try:
+        return np.array(values, dtype="datetime64[s]")
+    except ValueError:
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(np.datetime64(value, "s"))
+            except ValueError:
+                parsed.append(np.datetime64("NaT", "s"))
+        return np.array(parsed, dtype="datetime64[s]")
+
+def categorical(values):
+    # Коды категорий и их подписи: labels[codes] == values
+    labels, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+    return codes, labels
+
+# Категориальные столбцы: коды и подписи (name + "_labels")
+CATEGORICAL = ("waiter", "table", "dish", "category")
+# Поля, из которых строятся столбцы: изменения остальных полей их не трогают
+ORDER_FIELDS = ("orderDate", "waiterLogin", "tableId", "dishes")
+MENU_FIELDS = ("name", "category")
+TABLE_FIELDS = ("tableNumber",)
+
+class SalesAnalytics:
+    # Строки оплаченных заказов в столбцах NumPy. Оплаченный заказ дописывается
+    # в столбцы, другие изменения нужных полей заказов, меню или столов сбрасывают
+    # их, и они лениво пересобираются; все группировки считаются векторно через bincount
+    def __init__(self, orders, menu, tables, statuses=("paid",)):
+        self.orders = orders
+        self.menu = menu
+        self.tables = tables
+        self.statuses = statuses
+        self.columns = None
+        # Номер изменения: load() в потоке отчёта сохраняет столбцы, только если
+        # за время сборки не было сброса или дописывания из потока записи
+        self.version = 0
+        self.lock = threading.Lock()
+        orders.subscribe(self.on_order)
+        menu.subscribe(self.watch(MENU_FIELDS))
+        tables.subscribe(self.watch(TABLE_FIELDS))
+
+    def invalidate(self, op=None, old=None, new=None):
+        with self.lock:
+            self.version += 1
+            self.columns = None
+
+    def watch(self, fields):
+        def on_change(op, old, new):
+            if op == "update" and all(old.get(field) == new.get(field) for field in fields):
+                return
+            self.invalidate()
+        return on_change
+
+    def selected(self, order):
+        return order is not None and order.get("status") in self.statuses
+
+    def on_order(self, op, old, new):
+        before, after = self.selected(old), self.selected(new)
+        if op == "load" or before:
+            # Заказ из отчёта изменился или удалён — пересобираем, если поменялось то, что в столбцах
+            if op != "load" and after and all(old.get(field) == new.get(field) for field in ORDER_FIELDS):
+                return
+            self.invalidate()
+        elif after:
+            self.append(new)
+
+    def collect(self, orders, categories, table_numbers):
+        # Списки значений по строкам блюд заказов
+        values = {name: [] for name in ("date", "quantity", "price") + CATEGORICAL}
+        for order in orders:
+            table = table_numbers.get(order.get("tableId"), "")
+            for line in parse_dishes(order.get("dishes", [])):
+                values["date"].append(order.get("orderDate", ""))
+                values["waiter"].append(order.get("waiterLogin", ""))
+                values["table"].append(table)
+                values["dish"].append(line["name"])
+                values["category"].append(categories.get(line["name"], ""))
+                values["quantity"].append(line["quantity"])
+                values["price"].append(line["price"])
+        return values
+
+    def load(self):
+        categories = {item["name"]: item.get("category", "") for item in self.menu.find()}
+        table_numbers = {table["id"]: str(table["tableNumber"]) for table in self.tables.find()}
+        values = self.collect(self.orders.find({"status": {"$in": list(self.statuses)}}), categories, table_numbers)
+
+        quantity = np.array(values["quantity"], dtype=np.int64)
+        columns = {
+            "date": to_datetimes(values["date"]),
+            "quantity": quantity,
+            "revenue": quantity * np.array(values["price"], dtype=np.float64)
+        }
+        for name in CATEGORICAL:
+            columns[name], columns[name + "_labels"] = categorical(values[name])
+        return columns
+
+    def extend(self, columns, order):
+        # Новые столбцы со строками заказа или None, если в заказе есть подпись
+        # (официант, стол, блюдо, категория), которой ещё нет, — тогда пересборка
+        categories = {}
+        for line in parse_dishes(order.get("dishes", [])):
+            item = self.menu.find_one({"name": line["name"]})
+            categories[line["name"]] = item.get("category", "") if item else ""
+        table = self.tables.find_one({"id": order.get("tableId")}) if order.get("tableId") else None
+        values = self.collect([order], categories, {table["id"]: str(table["tableNumber"])} if table else {})
+        if not values["quantity"]:
+            return columns
+
+        extended = {}
+        for name in CATEGORICAL:
+            labels = columns[name + "_labels"]
+            added = np.array(values[name], dtype=str)
+            codes = np.searchsorted(labels, added)
+            if not len(labels) or (codes >= len(labels)).any() or (labels[np.minimum(codes, len(labels) - 1)] != added).any():
+                return None
+            extended[name] = np.concatenate([columns[name], codes])
+            extended[name + "_labels"] = labels
+        quantity = np.array(values["quantity"], dtype=np.int64)
+        extended["date"] = np.concatenate([columns["date"], to_datetimes(values["date"])])
+        extended["quantity"] = np.concatenate([columns["quantity"], quantity])
+        extended["revenue"] = np.concatenate([columns["revenue"], quantity * np.array(values["price"], dtype=np.float64)])
+        return extended
+
+    def append(self, order):
+        # Меню и столы читаются без self.lock: их подписчики сами его берут
+        columns = self.columns
+        extended = self.extend(columns, order) if columns is not None else None
+        with self.lock:
+            self.version += 1
+            # Если пока дописывали, столбцы сбросили или заменили, результат не годится
+            self.columns = extended if self.columns is columns else None
+
+    def data(self, start=None, end=None):
+        # Столбцы за период [start, end); start и end — строки "YYYY-MM-DD" или None
+        columns = self.columns
+        if columns is None:
+            version = self.version
+            columns = self.load()
+            with self.lock:
+                if self.version == version:
+                    self.columns = columns
+        mask = ~np.isnat(columns["date"])
+        if start:
+            mask &= columns["date"] >= np.datetime64(start, "s")
+        if end:
+            mask &= columns["date"] < np.datetime64(end, "s")
+        selected = {name: values[mask] if not name.endswith("_labels") else values
+                    for name, values in columns.items()}
+        return selected
+
+    @staticmethod
+    def group(codes, labels, revenue, quantity):
+        revenue_sum = np.bincount(codes, weights=revenue, minlength=len(labels))
+        quantity_sum = np.bincount(codes, weights=quantity, minlength=len(labels)).astype(np.int64)
+        order = np.argsort(-revenue_sum, kind="stable")
+        return [(str(labels[i]), float(revenue_sum[i]), int(quantity_sum[i]))
+                for i in order if quantity_sum[i]]
+
+    def revenue_by(self, key, start=None, end=None):
+        # key: "waiter", "table", "dish" или "category"; результат отсортирован по выручке
+        columns = self.data(start, end)
+        return self.group(columns[key], columns[key + "_labels"], columns["revenue"], columns["quantity"])
+
+    def revenue_by_day(self, start=None, end=None):
+        columns = self.data(start, end)
+        days = columns["date"].astype("datetime64[D]")
+        labels, codes = np.unique(days, return_inverse=True)
+        revenue_sum = np.bincount(codes, weights=columns["revenue"], minlength=len(labels))
+        quantity_sum = np.bincount(codes, weights=columns["quantity"], minlength=len(labels)).astype(np.int64)
+        return [(str(labels[i]), float(revenue_sum[i]), int(quantity_sum[i])) for i in range(len(labels))]
+
+    def revenue_by_hour(self, start=None, end=None):
+        columns = self.data(start, end)
+        dates = columns["date"]
+        hours = ((dates - dates.astype("datetime64[D]")) // np.timedelta64(1, "h")).astype(np.int64)
+        revenue_sum = np.bincount(hours, weights=columns["revenue"], minlength=24)
+        quantity_sum = np.bincount(hours, weights=columns["quantity"], minlength=24).astype(np.int64)
+        return [(f"{hour:02d}:00", float(revenue_sum[hour]), int(quantity_sum[hour]))
+                for hour in range(24) if quantity_sum[hour]]
+
+sales = SalesAnalytics(order_collection, menu_collection, table_collection)
@@ -0,0 +1,229 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import database
+from database import write_file
+from datagen import ORDER_HEADERS, Generator
+
+SIZES = (1000, 10000, 100000, 1000000)
+# Замер быстрой операции повторяется, пока не наберётся столько секунд
+MIN_TIME = 0.05
+# Во сколько раз медленнее базового замера считается регрессией
+THRESHOLD = 1.25
+
+def measure(fn, repeat=5, budget=5.0, setup=None):
+    # Медиана и минимум времени одного вызова. Быстрые операции гоняем пачками,
+    # медленные — по одному разу, пока не кончится budget секунд
+    def run(number):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    number = 1
+    timings = []
+    while True:
+        if setup is not None:
+            setup()
+        elapsed = run(number)
+        if setup is not None or elapsed >= MIN_TIME or number >= 100000:
+            break
+        number *= 10
+    timings.append(elapsed / number)
+    while len(timings) < repeat and time.perf_counter() - started < budget:
+        if setup is not None:
+            setup()
+        timings.append(run(number) / number)
+    return {"seconds": statistics.median(timings), "min": min(timings), "runs": len(timings), "number": number}
+
+def storage_benchmarks(rows, workdir, repeat, budget):
+    # Заказы — самая большая коллекция, на них и меряем операции хранилища
+    generator = Generator(seed=1, days=365, orders_per_day=rows / 250)
+    filename = database.COLLECTIONS["order_collection"][0]
+    write_file(os.path.join(workdir, filename), ORDER_HEADERS, itertools.islice(generator.orders(), rows))
+    orders = database.open_collection("order_collection", data_dir=workdir)
+    rng = random.Random(1)
+    ids = [str(rng.randint(1, rows)) for _ in range(1000)]
+    tables = [table["id"] for table in generator.tables]
+    waiters = [waiter["login"] for waiter in generator.waiters[1:]]
+
+    def pick(values):
+        return values[rng.randrange(len(values))]
+
+    extra = [{"customerId": "1", "tableId": "1", "orderDate": "2000-01-01 00:00:00", "dishes": [],
+              "total": 0, "itemCount": 0, "status": "cancelled", "waiterLogin": "bench"} for _ in range(100)]
+
+    def add_extra():
+        # Строки для delete_many добавляем в обход save(), чтобы мерить только удаление
+        for document in extra:
+            document = dict(document)
+            orders.data.append(document)
+            orders.index_item(document)
+
+    cases = [
+        ("load", orders.load, None),
+        ("save", orders.save, None),
+        ("find_one.id", lambda: orders.find_one({"id": pick(ids)}), None),
+        ("find.id", lambda: orders.find({"id": pick(ids)}), None),
+        ("find_one.field", lambda: orders.find_one({"tableId": pick(tables)}), None),
+        ("find.field", lambda: orders.find({"tableId": pick(tables)}), None),
+        ("find.indexed_field", lambda: orders.find({"waiterLogin": pick(waiters)}), None),
+        ("insert_one", lambda: orders.insert_one(dict(extra[0])), None),
+        ("delete_many", lambda: orders.delete_many({"waiterLogin": "bench"}), add_extra),
+        ("aggregate", lambda: orders.aggregate([
+            {"$match": {"status": "paid"}},
+            {"$group": {"_id": "$waiterLogin"}},
+            {"$sort": {"count": -1}}
+        ]), None)
+    ]
+    results = []
+    for name, fn, setup in cases:
+        result = measure(fn, repeat, budget, setup)
+        results.append({"name": f"storage.{name}", "rows": rows, **result})
+        report(results[-1])
+    os.remove(os.path.join(workdir, filename))
+    return results
+
+def tab_benchmarks(data_dir, repeat, budget):
+    # Выполняется в отдельном процессе: вкладки читают коллекции и read-model
+    # при импорте main, а каталог данных у каждого размера свой
+    database.DATA_DIR = data_dir
+    database.SERVER_URL = None
+    started = time.perf_counter()
+    from main import TablesTab, ReservationsTab, OrdersTab, ReceiptsTab, StatsTab, sales
+    # Импорт main загружает коллекции и строит read-model — это запуск окна без отрисовки
+    startup = time.perf_counter() - started
+    results = [{"name": "tabs.startup", "seconds": startup, "min": startup, "runs": 1, "number": 1}]
+
+    today = date.today()
+    cases = [
+        ("TablesTab.load_tables", lambda: TablesTab.query_tables()),
+        ("ReservationsTab.load_tables", lambda: ReservationsTab.query_free_tables(
+            today, datetime.strptime("18:00", "%H:%M").time(), datetime.strptime("20:00", "%H:%M").time())),
+        ("OrdersTab.load_orders", lambda: OrdersTab.query_orders({}, 0)),
+        ("OrdersTab.load_orders.open", lambda: OrdersTab.query_orders({"status": {"$nin": ["cancelled", "paid"]}}, 0)),
+        ("ReceiptsTab.load_receipts", lambda: ReceiptsTab.query_receipts({}, 0))
+    ]
+    for text, key, title in StatsTab.REPORTS:
+        if key is not None and sales is None and not key.startswith(("dishes:", "latency:")):
+            continue
+        cases.append((f"StatsTab.load_stats.{key or 'waiters'}",
+                      lambda report=(key, title): StatsTab.query_stats(report, None, None)))
+    for name, fn in cases:
+        results.append({"name": f"tabs.{name}", **measure(fn, repeat, budget)})
+    return results
+
+def run_tabs(rows, workdir, repeat, budget):
+    data_dir = os.path.join(workdir, "tabs")
+    generator = Generator(seed=1, days=365, orders_per_day=rows / 365,
+                          reservations_per_day=max(1, rows / 365 / 8), customers=max(100, min(rows // 10, 20000)))
+    counts = generator.write(data_dir)
+    env = {key: value for key, value in os.environ.items() if key != "RESTAURANT_SERVER"}
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", data_dir,
+         "--repeat", str(repeat), "--budget", str(budget)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    shutil.rmtree(data_dir)
+    results = []
+    for result in json.loads(output):
+        results.append({"name": result.pop("name"), "rows": rows, "orders": counts["orders"], **result})
+        report(results[-1])
+    return results
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} с"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} мс"
+    return f"{seconds * 1e6:.1f} мкс"
+
+def report(result):
+    print(f"{result['name']:<45} {result['rows']:>8} {format_seconds(result['seconds']):>12}", file=sys.stderr)
+
+def compare(results, baseline, threshold):
+    # Сравнивает медианы с базовым прогоном; возвращает список регрессий
+    previous = {(result["name"], result["rows"]): result["seconds"] for result in baseline["results"]}
+    regressions = []
+    print(f"\n{'Замер':<45} {'Строк':>8} {'Было':>12} {'Стало':>12} {'Изм.':>8}", file=sys.stderr)
+    for result in results:
+        before = previous.get((result["name"], result["rows"]))
+        if not before:
+            continue
+        ratio = result["seconds"] / before
+        mark = ""
+        if ratio > threshold:
+            mark = "  медленнее"
+            regressions.append((result["name"], result["rows"], ratio))
+        elif ratio < 1 / threshold:
+            mark = "  быстрее"
+        print(f"{result['name']:<45} {result['rows']:>8} {format_seconds(before):>12} "
+              f"{format_seconds(result['seconds']):>12} {(ratio - 1) * 100:>+7.0f}%{mark}", file=sys.stderr)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры операций хранилища и загрузки вкладок на наборах разного размера")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES),
+                        help="размеры наборов через запятую (по умолчанию %(default)s)")
+    parser.add_argument("--only", choices=("storage", "tabs"), help="только одна группа замеров")
+    parser.add_argument("--repeat", type=int, default=5, help="сколько повторов на замер")
+    parser.add_argument("--budget", type=float, default=5.0, help="не дольше стольких секунд на замер")
+    parser.add_argument("--output", "-o", help="файл для результатов JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="во сколько раз медленнее считать регрессией (по умолчанию %(default)s)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        json.dump(tab_benchmarks(args.worker, args.repeat, args.budget), sys.stdout)
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = []
+    workdir = tempfile.mkdtemp(prefix="restaurant_bench_")
+    try:
+        for rows in sizes:
+            if args.only != "tabs":
+                results += storage_benchmarks(rows, workdir, args.repeat, args.budget)
+            if args.only != "storage":
+                results += run_tabs(rows, workdir, args.repeat, args.budget)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    document = {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=1)
+    else:
+        json.dump(document, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"Регрессий: {len(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1046 @@
+import os
+import sys
+import threading
+import time
+import ast
+import functools
+import heapq
+from collections import deque
+from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+
+DATA_DIR = "restaurant_data"
+# Адрес сервера данных (server.py). Если задан, коллекции — реплики в памяти, а запись идёт на сервер
+SERVER_URL = os.environ.get("RESTAURANT_SERVER")
+# Замер операций хранилища и лог медленных запросов (profiling.py); порог — RESTAURANT_SLOW_MS
+PROFILE = os.environ.get("RESTAURANT_PROFILE")
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+def is_null(value):
+    return value is None or value == ""
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def compare(value, arg):
+    # Числа сравниваем как числа, остальное — как строки (даты и время хранятся в ISO-виде)
+    if is_number(arg):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return (value > arg) - (value < arg)
+    value, arg = str(value), str(arg)
+    return (value > arg) - (value < arg)
+
+def match_condition(item, key, condition):
+    if not (isinstance(condition, dict) and any(op.startswith("$") for op in condition)):
+        return key in item and str(item[key]) == str(condition)
+
+    value = item.get(key)
+    for op, arg in condition.items():
+        if op == "$ne":
+            if arg is None:
+                if is_null(value):
+                    return False
+            elif key in item and str(value) == str(arg):
+                return False
+        elif op == "$in":
+            if key not in item or str(value) not in {str(a) for a in arg}:
+                return False
+        elif op == "$nin":
+            if key in item and str(value) in {str(a) for a in arg}:
+                return False
+        elif op == "$exists":
+            if (key in item and not is_null(value)) != bool(arg):
+                return False
+        elif op in RANGE_OPERATORS:
+            if is_null(value):
+                return False
+            result = compare(value, arg)
+            if result is None:
+                return False
+            if op == "$gt" and not result > 0:
+                return False
+            if op == "$gte" and not result >= 0:
+                return False
+            if op == "$lt" and not result < 0:
+                return False
+            if op == "$lte" and not result <= 0:
+                return False
+        else:
+            raise ValueError(f"Неизвестный оператор запроса: {op}")
+    return True
+
+def matches(item, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(item, sub) for sub in condition):
+                return False
+        elif not match_condition(item, key, condition):
+            return False
+    return True
+
+def sort_key(value):
+    if is_null(value):
+        return (0, 0, "")
+    if is_number(value):
+        return (1, value, "")
+    return (2, 0, str(value))
+
+def row_order(item):
+    # Строки с равным ключом сортировки идут по id: так порядок одинаков при обходе
+    # упорядоченного индекса, выборке страницы через кучу и полной сортировке,
+    # и соседние страницы не повторяют и не теряют строки
+    row_id = item.get("id")
+    if isinstance(row_id, str) and row_id.isdigit():
+        row_id = int(row_id)
+    return sort_key(row_id)
+
+def sort_rows(rows, sort, limit=None):
+    if limit is not None and len(sort) == 1:
+        # Нужна только страница: nlargest/nsmallest дают тот же порядок, что sort()[:n]
+        key, direction = next(iter(sort.items()))
+        top = heapq.nlargest if direction == -1 else heapq.nsmallest
+        return top(limit, rows, key=lambda x: (sort_key(x.get(key)), row_order(x)))
+    rows = sorted(rows, key=row_order, reverse=next(iter(sort.values())) == -1)
+    for key, direction in reversed(list(sort.items())):
+        rows.sort(key=lambda x: sort_key(x.get(key)), reverse=direction == -1)
+    return rows
+
+class Param:
+    # Место для значения в подготовленном запросе: {"tableId": Param("table_id")}
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"Param({self.name!r})"
+
+def has_params(condition):
+    if isinstance(condition, Param):
+        return True
+    if isinstance(condition, dict):
+        return any(has_params(value) for value in condition.values())
+    if isinstance(condition, (list, tuple)):
+        return any(has_params(value) for value in condition)
+    return False
+
+def bind_params(condition, params):
+    if isinstance(condition, Param):
+        return params[condition.name]
+    if isinstance(condition, dict):
+        return {key: bind_params(value, params) for key, value in condition.items()}
+    if isinstance(condition, (list, tuple)):
+        return [bind_params(value, params) for value in condition]
+    return condition
+
+RANGE_TESTS = {
+    "$gt": lambda result: result > 0,
+    "$gte": lambda result: result >= 0,
+    "$lt": lambda result: result < 0,
+    "$lte": lambda result: result <= 0
+}
+
+def compile_condition(key, condition):
+    # Условие по полю -> функция item -> bool, по смыслу как match_condition,
+    # но операторы разобраны и аргументы приведены к строкам один раз
+    if key == "$or":
+        return lambda item: any(matches(item, sub) for sub in condition)
+    if not (isinstance(condition, dict) and any(op.startswith("$") for op in condition)):
+        expected = str(condition)
+        return lambda item: key in item and str(item[key]) == expected
+
+    checks = []
+    for op, arg in condition.items():
+        if op == "$ne":
+            if arg is None:
+                checks.append(lambda item: not is_null(item.get(key)))
+            else:
+                checks.append(lambda item, excluded=str(arg): not (key in item and str(item[key]) == excluded))
+        elif op == "$in":
+            checks.append(lambda item, allowed={str(a) for a in arg}: key in item and str(item[key]) in allowed)
+        elif op == "$nin":
+            checks.append(lambda item, excluded={str(a) for a in arg}: not (key in item and str(item[key]) in excluded))
+        elif op == "$exists":
+            checks.append(lambda item, expected=bool(arg): (key in item and not is_null(item[key])) == expected)
+        elif op in RANGE_OPERATORS:
+            def check(item, arg=arg, test=RANGE_TESTS[op]):
+                value = item.get(key)
+                if is_null(value):
+                    return False
+                result = compare(value, arg)
+                return result is not None and test(result)
+            checks.append(check)
+        else:
+            raise ValueError(f"Неизвестный оператор запроса: {op}")
+    if len(checks) == 1:
+        return checks[0]
+    return lambda item: all(check(item) for check in checks)
+
+def read_headers(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.readline().strip().split('|')
+
+def parse_row(item):
+    if 'isAdmin' in item:
+        item['isAdmin'] = item['isAdmin'] == 'True'
+    if 'isAvailable' in item:
+        item['isAvailable'] = item['isAvailable'] == 'True'
+    if 'paid' in item:
+        item['paid'] = item['paid'] == 'True'
+    if 'price' in item:
+        try:
+            item['price'] = float(item['price'])
+        except ValueError:
+            item['price'] = 0
+    if 'dishes' in item and isinstance(item['dishes'], str):
+        try:
+            item['dishes'] = ast.literal_eval(item['dishes'])
+        except (ValueError, SyntaxError):
+            item['dishes'] = []
+    for field in ('amount', 'total', 'revenue'):
+        if field in item:
+            try:
+                item[field] = float(item[field])
+            except ValueError:
+                item[field] = ''
+    for field in ('itemCount', 'receiptsClosed'):
+        if field in item:
+            try:
+                item[field] = int(item[field])
+            except ValueError:
+                item[field] = ''
+    # Заказы, сохранённые до появления total, досчитываем один раз при загрузке
+    if 'dishes' in item and is_null(item.get('total')):
+        item['total'], item['itemCount'] = dishes_summary(item['dishes'])
+    return item
+
+# Разделитель полей, перевод строки и сама обратная косая черта внутри значения
+# пишутся как \|, \n, \r и \\, чтобы строка файла не рассыпалась на лишние поля
+ESCAPES = {'\\': '\\\\', '|': '\\|', '\n': '\\n', '\r': '\\r'}
+UNESCAPES = {'\\': '\\', '|': '|', 'n': '\n', 'r': '\r'}
+
+def escape_value(value):
+    text = str(value)
+    if '\\' in text or '|' in text or '\n' in text or '\r' in text:
+        text = ''.join(ESCAPES.get(char, char) for char in text)
+    return text
+
+def split_line(line):
+    if '\\' not in line:
+        return line.split('|')
+    values, current = [], []
+    chars = iter(line)
+    for char in chars:
+        if char == '\\':
+            following = next(chars, '')
+            # Неизвестная последовательность — обычный текст (файлы до экранирования)
+            current.append(UNESCAPES.get(following, '\\' + following))
+        elif char == '|':
+            values.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    values.append(''.join(current))
+    return values
+
+def iter_rows(path, skipped=None):
+    # Построчное чтение файла коллекции: в памяти только текущая строка.
+    # Номера строк, в которых не то число полей, добавляются в skipped
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        headers = f.readline().strip().split('|')
+        for number, line in enumerate(f, 2):
+            values = split_line(line.strip())
+            if len(values) == len(headers):
+                yield parse_row(dict(zip(headers, values)))
+            elif skipped is not None and line.strip():
+                skipped.append(number)
+
+def write_file(path, headers, rows):
+    # rows может быть генератором: строки пишутся по одной
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('|'.join(headers) + '\n')
+        for item in rows:
+            f.write('|'.join(escape_value(item.get(header, '')) for header in headers) + '\n')
+
+class RWLock:
+    # Много читателей или один писатель. Повторное чтение в потоке, который уже
+    # читает или пишет, не ждёт, поэтому вложенные вызовы (find_one внутри
+    # update_one, чтение из подписчика) не зависают. Ждущий писатель не пускает
+    # новых читателей, а после записи сначала входят читатели, которые уже ждали, —
+    # так не голодают ни те, ни другие
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.condition = threading.Condition(self.mutex)
+        self.readers = 0
+        self.waiting_readers = 0
+        self.readers_turn = False
+        self.writer = None
+        self.writer_depth = 0
+        self.waiting_writers = 0
+        self.local = threading.local()
+
+    # Без конкуренции чтение стоит одного захвата mutex на входе и выходе:
+    # find_one по индексу сам занимает единицы микросекунд
+    def acquire_read(self):
+        local = self.local
+        depth = getattr(local, "depth", 0)
+        if not depth:
+            # Писатель читает свою коллекцию без очереди, такое чтение не считаем
+            local.counted = self.writer != threading.get_ident()
+            if local.counted:
+                with self.mutex:
+                    if self.writer is not None or (self.waiting_writers and not self.readers_turn):
+                        self.waiting_readers += 1
+                        while self.writer is not None or (self.waiting_writers and not self.readers_turn):
+                            self.condition.wait()
+                        self.waiting_readers -= 1
+                        if not self.waiting_readers:
+                            self.readers_turn = False
+                    self.readers += 1
+        local.depth = depth + 1
+
+    def release_read(self):
+        local = self.local
+        local.depth -= 1
+        if not local.depth and local.counted:
+            with self.mutex:
+                self.readers -= 1
+                if not self.readers and self.waiting_writers:
+                    self.condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self.writer == me:
+            self.writer_depth += 1
+            return
+        if getattr(self.local, "depth", 0) and self.local.counted:
+            raise RuntimeError("Нельзя писать в коллекцию, удерживая блокировку чтения")
+        with self.mutex:
+            self.waiting_writers += 1
+            while self.writer is not None or self.readers or self.readers_turn:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = me
+            self.writer_depth = 1
+
+    def release_write(self):
+        self.writer_depth -= 1
+        if not self.writer_depth:
+            with self.mutex:
+                self.writer = None
+                self.readers_turn = self.waiting_readers > 0
+                self.condition.notify_all()
+
+def reading(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_read()
+    return wrapper
+
+def writing(method):
+    # Изменения, накопленные под блокировкой, рассылаются подписчикам после её
+    # снятия во внешнем вызове: подписчик, читающий другую коллекцию, не держит
+    # при этом блокировку своей, и встречные записи двух коллекций не зависают
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_write()
+            if self.lock.writer != threading.get_ident():
+                self.deliver()
+    return wrapper
+
+class TextFileDatabase:
+    # Строки не меняются на месте: обновление заменяет строку новым словарём,
+    # а data и индексы меняются только под блокировкой записи. Поэтому список
+    # из find() — согласованный снимок, даже если параллельно идёт запись.
+    # Подписчики получают изменения после снятия блокировки, в порядке изменений
+    # Функция, которой передаётся запись файла (например, пул потоков). None — писать сразу
+    flush_executor = None
+    # True у реплик удалённых коллекций: производные записи делает сервер
+    replica = False
+    # Замер операций (profiling.OperationStats) или None
+    profiler = None
+    # Сколько строк файла не удалось разобрать при последней загрузке
+    skipped = 0
+
+    def __init__(self, filename, data_dir=None):
+        data_dir = data_dir or DATA_DIR
+        os.makedirs(data_dir, exist_ok=True)
+        self.filename = os.path.join(data_dir, filename)
+        self.lock = RWLock()
+        self.data = []
+        self._pending_rows = None
+        self._pending_lock = threading.Lock()
+        self.listeners = []
+        # Изменения, ещё не разосланные подписчикам, и занят ли кто-то их рассылкой
+        self.events = deque()
+        self.events_lock = threading.Lock()
+        self.delivering = False
+        # field -> {str(value): {id(item): item}}; для упорядоченных полей ещё и отсортированные ключи
+        self.indexes = {}
+        self.ordered_keys = {}
+        self.create_index("id")
+        self.load()
+
+    @writing
+    def create_index(self, field, ordered=False):
+        self.indexes[field] = {}
+        if ordered:
+            self.ordered_keys[field] = []
+        for item in self.data:
+            self.index_item(item, fields=[field])
+
+    def index_item(self, item, fields=None):
+        for field in fields or self.indexes:
+            if field not in item:
+                continue
+            key = str(item[field])
+            bucket = self.indexes[field].get(key)
+            if bucket is None:
+                bucket = self.indexes[field][key] = {}
+                if field in self.ordered_keys:
+                    insort(self.ordered_keys[field], key)
+            bucket[id(item)] = item
+
+    def unindex_item(self, item):
+        for field, index in self.indexes.items():
+            if field not in item:
+                continue
+            key = str(item[field])
+            bucket = index.get(key)
+            if bucket is None:
+                continue
+            bucket.pop(id(item), None)
+            if not bucket:
+                del index[key]
+                if field in self.ordered_keys:
+                    keys = self.ordered_keys[field]
+                    pos = bisect_left(keys, key)
+                    if pos < len(keys) and keys[pos] == key:
+                        del keys[pos]
+
+    def rebuild_indexes(self):
+        for field in self.indexes:
+            self.indexes[field] = {}
+        for field in self.ordered_keys:
+            self.ordered_keys[field] = []
+        for item in self.data:
+            self.index_item(item)
+
+    def index_lookup(self, field, condition):
+        # Возвращает кандидатов по индексу или None, если индекс здесь не помогает
+        index = self.indexes.get(field)
+        if index is None:
+            return None
+        if not isinstance(condition, dict):
+            return list(index.get(str(condition), {}).values())
+        if "$in" in condition:
+            found = {}
+            for value in condition["$in"]:
+                found.update(index.get(str(value), {}))
+            return list(found.values())
+        key_range = self.key_range(field, condition)
+        if key_range is not None:
+            keys = self.ordered_keys[field]
+            return [item for key in keys[key_range[0]:key_range[1]] for item in index[key].values()]
+        return None
+
+    def key_range(self, field, condition):
+        # Границы диапазона в отсортированных ключах поля или None, если диапазона нет
+        bounds = {op: arg for op, arg in condition.items() if op in RANGE_OPERATORS}
+        if not bounds or field not in self.ordered_keys or any(is_number(arg) for arg in bounds.values()):
+            return None
+        keys = self.ordered_keys[field]
+        lo, hi = 0, len(keys)
+        if "$gte" in bounds:
+            lo = max(lo, bisect_left(keys, str(bounds["$gte"])))
+        if "$gt" in bounds:
+            lo = max(lo, bisect_right(keys, str(bounds["$gt"])))
+        if "$lte" in bounds:
+            hi = min(hi, bisect_right(keys, str(bounds["$lte"])))
+        if "$lt" in bounds:
+            hi = min(hi, bisect_left(keys, str(bounds["$lt"])))
+        return lo, max(lo, hi)
+
+    def estimate(self, field, condition):
+        # Сколько строк даст индекс, не собирая их: размеры корзин, а для
+        # диапазона — доля ключей в нём. None — индекс не подходит
+        index = self.indexes.get(field)
+        if index is None:
+            return None
+        if not isinstance(condition, dict):
+            return len(index.get(str(condition), ()))
+        if "$in" in condition:
+            return sum(len(index.get(str(value), ())) for value in condition["$in"])
+        key_range = self.key_range(field, condition)
+        if key_range is None:
+            return None
+        keys = self.ordered_keys[field]
+        return round((key_range[1] - key_range[0]) / len(keys) * len(self.data)) if keys else 0
+
+    def candidates(self, query):
+        best = None
+        for field, condition in query.items():
+            if field == "$or":
+                continue
+            found = self.index_lookup(field, condition)
+            if found is not None and (best is None or len(found) < len(best)):
+                best = found
+        found = self.data if best is None else best
+        if TextFileDatabase.profiler is not None:
+            TextFileDatabase.profiler.scanned(len(found))
+        return found
+
+    def replace_items(self, replacements):
+        # replacements — {id(старая строка): новая строка}
+        for item in self.data:
+            new = replacements.get(id(item))
+            if new is not None:
+                self.unindex_item(item)
+                self.index_item(new)
+        self.data = [replacements.get(id(item), item) for item in self.data]
+
+    def walk_field(self, query, sort, skip, limit):
+        # Поле, по упорядоченному индексу которого страницу find() можно собрать,
+        # не сортируя всё подходящее: сортировка по одному полю по убыванию с limit.
+        # Если другое поле запроса даёт мало кандидатов, выгоднее отфильтровать их
+        if not sort or limit is None or len(sort) != 1:
+            return None
+        field, direction = next(iter(sort.items()))
+        if direction != -1 or field not in self.ordered_keys:
+            return None
+        estimates = [self.estimate(key, condition) for key, condition in query.items()
+                     if key not in ("$or", field)]
+        narrowest = min((estimate for estimate in estimates if estimate is not None), default=None)
+        if narrowest is not None and narrowest * narrowest <= (skip + limit) * len(self.data):
+            return None
+        return field
+
+    def ordered_walk(self, field, query, count):
+        # Первые count подходящих строк по убыванию field: идём по ключам индекса
+        # с конца и останавливаемся, когда набрали. Возвращает (строки, просмотрено)
+        # или None, если порядок ключей не совпадает с sort_key (не строки, пустые значения)
+        keys = self.ordered_keys[field]
+        index = self.indexes[field]
+        lo, hi = 0, len(keys)
+        key_range = self.key_range(field, query[field]) if isinstance(query.get(field), dict) else None
+        if key_range is not None:
+            lo, hi = key_range
+        results = []
+        examined = 0
+        for pos in range(hi - 1, lo - 1, -1):
+            for item in sorted(index[keys[pos]].values(), key=row_order, reverse=True):
+                value = item[field]
+                if not isinstance(value, str) or value == "":
+                    return None
+                examined += 1
+                if matches(item, query):
+                    results.append(item)
+                    if len(results) == count:
+                        return results, examined
+        if key_range is None and examined < len(self.data):
+            # Строки без поля при сортировке по убыванию идут последними
+            examined += len(self.data)
+            results += sorted((item for item in self.data if field not in item and matches(item, query)),
+                              key=row_order, reverse=True)
+        return results[:count], examined
+
+    def prepare(self, query):
+        return PreparedQuery(self, query)
+
+    def subscribe(self, callback):
+        # callback(op, old, new): op — "insert", "update", "delete" или "load"
+        self.listeners.append(callback)
+
+    def notify(self, op, old=None, new=None):
+        # Вызывается под блокировкой записи; сама рассылка — в deliver()
+        with self.events_lock:
+            self.events.append((op, old, new))
+
+    def deliver(self):
+        # Рассылает изменения по одному потоку за раз, поэтому по порядку. Если
+        # рассылкой уже занят другой поток (или этот же, выше по стеку), он
+        # разошлёт и новые изменения, а здесь ждать нечего — так ожидание одной
+        # коллекции не может замкнуться в круг через подписчиков другой
+        with self.events_lock:
+            if self.delivering:
+                return
+            self.delivering = True
+        try:
+            while True:
+                with self.events_lock:
+                    if not self.events:
+                        self.delivering = False
+                        return
+                    op, old, new = self.events.popleft()
+                for callback in self.listeners:
+                    callback(op, old, new)
+        except BaseException:
+            with self.events_lock:
+                self.delivering = False
+            raise
+    
+    @writing
+    def load(self):
+        skipped = []
+        self.data = list(iter_rows(self.filename, skipped))
+        self.skipped = len(skipped)
+        if skipped:
+            print(f"{self.filename}: пропущено строк с неверным числом полей: {len(skipped)} "
+                  f"(строки {', '.join(str(number) for number in skipped[:10])}"
+                  f"{', ...' if len(skipped) > 10 else ''})", file=sys.stderr)
+        if TextFileDatabase.profiler is not None:
+            TextFileDatabase.profiler.scanned(len(self.data))
+        self.rebuild_indexes()
+        self.notify("load")
+    
+    @reading
+    def save(self):
+        if not self.data:
+            return
+
+        # Снимок строк делаем сразу, а форматирование и запись — там, где скажет flush_executor
+        rows = [dict(item) for item in self.data]
+        if TextFileDatabase.flush_executor is None:
+            self.write_rows(rows)
+            return
+
+        with self._pending_lock:
+            scheduled = self._pending_rows is not None
+            self._pending_rows = rows
+        if not scheduled:
+            TextFileDatabase.flush_executor(self.flush_pending)
+
+    def flush_pending(self):
+        # Несколько save() подряд схлопываются в одну запись последнего снимка
+        with self._pending_lock:
+            rows, self._pending_rows = self._pending_rows, None
+        if rows is not None:
+            self.write_rows(rows)
+
+    def write_rows(self, rows):
+        # Заголовок — объединение полей всех строк, иначе поля, которых нет
+        # в первой строке (например orderIds у общего счета), теряются
+        headers = list(dict.fromkeys(key for item in rows for key in item))
+        write_file(self.filename, headers, rows)
+        if TextFileDatabase.profiler is not None:
+            TextFileDatabase.profiler.written(os.path.getsize(self.filename))
+    
+    @reading
+    def find(self, query=None, sort=None, skip=0, limit=None):
+        if query is None and sort is None and not skip and limit is None:
+            if TextFileDatabase.profiler is not None:
+                TextFileDatabase.profiler.scanned(len(self.data))
+            return self.data.copy()
+
+        query = query or {}
+        field = self.walk_field(query, sort, skip, limit)
+        if field is not None:
+            walked = self.ordered_walk(field, query, skip + limit)
+            if walked is not None:
+                if TextFileDatabase.profiler is not None:
+                    TextFileDatabase.profiler.scanned(walked[1])
+                return walked[0][skip:]
+
+        results = [item for item in self.candidates(query) if matches(item, query)]
+        if sort:
+            results = sort_rows(results, sort, None if limit is None else skip + limit)
+        if skip or limit is not None:
+            results = results[skip:skip + limit if limit is not None else None]
+        return results
+    
+    @reading
+    def find_one(self, query):
+        for item in self.candidates(query):
+            if matches(item, query):
+                return item
+        return None
+
+    @reading
+    def count(self, query=None):
+        if not query:
+            return len(self.data)
+        return sum(1 for item in self.candidates(query) if matches(item, query))
+    
+    @writing
+    def insert_one(self, document):
+        if "id" not in document:
+            max_id = max([int(item.get('id', 0)) for item in self.data] or [0])
+            document["id"] = str(max_id + 1)
+        self.data.append(document)
+        self.index_item(document)
+        self.save()
+        self.notify("insert", None, document)
+        return document
+
+    @writing
+    def insert_many(self, documents):
+        # Один save на всю пачку вместо записи файла на каждую строку
+        next_id = max([int(item.get('id', 0)) for item in self.data] or [0]) + 1
+        for document in documents:
+            if "id" not in document:
+                document["id"] = str(next_id)
+                next_id += 1
+            self.data.append(document)
+            self.index_item(document)
+        if documents:
+            self.save()
+        for document in documents:
+            self.notify("insert", None, document)
+        return documents
+
+    @staticmethod
+    def apply_update(item, update):
+        # Новая версия строки; старая остаётся нетронутой у тех, кто её уже прочитал
+        new = dict(item)
+        if "$set" in update:
+            new.update(update["$set"])
+        return new
+    
+    @writing
+    def update_one(self, query, update):
+        item = self.find_one(query)
+        if item:
+            new = self.apply_update(item, update)
+            self.replace_items({id(item): new})
+            self.save()
+            self.notify("update", item, new)
+            return new
+        return item
+
+    @writing
+    def update_many(self, query, update):
+        items = self.find(query)
+        changes = [(item, self.apply_update(item, update)) for item in items]
+        if items:
+            self.replace_items({id(old): new for old, new in changes})
+            self.save()
+        for old, new in changes:
+            self.notify("update", old, new)
+        return len(items)
+    
+    @writing
+    def delete_one(self, query):
+        item = self.find_one(query)
+        if item:
+            self.data.remove(item)
+            self.unindex_item(item)
+            self.save()
+            self.notify("delete", item, None)
+        return item
+    
+    @writing
+    def delete_many(self, query):
+        items = self.find(query)
+        doomed = {id(item) for item in items}
+        self.data = [item for item in self.data if id(item) not in doomed]
+        for item in items:
+            self.unindex_item(item)
+        if items:
+            self.save()
+        for item in items:
+            self.notify("delete", item, None)
+        return len(items)
+    
+    @reading
+    def aggregate(self, pipeline):
+        results = self.data.copy()
+        if TextFileDatabase.profiler is not None:
+            TextFileDatabase.profiler.scanned(len(results))
+        for stage in pipeline:
+            results = self.apply_stage(stage, results)
+        return results
+
+    @staticmethod
+    def apply_stage(stage, results):
+        if "$match" in stage:
+            query = stage["$match"]
+            results = [item for item in results if matches(item, query)]
+        elif "$group" in stage:
+            group = stage["$group"]
+            groups = {}
+            for item in results:
+                group_key = item.get(group["_id"].lstrip("$"))
+                if group_key not in groups:
+                    groups[group_key] = {"_id": group_key, "count": 0}
+                groups[group_key]["count"] += 1
+            results = list(groups.values())
+        elif "$sort" in stage:
+            sort = stage["$sort"]
+            key = list(sort.keys())[0]
+            reverse = sort[key] == -1
+            results.sort(key=lambda x: x.get(key, 0), reverse=reverse)
+        return results
+
+    @reading
+    def explain(self, query=None, sort=None, skip=0, limit=None):
+        # Как выполняется find() с этими аргументами: какие индексы подходят и какой
+        # выбран, сколько строк ожидалось и сколько просмотрено, время этапов в мс.
+        # Вместо запроса можно передать конвейер aggregate (список этапов)
+        if isinstance(query, list):
+            return self.explain_aggregate(query)
+        query = query or {}
+        stages = []
+
+        def stage(name, rows_in, rows_out, started, **extra):
+            stages.append({"stage": name, "rowsIn": rows_in, "rowsOut": rows_out,
+                           "ms": round((time.perf_counter() - started) * 1000, 3), **extra})
+
+        started = time.perf_counter()
+        field = self.walk_field(query, sort, skip, limit)
+        walked = self.ordered_walk(field, query, skip + limit) if field is not None else None
+        if walked is not None:
+            rows, examined = walked
+            stage("ordered", len(self.data), len(rows), started, field=field, by=sort)
+            return {
+                "collection": os.path.basename(self.filename),
+                "rows": len(self.data),
+                "plan": "ordered",
+                "index": field,
+                "indexes": [],
+                "estimated": skip + limit,
+                "examined": examined,
+                "matched": len(rows),
+                "returned": len(rows[skip:]),
+                "stages": stages,
+                "ms": round((time.perf_counter() - started) * 1000, 3)
+            }
+
+        indexes = []
+        best = best_field = None
+        for field, condition in query.items():
+            if field == "$or":
+                indexes.append({"field": field, "index": None, "estimated": None, "candidates": None})
+                continue
+            kind = ("ordered" if field in self.ordered_keys else "hash") if field in self.indexes else None
+            estimated = self.estimate(field, condition)
+            found = self.index_lookup(field, condition)
+            indexes.append({"field": field, "index": kind, "estimated": estimated,
+                            "candidates": None if found is None else len(found)})
+            if found is not None and (best is None or len(found) < len(best)):
+                best, best_field = found, field
+        candidates = self.data if best is None else best
+        stage("index" if best_field else "scan", len(self.data), len(candidates), started, field=best_field)
+
+        step = time.perf_counter()
+        results = [item for item in candidates if matches(item, query)]
+        stage("filter", len(candidates), len(results), step)
+        matched = len(results)
+        if sort:
+            step = time.perf_counter()
+            rows_in = len(results)
+            results = sort_rows(results, sort, None if limit is None else skip + limit)
+            stage("sort", rows_in, len(results), step, by=sort)
+        if skip or limit is not None:
+            step = time.perf_counter()
+            rows_in = len(results)
+            results = results[skip:skip + limit if limit is not None else None]
+            stage("skip/limit", rows_in, len(results), step)
+
+        return {
+            "collection": os.path.basename(self.filename),
+            "rows": len(self.data),
+            "plan": "index" if best_field else "scan",
+            "index": best_field,
+            "indexes": indexes,
+            "estimated": self.estimate(best_field, query[best_field]) if best_field else len(self.data),
+            "examined": len(candidates),
+            "matched": matched,
+            "returned": len(results),
+            "stages": stages,
+            "ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    @reading
+    def explain_aggregate(self, pipeline):
+        # aggregate не пользуется индексами: конвейер всегда начинается с полного просмотра
+        started = time.perf_counter()
+        results = self.data.copy()
+        stages = [{"stage": "scan", "rowsIn": len(self.data), "rowsOut": len(results),
+                   "ms": round((time.perf_counter() - started) * 1000, 3)}]
+        for stage in pipeline:
+            step = time.perf_counter()
+            rows_in = len(results)
+            results = self.apply_stage(stage, results)
+            stages.append({"stage": next(iter(stage), ""), "rowsIn": rows_in, "rowsOut": len(results),
+                           "ms": round((time.perf_counter() - step) * 1000, 3)})
+        return {
+            "collection": os.path.basename(self.filename),
+            "rows": len(self.data),
+            "plan": "scan",
+            "index": None,
+            "estimated": len(self.data),
+            "examined": len(self.data),
+            "returned": len(results),
+            "stages": stages,
+            "ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+class PreparedQuery:
+    # Запрос с параметрами, разобранный один раз: условия без Param скомпилированы
+    # сразу, с Param — при каждом выполнении. Индекс тоже выбирается при выполнении:
+    # это лишь сравнение размеров индексов, а данные после prepare могут вырасти
+    def __init__(self, collection, query):
+        self.collection = collection
+        self.query = query
+        self.static = []
+        self.dynamic = []
+        # Имя параметра -> поле, с которым он сравнивается на равенство
+        self.param_fields = {}
+        for key, condition in query.items():
+            if has_params(condition):
+                self.dynamic.append(key)
+                if isinstance(condition, Param):
+                    self.param_fields[condition.name] = key
+            else:
+                self.static.append((key, compile_condition(key, condition)))
+
+    @property
+    def lock(self):
+        return self.collection.lock
+
+    def choose_index(self, exclude=None):
+        # Равенство или $in по полю с большим числом различных ключей (меньше корзины),
+        # диапазон по упорядоченному индексу — если равенств нет
+        best, best_score = None, -1
+        for key, condition in self.query.items():
+            if key == exclude or key not in self.collection.indexes:
+                continue
+            if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+                if "$in" in condition:
+                    score = len(self.collection.indexes[key])
+                elif key in self.collection.ordered_keys and any(op in RANGE_OPERATORS for op in condition):
+                    score = 0
+                else:
+                    continue
+            else:
+                score = len(self.collection.indexes[key])
+            if score > best_score:
+                best, best_score = key, score
+        return best
+
+    def checks(self, params, exclude=None):
+        checks = [check for key, check in self.static if key != exclude]
+        for key in self.dynamic:
+            if key != exclude:
+                checks.append(compile_condition(key, bind_params(self.query[key], params)))
+        return checks
+
+    def candidates(self, field, params):
+        if field is not None:
+            found = self.collection.index_lookup(field, bind_params(self.query[field], params))
+            if found is not None:
+                return found
+        return self.collection.data
+
+    @reading
+    def execute(self, **params):
+        checks = self.checks(params)
+        return [item for item in self.candidates(self.choose_index(), params) if all(check(item) for check in checks)]
+
+    @reading
+    def execute_many(self, name, values, **params):
+        # Тот же запрос для каждого значения параметра name за один проход:
+        # кандидаты по индексу остальных полей раскладываются по значениям name.
+        # Возвращает {значение: [строки]}
+        field = self.param_fields.get(name)
+        if field is None:
+            raise ValueError(f"Параметр {name} должен сравниваться с полем на равенство")
+        result = {value: [] for value in values}
+        wanted = {str(value): value for value in values}
+        found = None
+        # Индекс по остальным полям, без перебираемого
+        other = self.choose_index(exclude=field)
+        if other is not None:
+            found = self.collection.index_lookup(other, bind_params(self.query[other], params))
+        if found is None:
+            found = self.collection.index_lookup(field, {"$in": list(wanted)})
+        if found is None:
+            found = self.collection.data
+        checks = self.checks(params, exclude=field)
+        for item in found:
+            key = str(item[field]) if field in item else None
+            if key in wanted and all(check(item) for check in checks):
+                result[wanted[key]].append(item)
+        return result
+
+def parse_dishes(dishes):
+    # Блюда заказа могут прийти как список или как строка из файла
+    if isinstance(dishes, str):
+        try:
+            dishes = ast.literal_eval(dishes)
+        except (ValueError, SyntaxError):
+            dishes = []
+    return dishes or []
+
+def dishes_summary(dishes):
+    # Сумма и количество позиций заказа
+    dishes = parse_dishes(dishes)
+    total = sum(item["price"] * item["quantity"] for item in dishes)
+    count = sum(item["quantity"] for item in dishes)
+    return total, count
+
+def order_total(order):
+    if not is_null(order.get("total")):
+        return order["total"]
+    return dishes_summary(order.get("dishes", []))[0]
+
+ORDER_STATUSES = ["new", "preparing", "ready", "delivered", "cancelled", "paid"]
+
+def status_change(status, when=None):
+    # $set для смены статуса заказа: сам статус и время перехода в поле <status>At
+    when = when or datetime.now()
+    return {"status": status, f"{status}At": when.strftime("%Y-%m-%d %H:%M:%S")}
+
+# Инициализация "коллекций": файл и индексы под частые запросы вкладок.
+# Коллекция загружается при первом обращении, поэтому консольные утилиты,
+# которым нужен только iter_rows, не читают все файлы при импорте
+COLLECTIONS = {
+    "waiter_collection": ("waiters.txt", []),
+    "table_collection": ("restaurantTables.txt", [("tableNumber", False)]),
+    "reservation_collection": ("reservations.txt", [("tableId", False), ("reservationDate", True)]),
+    "customer_collection": ("customers.txt", [("phone", False)]),
+    "menu_collection": ("menuItems.txt", [("name", False)]),
+    "order_collection": ("orders.txt", [("orderDate", True), ("status", False),
+                                        ("waiterLogin", False), ("customerId", False)]),
+    "receipt_collection": ("receipts.txt", [("date", True), ("paid", False),
+                                            ("waiterLogin", False), ("orderId", False)]),
+    "waiter_stats_collection": ("waiterStats.txt", [("waiter", False)]),
+}
+
+def open_collection(name, data_dir=None):
+    filename, indexes = COLLECTIONS[name]
+    if PROFILE:
+        import profiling
+        profiling.enable()
+    if SERVER_URL and data_dir is None:
+        from remote import RemoteCollection
+        collection = RemoteCollection(name, filename)
+    else:
+        collection = TextFileDatabase(filename, data_dir)
+    for field, ordered in indexes:
+        collection.create_index(field, ordered=ordered)
+    return collection
+
+_collections_lock = threading.Lock()
+
+def __getattr__(name):
+    if name not in COLLECTIONS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _collections_lock:
+        if name not in globals():
+            globals()[name] = open_collection(name)
+    return globals()[name]
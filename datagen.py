@@ -0,0 +1,275 @@
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from database import COLLECTIONS, DATA_DIR, write_file
+
+FIRST_NAMES = ["Александр", "Мария", "Иван", "Анна", "Дмитрий", "Елена", "Сергей", "Ольга",
+               "Андрей", "Наталья", "Михаил", "Татьяна", "Алексей", "Ирина", "Никита", "Светлана"]
+LAST_NAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов",
+              "Михайлов", "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев"]
+# Категория -> (блюда, диапазон цены)
+MENU = {
+    "Супы": (["Борщ", "Солянка", "Уха", "Щи", "Куриный суп", "Грибной крем-суп", "Том ям"], (250, 550)),
+    "Салаты": (["Цезарь", "Оливье", "Греческий", "Винегрет", "Салат с уткой", "Капрезе"], (300, 650)),
+    "Горячее": (["Стейк", "Котлета по-киевски", "Бефстроганов", "Лосось на гриле", "Плов",
+                 "Паста карбонара", "Пельмени", "Утиная грудка", "Ризотто с грибами"], (450, 1600)),
+    "Гарниры": (["Картофельное пюре", "Рис", "Овощи гриль", "Картофель фри", "Гречка"], (120, 280)),
+    "Десерты": (["Тирамису", "Чизкейк", "Медовик", "Наполеон", "Мороженое", "Сырники"], (220, 480)),
+    "Напитки": (["Чай", "Кофе", "Морс", "Лимонад", "Сок", "Компот", "Минеральная вода"], (90, 350)),
+}
+# Доля заказов по часам работы: пики на обед и ужин
+HOUR_WEIGHTS = {10: 2, 11: 4, 12: 9, 13: 10, 14: 7, 15: 4, 16: 3, 17: 5, 18: 8, 19: 10, 20: 9, 21: 5}
+# Понедельник .. воскресенье
+WEEKDAY_FACTORS = [0.8, 0.85, 0.9, 0.95, 1.25, 1.4, 1.1]
+# Январь .. декабрь
+MONTH_FACTORS = [0.8, 0.85, 0.9, 0.95, 1.0, 1.1, 1.15, 1.1, 1.0, 0.95, 0.95, 1.3]
+
+ORDER_HEADERS = ["customerId", "tableId", "orderDate", "dishes", "total", "itemCount", "status",
+                 "waiterLogin", "id", "preparingAt", "readyAt", "deliveredAt", "billedAt", "paidAt", "cancelledAt"]
+RECEIPT_HEADERS = ["orderId", "date", "amount", "paid", "waiterLogin", "closedBy", "paymentDate", "id"]
+
+def stamp(moment):
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+class Generator:
+    # Каждый день генерируется своим Random(seed, день), поэтому заказы и счета
+    # можно пройти дважды — для orders.txt и receipts.txt — не держа год в памяти
+    def __init__(self, seed=1, tables=30, menu=60, customers=2000, waiters=8,
+                 days=365, end=None, orders_per_day=150, reservations_per_day=20, days_ahead=14):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.table_count = tables
+        self.menu_count = menu
+        self.customer_count = customers
+        self.waiter_count = waiters
+        self.end = end or date.today()
+        self.start = self.end - timedelta(days=days - 1)
+        self.orders_per_day = orders_per_day
+        self.reservations_per_day = reservations_per_day
+        self.days_ahead = days_ahead
+        self.now = datetime.combine(self.end, datetime.min.time()).replace(hour=21)
+        self.waiters = self.make_waiters()
+        self.tables = self.make_tables()
+        self.menu = self.make_menu()
+        self.customers = self.make_customers()
+
+    def make_waiters(self):
+        waiters = [{"login": "admin", "password": "admin", "isAdmin": True, "id": "1"}]
+        for i in range(1, self.waiter_count + 1):
+            waiters.append({"login": f"waiter{i}", "password": f"waiter{i}", "isAdmin": False, "id": str(i + 1)})
+        return waiters
+
+    def make_tables(self):
+        return [{
+            "tableNumber": str(i),
+            "seats": str(self.rng.choice([2, 2, 4, 4, 4, 6, 8])),
+            "isAvailable": self.rng.random() > 0.03,
+            "status": "free",
+            "id": str(i)
+        } for i in range(1, self.table_count + 1)]
+
+    def make_menu(self):
+        items = []
+        categories = list(MENU)
+        for i in range(self.menu_count):
+            category = categories[i % len(categories)]
+            names, (low, high) = MENU[category]
+            base = names[(i // len(categories)) % len(names)]
+            round_no = i // (len(categories) * len(names))
+            items.append({
+                "name": base if round_no == 0 else f"{base} №{round_no + 1}",
+                "description": "",
+                "price": float(self.rng.randrange(low, high + 1, 10)),
+                "category": category,
+                "ingredients": "",
+                "id": str(i + 1)
+            })
+        return items
+
+    def make_customers(self):
+        phones = self.rng.sample(range(10 ** 9), self.customer_count)
+        return [{
+            "name": f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+            "phone": f"+79{phone:09d}",
+            "id": str(i + 1)
+        } for i, phone in enumerate(phones)]
+
+    def days(self):
+        day = self.start
+        while day <= self.end:
+            yield day
+            day += timedelta(days=1)
+
+    def day_rng(self, day, kind):
+        return random.Random(f"{self.seed}:{kind}:{day.isoformat()}")
+
+    def volume(self, rng, day, per_day):
+        mean = per_day * WEEKDAY_FACTORS[day.weekday()] * MONTH_FACTORS[day.month - 1]
+        return max(0, int(round(rng.gauss(mean, mean ** 0.5))))
+
+    def customer_id(self, rng):
+        # Постоянные гости приходят чаще: квадрат смещает выбор к началу списка
+        return str(int(rng.random() ** 2 * self.customer_count) + 1)
+
+    def day_orders(self, day):
+        rng = self.day_rng(day, "orders")
+        hours, weights = zip(*HOUR_WEIGHTS.items())
+        staff = self.waiters[1:] or self.waiters
+        on_shift = rng.sample(staff, max(1, len(staff) // 2))
+        orders = []
+        for _ in range(self.volume(rng, day, self.orders_per_day)):
+            ordered = datetime.combine(day, datetime.min.time()).replace(
+                hour=rng.choices(hours, weights)[0], minute=rng.randrange(60), second=rng.randrange(60))
+            dishes = [{"name": item["name"], "price": item["price"], "quantity": rng.choices([1, 2, 3], [75, 20, 5])[0]}
+                      for item in rng.sample(self.menu, min(len(self.menu), rng.choices([1, 2, 3, 4, 5], [15, 30, 30, 15, 10])[0]))]
+            order = {
+                "customerId": self.customer_id(rng),
+                "tableId": rng.choice(self.tables)["id"],
+                "orderDate": stamp(ordered),
+                "dishes": dishes,
+                "total": sum(d["price"] * d["quantity"] for d in dishes),
+                "itemCount": sum(d["quantity"] for d in dishes),
+                "waiterLogin": rng.choice(on_shift)["login"]
+            }
+            # Этапы обслуживания; что ещё не наступило к "сейчас", не записываем
+            moments = {}
+            moment = ordered
+            for field, low, high in (("preparingAt", 60, 480), ("readyAt", 480, 1500),
+                                     ("deliveredAt", 30, 300), ("billedAt", 900, 3600), ("paidAt", 60, 600)):
+                moment += timedelta(seconds=rng.randrange(low, high))
+                if moment > self.now:
+                    break
+                moments[field] = moment
+            if rng.random() < 0.03:
+                order["status"] = "cancelled"
+                order["cancelledAt"] = stamp(ordered + timedelta(seconds=rng.randrange(60, 900)))
+            else:
+                order["status"] = {0: "new", 1: "preparing", 2: "ready", 3: "delivered",
+                                   4: "delivered", 5: "paid"}[len(moments)]
+                order.update({field: stamp(value) for field, value in moments.items()})
+            orders.append(order)
+        orders.sort(key=lambda order: order["orderDate"])
+        return orders
+
+    def orders(self):
+        next_id = 1
+        for day in self.days():
+            for order in self.day_orders(day):
+                order["id"] = str(next_id)
+                next_id += 1
+                yield order
+
+    def receipts(self, stats):
+        # stats накапливает закрытые счета по официантам для waiterStats.txt
+        next_id = 1
+        for order in self.orders():
+            if "billedAt" not in order or order["status"] == "cancelled":
+                continue
+            paid = order["status"] == "paid"
+            receipt = {
+                "orderId": order["id"],
+                "date": order["billedAt"],
+                "amount": order["total"],
+                "paid": paid,
+                "waiterLogin": order["waiterLogin"],
+                "closedBy": order["waiterLogin"] if paid else "",
+                "paymentDate": order.get("paidAt", ""),
+                "id": str(next_id)
+            }
+            next_id += 1
+            if paid:
+                entry = stats.setdefault(order["waiterLogin"], [0, 0.0])
+                entry[0] += 1
+                entry[1] += order["total"]
+            yield receipt
+
+    def reservations(self):
+        next_id = 1
+        day = self.start
+        while day <= self.end + timedelta(days=self.days_ahead):
+            rng = self.day_rng(day, "reservations")
+            busy = {}
+            for _ in range(self.volume(rng, day, self.reservations_per_day)):
+                start = rng.choice([10, 11, 12, 13, 14, 17, 18, 18, 19, 19, 20]) * 60 + rng.choice([0, 30])
+                end = min(start + rng.choice([60, 90, 120, 120, 180]), 22 * 60)
+                if end - start < 60:
+                    continue
+                table = rng.choice(self.tables)
+                slots = busy.setdefault(table["id"], [])
+                if any(s < end and e > start for s, e in slots):
+                    continue
+                slots.append((start, end))
+                yield {
+                    "tableId": table["id"],
+                    "customerId": self.customer_id(rng),
+                    "reservationDate": day.strftime("%Y-%m-%d"),
+                    "startTime": f"{start // 60:02d}:{start % 60:02d}",
+                    "endTime": f"{end // 60:02d}:{end % 60:02d}",
+                    "status": "cancelled" if rng.random() < 0.08 else "confirmed",
+                    "id": str(next_id)
+                }
+                next_id += 1
+            day += timedelta(days=1)
+
+    def write(self, data_dir):
+        os.makedirs(data_dir, exist_ok=True)
+
+        def path(collection):
+            return os.path.join(data_dir, COLLECTIONS[collection][0])
+
+        counts = {}
+
+        def counted(name, rows):
+            counts[name] = 0
+            for row in rows:
+                counts[name] += 1
+                yield row
+
+        write_file(path("waiter_collection"), ["login", "password", "isAdmin", "id"], counted("waiters", self.waiters))
+        write_file(path("table_collection"), ["tableNumber", "seats", "isAvailable", "status", "id"],
+                   counted("tables", self.tables))
+        write_file(path("menu_collection"), ["name", "description", "price", "category", "ingredients", "id"],
+                   counted("menu", self.menu))
+        write_file(path("customer_collection"), ["name", "phone", "id"], counted("customers", self.customers))
+        write_file(path("reservation_collection"),
+                   ["tableId", "customerId", "reservationDate", "startTime", "endTime", "status", "id"],
+                   counted("reservations", self.reservations()))
+        write_file(path("order_collection"), ORDER_HEADERS, counted("orders", self.orders()))
+        stats = {}
+        write_file(path("receipt_collection"), RECEIPT_HEADERS, counted("receipts", self.receipts(stats)))
+        write_file(path("waiter_stats_collection"), ["waiter", "receiptsClosed", "revenue", "id"], counted("waiterStats", (
+            {"waiter": waiter, "receiptsClosed": count, "revenue": revenue, "id": str(i + 1)}
+            for i, (waiter, (count, revenue)) in enumerate(sorted(stats.items()))
+        )))
+        return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генератор правдоподобных данных ресторана для нагрузочных проверок")
+    parser.add_argument("--output", "-o", default=DATA_DIR, help=f"каталог для файлов (по умолчанию {DATA_DIR})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tables", type=int, default=30)
+    parser.add_argument("--menu", type=int, default=60)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--waiters", type=int, default=8)
+    parser.add_argument("--days", type=int, default=365, help="сколько дней истории")
+    parser.add_argument("--end", type=date.fromisoformat, help="последний день истории, YYYY-MM-DD (по умолчанию сегодня)")
+    parser.add_argument("--orders-per-day", type=float, default=150)
+    parser.add_argument("--reservations-per-day", type=float, default=20)
+    parser.add_argument("--days-ahead", type=int, default=14, help="на сколько дней вперёд есть бронирования")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    generator = Generator(
+        seed=args.seed, tables=args.tables, menu=args.menu, customers=args.customers, waiters=args.waiters,
+        days=args.days, end=args.end, orders_per_day=args.orders_per_day,
+        reservations_per_day=args.reservations_per_day, days_ahead=args.days_ahead
+    )
+    counts = generator.write(args.output)
+    summary = ", ".join(f"{name}: {count}" for name, count in counts.items())
+    print(f"Записано в {args.output} за {time.perf_counter() - started:.1f} с — {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import database
+from database import COLLECTIONS, DATA_DIR, SERVER_URL, iter_rows, read_headers
+
+# Что можно выгрузить: имя -> (коллекция, поле даты для фильтра по периоду)
+EXPORTS = {
+    "receipts": ("receipt_collection", "date"),
+    "orders": ("order_collection", "orderDate"),
+    "reservations": ("reservation_collection", "reservationDate"),
+}
+FORMATS = ("csv", "jsonl")
+# Поля, которые parse_row досчитывает у строк с dishes, — их нет в заголовке старых файлов
+COMPUTED_FIELDS = ("total", "itemCount")
+
+def loaded_collection(kind):
+    # Коллекция, уже загруженная в этом процессе (окно или реплика сервера)
+    return getattr(database, EXPORTS[kind][0])
+
+def collection_path(kind, data_dir=None):
+    return os.path.join(data_dir or DATA_DIR, COLLECTIONS[EXPORTS[kind][0]][0])
+
+def period_bounds(start=None, end=None):
+    # Период [start, end] (даты "YYYY-MM-DD", включительно) как полуинтервал [start, end + 1 день)
+    bounds = {}
+    if start:
+        bounds["$gte"] = start
+    if end:
+        bounds["$lt"] = (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+    return bounds
+
+def file_rows(kind, start=None, end=None, data_dir=None, skipped=None):
+    # Строки файла коллекции за период, по одной: в памяти только текущая строка.
+    # Номера строк, которые не удалось разобрать, добавляются в skipped
+    date_field = EXPORTS[kind][1]
+    bounds = period_bounds(start, end)
+    for row in iter_rows(collection_path(kind, data_dir), skipped):
+        day = str(row.get(date_field, ""))
+        if "$gte" in bounds and day < bounds["$gte"]:
+            continue
+        if "$lt" in bounds and day >= bounds["$lt"]:
+            continue
+        yield row
+
+def file_headers(kind, data_dir=None):
+    # Поля файла и поля, которые досчитываются при чтении (total и itemCount у старых заказов)
+    headers = read_headers(collection_path(kind, data_dir))
+    if "dishes" in headers:
+        headers += [field for field in COMPUTED_FIELDS if field not in headers]
+    return headers
+
+def collection_rows(collection, date_field, start=None, end=None):
+    # Снимок строк за период: find() берёт его под блокировкой чтения и выбирает
+    # период по упорядоченному индексу даты
+    bounds = period_bounds(start, end)
+    return collection.find({date_field: bounds} if bounds else None)
+
+def csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def export(kind, out, fmt="csv", start=None, end=None, data_dir=None, collection=None):
+    # Пишет выгрузку в открытый текстовый поток; возвращает (строк, секунд, пропущено).
+    # collection — уже загруженная коллекция (окно, реплика сервера); без неё файл
+    # коллекции читается построчно и выгрузка не держит его в памяти целиком.
+    # Пропущенные — строки файла, которые не удалось разобрать
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    started = time.perf_counter()
+    if collection is None and SERVER_URL and not data_dir:
+        collection = loaded_collection(kind)
+    skipped = []
+    if collection is not None:
+        rows = collection_rows(collection, EXPORTS[kind][1], start, end)
+    else:
+        rows = file_rows(kind, start, end, data_dir, skipped)
+    count = 0
+    if fmt == "csv":
+        if collection is not None:
+            headers = list(dict.fromkeys(key for row in rows for key in row))
+        else:
+            headers = file_headers(kind, data_dir)
+        writer = csv.writer(out)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow([csv_value(row.get(field, "")) for field in headers])
+            count += 1
+    else:
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    skipped = collection.skipped if collection is not None else len(skipped)
+    return count, time.perf_counter() - started, skipped
+
+def export_to_file(kind, filename, fmt="csv", start=None, end=None, data_dir=None, collection=None):
+    with open(filename, "w", encoding="utf-8", newline="") as out:
+        return export(kind, out, fmt, start, end, data_dir, collection)
+
+def throughput(count, seconds):
+    rate = count / seconds if seconds > 0 else 0
+    return f"{count} строк за {seconds:.2f} с ({rate:.0f} строк/с)"
+
+def skipped_warning(skipped):
+    if not skipped:
+        return ""
+    return f"Внимание: {skipped} строк файла коллекции не удалось разобрать, они не выгружены"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выгрузка чеков, заказов и бронирований в CSV или JSON Lines")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("--from", dest="start", help="начало периода, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="конец периода включительно, YYYY-MM-DD")
+    parser.add_argument("--format", dest="fmt", choices=FORMATS, default="csv")
+    parser.add_argument("--output", "-o", help="файл результата; по умолчанию stdout")
+    parser.add_argument("--data-dir", help=f"каталог с данными (по умолчанию {DATA_DIR})")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        count, seconds, skipped = export_to_file(args.kind, args.output, args.fmt, args.start, args.end, args.data_dir)
+    else:
+        sys.stdout.reconfigure(newline="")
+        count, seconds, skipped = export(args.kind, sys.stdout, args.fmt, args.start, args.end, args.data_dir)
+    # Статистику пишем в stderr, чтобы не смешивать с данными в stdout
+    print(f"Экспортировано {throughput(count, seconds)}", file=sys.stderr)
+    if skipped:
+        print(skipped_warning(skipped), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
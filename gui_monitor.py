@@ -0,0 +1,151 @@
+import functools
+import sys
+import time
+import types
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+
+from PySide6.QtCore import QObject, QTimer, Qt
+
+from read_models import LATENCY_BOUNDS, histogram_percentile
+
+# Период проверочного таймера: насколько позже он срабатывает, настолько занят цикл событий
+TICK_MS = 50
+# Блокировки дольше этого сразу пишутся в stderr
+STALL_MS = 200
+# Как часто переписывать отчёт
+REPORT_SECONDS = 30
+SLOWEST_KEEP = 20
+RECENT_KEEP = 1000
+
+class ResponsivenessMonitor(QObject):
+    # Задержка цикла событий Qt и время обработчиков вкладок. Если обработчик
+    # открыл модальный диалог, пока тот открыт, таймер тикает — поэтому для
+    # обработчика считаем самый длинный отрезок без тиков, а не время целиком.
+    # load_* только ставят запрос в пул, поэтому обновление вкладки целиком
+    # (запрос в пуле и отрисовка) приходит отдельно, в record_refresh
+    def __init__(self, report_path, parent=None):
+        super().__init__(parent)
+        self.report_path = report_path
+        self.started = datetime.now()
+        self.stack = []
+        self.handlers = {}
+        self.refreshes = {}
+        self.slowest = []
+        self.recent = deque(maxlen=RECENT_KEEP)
+        # Гистограммы задержки в мс: с начала работы и за текущий период отчёта
+        self.lag_total = {}
+        self.lag_window = {}
+        self.lag_max = 0.0
+        self.last_tick = time.perf_counter()
+        self.stall_reported = False
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(TICK_MS)
+        self.report_timer = QTimer(self)
+        self.report_timer.timeout.connect(self.write_report)
+        self.report_timer.start(REPORT_SECONDS * 1000)
+
+    def tick(self):
+        now = time.perf_counter()
+        lag = max(0.0, (now - self.last_tick) * 1000 - TICK_MS)
+        self.last_tick = now
+        bucket = bisect_left(LATENCY_BOUNDS, lag)
+        for histogram in (self.lag_total, self.lag_window):
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+        self.lag_max = max(self.lag_max, lag)
+        for frame in self.stack:
+            frame["blocked"] = max(frame["blocked"], now - frame["mark"])
+            frame["mark"] = now
+        # Если окно держал замеряемый обработчик, о нём уже написал record()
+        if lag >= STALL_MS and not self.stack and not self.stall_reported:
+            print(f"[gui] цикл событий стоял {lag:.0f} мс", file=sys.stderr)
+        self.stall_reported = False
+
+    def instrument(self, cls, names=None):
+        # Оборачивает методы класса; без names — все, кроме статических и служебных
+        for name in names or [name for name, value in vars(cls).items()
+                              if isinstance(value, types.FunctionType) and not name.startswith("_")]:
+            setattr(cls, name, self.wrap(f"{cls.__name__}.{name}", getattr(cls, name)))
+
+    def wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            frame = {"mark": started, "blocked": 0.0}
+            self.stack.append(frame)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.stack.pop()
+                now = time.perf_counter()
+                self.record(name, now - started, max(frame["blocked"], now - frame["mark"]))
+        return wrapper
+
+    def record(self, name, seconds, blocked):
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = {"calls": 0, "blocked": 0.0, "max": 0.0}
+        stats["calls"] += 1
+        stats["blocked"] += blocked
+        stats["max"] = max(stats["max"], blocked)
+        event = (blocked, datetime.now().strftime("%H:%M:%S"), name, seconds)
+        self.recent.append(event)
+        self.slowest.append(event)
+        self.slowest.sort(reverse=True)
+        del self.slowest[SLOWEST_KEEP:]
+        if blocked * 1000 >= STALL_MS:
+            self.stall_reported = True
+            print(f"[gui] {name} блокировал окно {blocked * 1000:.0f} мс", file=sys.stderr)
+
+    def record_refresh(self, name, seconds, query_seconds):
+        stats = self.refreshes.get(name)
+        if stats is None:
+            stats = self.refreshes[name] = {"calls": 0, "seconds": 0.0, "query": 0.0, "max": 0.0, "histogram": {}}
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["query"] += query_seconds
+        stats["max"] = max(stats["max"], seconds)
+        bucket = bisect_left(LATENCY_BOUNDS, seconds * 1000)
+        stats["histogram"][bucket] = stats["histogram"].get(bucket, 0) + 1
+
+    def report(self):
+        lines = [f"Отзывчивость окна с {self.started:%Y-%m-%d %H:%M:%S}, обновлено {datetime.now():%H:%M:%S}", ""]
+        lines.append(f"Задержка цикла событий, мс (таймер {TICK_MS} мс):")
+        for title, histogram in (("за последний период", self.lag_window), ("с начала работы", self.lag_total)):
+            if histogram:
+                p50, p95, p99 = (histogram_percentile(histogram, percent) for percent in (50, 95, 99))
+                lines.append(f"  {title:<20} p50 ≤{p50:.0f}  p95 ≤{p95:.0f}  p99 ≤{p99:.0f}  замеров {sum(histogram.values())}")
+        lines.append(f"  максимум {self.lag_max:.0f}")
+
+        lines += ["", "Самые долгие вызовы (блокировка окна, мс):"]
+        for blocked, when, name, seconds in self.slowest:
+            suffix = f"  (всего {seconds * 1000:.0f} мс с диалогом)" if seconds - blocked > 0.05 else ""
+            lines.append(f"  {blocked * 1000:>9.1f}  {when}  {name}{suffix}")
+
+        recent = sorted(self.recent, reverse=True)[:SLOWEST_KEEP]
+        lines += ["", f"Самые долгие из последних {len(self.recent)} вызовов:"]
+        for blocked, when, name, seconds in recent:
+            lines.append(f"  {blocked * 1000:>9.1f}  {when}  {name}")
+
+        lines += ["", f"{'Обработчик':<45} {'Вызовов':>8} {'Сред., мс':>10} {'Макс, мс':>9}"]
+        for name, stats in sorted(self.handlers.items(), key=lambda item: -item[1]["max"]):
+            lines.append(f"{name:<45} {stats['calls']:>8} {stats['blocked'] * 1000 / stats['calls']:>10.1f} "
+                         f"{stats['max'] * 1000:>9.1f}")
+
+        lines += ["", "Обновление данных вкладок: от запроса до конца отрисовки, мс (запрос — время в пуле потоков):"]
+        lines.append(f"{'Запрос':<45} {'Обновлений':>10} {'Сред.':>8} {'p95 ≤':>8} {'Макс':>8} {'Запрос сред.':>13}")
+        for name, stats in sorted(self.refreshes.items(), key=lambda item: -item[1]["max"]):
+            calls = stats["calls"]
+            lines.append(f"{name:<45} {calls:>10} {stats['seconds'] * 1000 / calls:>8.1f} "
+                         f"{histogram_percentile(stats['histogram'], 95):>8.0f} {stats['max'] * 1000:>8.1f} "
+                         f"{stats['query'] * 1000 / calls:>13.1f}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self):
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            f.write(self.report())
+        self.lag_window = {}
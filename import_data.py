@@ -0,0 +1,215 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import database
+
+# Порядок важен: бронирования ссылаются на столы и клиентов из той же пачки
+KINDS = ("tables", "menu", "customers", "reservations")
+
+def read_records(path, fmt=None):
+    # (номер строки, запись) из CSV с заголовком или из JSON Lines
+    fmt = fmt or ("jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".json") else "csv")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_num, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_num, json.loads(line)
+
+def text(record, field):
+    value = record.get(field)
+    return "" if value is None else str(value).strip()
+
+def parse_time(value):
+    try:
+        return datetime.strptime(value, "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return None
+
+class BulkImporter:
+    # Проверяет записи по индексам в памяти и копит их; commit() пишет
+    # каждую коллекцию одним insert_many, то есть одним сохранением файла
+    def __init__(self):
+        self.errors = []
+        self.rows = {kind: [] for kind in KINDS}
+        self.table_numbers = {str(table["tableNumber"]): table["id"] for table in database.table_collection.find()}
+        self.phones = {customer["phone"]: customer["id"] for customer in database.customer_collection.find()}
+        self.dish_names = {item["name"] for item in database.menu_collection.find()}
+        # (номер стола, дата) -> [(начало, конец)] для не отменённых бронирований
+        self.busy = {}
+        self.busy_dates = set()
+
+    def error(self, kind, line, message):
+        self.errors.append((kind, line, message))
+
+    def add(self, kind, records):
+        handler = getattr(self, f"add_{kind}")
+        for line, record in records:
+            # "|" и переводы строк в значениях write_file экранирует сам
+            message = handler(record)
+            if message:
+                self.error(kind, line, message)
+
+    def add_tables(self, record):
+        number = text(record, "tableNumber")
+        seats = text(record, "seats") or "2"
+        if not number.isdigit() or not seats.isdigit() or int(seats) < 1:
+            return "Номер стола и число мест должны быть положительными целыми"
+        if number in self.table_numbers:
+            return f"Стол {number} уже есть"
+        self.table_numbers[number] = None
+        self.rows["tables"].append({
+            "tableNumber": number,
+            "seats": seats,
+            "isAvailable": True,
+            "status": "free"
+        })
+
+    def add_menu(self, record):
+        name = text(record, "name")
+        if not name:
+            return "Не указано название блюда"
+        if name in self.dish_names:
+            return f"Блюдо «{name}» уже есть в меню"
+        try:
+            price = float(text(record, "price") or 0)
+        except ValueError:
+            return "Цена должна быть числом"
+        if price < 0:
+            return "Цена не может быть отрицательной"
+        self.dish_names.add(name)
+        self.rows["menu"].append({
+            "name": name,
+            "description": text(record, "description"),
+            "price": price,
+            "category": text(record, "category"),
+            "ingredients": text(record, "ingredients")
+        })
+
+    def add_customers(self, record):
+        name, phone = text(record, "name"), text(record, "phone")
+        if not name or not phone:
+            return "Не указаны имя или телефон клиента"
+        if phone in self.phones:
+            return f"Клиент с телефоном {phone} уже есть"
+        self.phones[phone] = None
+        self.rows["customers"].append({"name": name, "phone": phone})
+
+    def load_busy(self, res_date):
+        # Существующие бронирования подгружаем по индексу даты, только для дат из файла
+        if res_date in self.busy_dates:
+            return
+        self.busy_dates.add(res_date)
+        table_numbers = {table_id: number for number, table_id in self.table_numbers.items() if table_id}
+        for res in database.reservation_collection.find({
+            "reservationDate": res_date,
+            "status": {"$ne": "cancelled"}
+        }):
+            number = table_numbers.get(res["tableId"])
+            if number is not None:
+                self.busy.setdefault((number, res_date), []).append((res["startTime"], res["endTime"]))
+
+    def add_reservations(self, record):
+        number, phone = text(record, "tableNumber"), text(record, "phone")
+        res_date = text(record, "reservationDate")
+        start, end = parse_time(text(record, "startTime")), parse_time(text(record, "endTime"))
+        status = text(record, "status") or "confirmed"
+        if number not in self.table_numbers:
+            return f"Стол {number} не найден"
+        try:
+            res_date = datetime.strptime(res_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            return "Дата бронирования должна быть в формате YYYY-MM-DD"
+        if not start or not end or start >= end:
+            return "Время бронирования должно быть в формате HH:MM, начало раньше конца"
+        if not phone:
+            return "Не указан телефон клиента"
+        if phone not in self.phones:
+            name = text(record, "name")
+            if not name:
+                return f"Клиент с телефоном {phone} не найден, а имя не указано"
+            self.phones[phone] = None
+            self.rows["customers"].append({"name": name, "phone": phone})
+
+        if status != "cancelled":
+            self.load_busy(res_date)
+            slots = self.busy.setdefault((number, res_date), [])
+            for busy_start, busy_end in slots:
+                if busy_start < end and busy_end > start:
+                    return f"Стол {number} {res_date} уже забронирован с {busy_start} до {busy_end}"
+            slots.append((start, end))
+        self.rows["reservations"].append({
+            "tableNumber": number,
+            "phone": phone,
+            "reservationDate": res_date,
+            "startTime": start,
+            "endTime": end,
+            "status": status
+        })
+
+    def commit(self):
+        # Возвращает число добавленных записей по видам
+        for table in database.table_collection.insert_many(self.rows["tables"]):
+            self.table_numbers[table["tableNumber"]] = table["id"]
+        database.menu_collection.insert_many(self.rows["menu"])
+        for customer in database.customer_collection.insert_many(self.rows["customers"]):
+            self.phones[customer["phone"]] = customer["id"]
+        database.reservation_collection.insert_many([{
+            "tableId": self.table_numbers[res["tableNumber"]],
+            "customerId": self.phones[res["phone"]],
+            "reservationDate": res["reservationDate"],
+            "startTime": res["startTime"],
+            "endTime": res["endTime"],
+            "status": res["status"]
+        } for res in self.rows["reservations"]])
+        counts = {kind: len(rows) for kind, rows in self.rows.items()}
+        self.rows = {kind: [] for kind in KINDS}
+        return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовый импорт столов, меню, клиентов и бронирований из CSV или JSON Lines")
+    for kind in KINDS:
+        parser.add_argument(f"--{kind}", metavar="FILE")
+    parser.add_argument("--format", dest="fmt", choices=("csv", "jsonl"),
+                        help="формат файлов; по умолчанию по расширению")
+    parser.add_argument("--partial", action="store_true",
+                        help="импортировать корректные записи, даже если есть ошибки")
+    parser.add_argument("--data-dir", help=f"каталог с данными (по умолчанию {database.DATA_DIR})")
+    args = parser.parse_args(argv)
+    if args.data_dir:
+        # Каталог данных задан явно — пишем в его файлы, а не на сервер
+        database.DATA_DIR = args.data_dir
+        database.SERVER_URL = None
+
+    # services подтягивает read_models, а они загружают коллекции, поэтому
+    # импортируем его здесь, когда каталог данных уже выбран
+    import services
+    started = time.perf_counter()
+    records = {kind: list(read_records(getattr(args, kind), args.fmt)) for kind in KINDS if getattr(args, kind)}
+    try:
+        result = services.import_records(records=records, partial=args.partial)
+    except services.ServiceError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    for kind, line, message in result["errors"]:
+        print(f"{kind}, строка {line}: {message}", file=sys.stderr)
+    counts = result["counts"]
+    if counts is None:
+        print(f"Импорт отменён: ошибок {len(result['errors'])}", file=sys.stderr)
+        return 1
+
+    summary = ", ".join(f"{kind}: {count}" for kind, count in counts.items())
+    print(f"Импортировано за {time.perf_counter() - started:.2f} с — {summary}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
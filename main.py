@@ -1,153 +1,257 @@
+import os
 import sys
 import re
-import os
-from datetime import datetime, date, time
+import threading
+import time as perf_time
+from datetime import datetime, date, time, timedelta
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLineEdit, QMessageBox, QTableWidget, QTableWidgetItem,
     QFormLayout, QComboBox, QDateEdit, QTimeEdit, QDialog, QListWidget,
-    QListWidgetItem, QInputDialog, QSpinBox, QLabel, QStackedWidget
+    QListWidgetItem, QInputDialog, QSpinBox, QLabel, QStackedWidget, QCheckBox,
+    QFileDialog
 )
-from PySide6.QtCore import Qt, QTime, Signal
-import ast
-
-DATA_DIR = "restaurant_data"
-os.makedirs(DATA_DIR, exist_ok=True)
+from PySide6.QtCore import Qt, QTime, Signal, QObject, QRunnable, QThreadPool, QTimer
+from bisect import bisect_left
+from functools import partial
+import database
+from database import (
+    TextFileDatabase, waiter_collection, table_collection, reservation_collection,
+    customer_collection, menu_collection, order_collection, receipt_collection,
+    ORDER_STATUSES, Param, parse_dishes
+)
+from export_data import export_to_file, loaded_collection, throughput, skipped_warning
+from import_data import read_records
+import services
+from services import ServiceError
+from read_models import (
+    order_view, receipt_view, waiter_stats, order_lines, kitchen_queue, service_times
+)
+try:
+    from analytics import sales
+except ImportError:
+    # Без NumPy отчёты по продажам недоступны, остальное приложение работает
+    sales = None
+
+# Файл отчёта об отзывчивости окна (gui_monitor.py); "1" — gui_report.txt в текущем каталоге.
+# С ним же в stderr пишется время создания вкладок и первой отрисовки
+GUI_MONITOR = os.environ.get("RESTAURANT_GUI_MONITOR")
+
+# Запись файлов идёт в одном фоновом потоке, чтобы снимки ложились на диск по порядку
+flush_pool = QThreadPool()
+flush_pool.setMaxThreadCount(1)
+TextFileDatabase.flush_executor = flush_pool.start
+
+# Не отменённые брони стола на дату: так спрашивают по каждому столу вкладки
+# столов и бронирований и диалог заказа, поэтому запрос разбирается один раз
+table_reservations = reservation_collection.prepare({
+    "tableId": Param("table_id"),
+    "reservationDate": Param("date"),
+    "status": {"$ne": "cancelled"}
+})
+
+class WorkerSignals(QObject):
+    # Поколение, результат и сколько секунд выполнялся запрос
+    finished = Signal(int, object, float)
+    error = Signal(int, str)
+
+class Worker(QRunnable):
+    def __init__(self, generation, cancelled, fn, *args):
+        super().__init__()
+        self.generation = generation
+        self.cancelled = cancelled
+        self.fn = fn
+        self.args = args
+        self.signals = WorkerSignals()
+
+    def run(self):
+        # Запрос успели вытеснить, пока он ждал в очереди пула
+        if self.cancelled.is_set():
+            return
+        started = perf_time.perf_counter()
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.error.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, result, perf_time.perf_counter() - started)
+
+class BackgroundLoader(QObject):
+    # Выполняет query в пуле потоков и передаёт результат в render в GUI-потоке.
+    # Новый запрос вытесняет предыдущий: не начатый пропускается,
+    # а результат уже запущенного отбрасывается по номеру поколения.
+    # monitor (RESTAURANT_GUI_MONITOR) получает время обновления от последнего
+    # запроса до конца отрисовки: окно при этом не занято, но данные ещё старые
+    monitor = None
+
+    def __init__(self, parent, query, render):
+        super().__init__(parent)
+        self.query = query
+        self.render = render
+        self.generation = 0
+        self.requested = 0.0
+        self.cancelled = threading.Event()
+        self.label = QLabel("Загрузка...")
+        self.label.setStyleSheet("color: #888; font-size: 13px; margin: 2px 5px;")
+        self.label.hide()
+
+    def request(self, *args):
+        self.cancelled.set()
+        self.cancelled = threading.Event()
+        self.generation += 1
+        self.requested = perf_time.perf_counter()
+        worker = Worker(self.generation, self.cancelled, self.query, *args)
+        worker.signals.finished.connect(self.on_finished)
+        worker.signals.error.connect(self.on_error)
+        self.label.show()
+        QThreadPool.globalInstance().start(worker)
+
+    def on_finished(self, generation, result, seconds):
+        if generation != self.generation:
+            return
+        self.label.hide()
+        self.render(result)
+        if self.monitor is not None:
+            self.monitor.record_refresh(self.query.__qualname__, perf_time.perf_counter() - self.requested, seconds)
 
-class TextFileDatabase:
-    def __init__(self, filename):
-        self.filename = os.path.join(DATA_DIR, filename)
-        self.data = []
-        self.load()
-    
-    def load(self):
-        self.data = []
-        if os.path.exists(self.filename):
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                headers = f.readline().strip().split('|')
-                for line in f:
-                    values = line.strip().split('|')
-                    if len(values) == len(headers):
-                        item = dict(zip(headers, values))
-                        if 'isAdmin' in item:
-                            item['isAdmin'] = item['isAdmin'] == 'True'
-                        if 'isAvailable' in item:
-                            item['isAvailable'] = item['isAvailable'] == 'True'
-                        if 'paid' in item:
-                            item['paid'] = item['paid'] == 'True'
-                        if 'price' in item:
-                            try:
-                                item['price'] = float(item['price'])
-                            except ValueError:
-                                item['price'] = 0
-                        if 'dishes' in item and isinstance(item['dishes'], str):
-                            try:
-                                item['dishes'] = ast.literal_eval(item['dishes'])
-                            except (ValueError, SyntaxError):
-                                item['dishes'] = []
-                        self.data.append(item)
-    
-    def save(self):
-        if not self.data:
+    def on_error(self, generation, message):
+        if generation != self.generation:
             return
-        
-        headers = list(self.data[0].keys())
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            f.write('|'.join(headers) + '\n')
-            for item in self.data:
-                values = []
-                for header in headers:
-                    value = item.get(header, '')
-                    if isinstance(value, list):
-                        value = str(value)
-                    else:
-                        value = str(value)
-                    values.append(value)
-                f.write('|'.join(values) + '\n')
-    
-    def find(self, query=None):
-        if query is None:
-            return self.data.copy()
-        
-        results = []
-        for item in self.data:
-            match = True
-            for key, value in query.items():
-                if key not in item or str(item[key]) != str(value):
-                    match = False
-                    break
-            if match:
-                results.append(item)
-        return results
-    
-    def find_one(self, query):
-        results = self.find(query)
-        return results[0] if results else None
-    
-    def insert_one(self, document):
-        if "id" not in document:
-            max_id = max([int(item.get('id', 0)) for item in self.data] or [0])
-            document["id"] = str(max_id + 1)
-        self.data.append(document)
-        self.save()
-        return document
-    
-    def update_one(self, query, update):
-        item = self.find_one(query)
-        if item:
-            if "$set" in update:
-                for key, value in update["$set"].items():
-                    item[key] = value
-            self.save()
-        return item
-    
-    def delete_one(self, query):
-        item = self.find_one(query)
-        if item:
-            self.data.remove(item)
-            self.save()
-        return item
-    
-    def delete_many(self, query):
-        items = self.find(query)
-        for item in items:
-            self.data.remove(item)
-        if items:
-            self.save()
-        return len(items)
-    
-    def aggregate(self, pipeline):
-        results = self.data.copy()
-        for stage in pipeline:
-            if "$match" in stage:
-                query = stage["$match"]
-                results = [item for item in results if all(
-                    str(item.get(k)) == str(v) for k, v in query.items()
-                )]
-            elif "$group" in stage:
-                group = stage["$group"]
-                groups = {}
-                for item in results:
-                    group_key = item.get(group["_id"].lstrip("$"))
-                    if group_key not in groups:
-                        groups[group_key] = {"_id": group_key, "count": 0}
-                    groups[group_key]["count"] += 1
-                results = list(groups.values())
-            elif "$sort" in stage:
-                sort = stage["$sort"]
-                key = list(sort.keys())[0]
-                reverse = sort[key] == -1
-                results.sort(key=lambda x: x.get(key, 0), reverse=reverse)
-        return results
-
-# Инициализация "коллекций"
-waiter_collection = TextFileDatabase("waiters.txt")
-table_collection = TextFileDatabase("restaurantTables.txt")
-reservation_collection = TextFileDatabase("reservations.txt")
-customer_collection = TextFileDatabase("customers.txt")
-menu_collection = TextFileDatabase("menuItems.txt")
-order_collection = TextFileDatabase("orders.txt")
-receipt_collection = TextFileDatabase("receipts.txt")
+        self.label.hide()
+        QMessageBox.warning(self.parent(), "Ошибка", f"Не удалось загрузить данные: {message}")
+
+class GuiInvoker(QObject):
+    # Выполняет функции в GUI-потоке: emit из другого потока ставит вызов в очередь
+    invoke = Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.invoke.connect(self.run)
+
+    def run(self, fn):
+        fn()
+
+    def dispatch(self, fn, *args):
+        self.invoke.emit(partial(fn, *args))
+
+class RemoteChanges(QObject):
+    # Изменения, пришедшие с сервера от других терминалов, пачкой на цикл событий
+    changed = Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.pending = set()
+
+    def add(self, names):
+        if not self.pending:
+            QTimer.singleShot(0, self.flush)
+        self.pending |= names
+
+    def flush(self):
+        names, self.pending = self.pending, set()
+        self.changed.emit(names)
+
+remote_changes = RemoteChanges() if database.SERVER_URL else None
+
+PAGE_SIZE = 50
+
+class FilterBar(QWidget):
+    # Период по date_field, официант и дополнительные списки вида
+    # {поле: [(текст, условие), ...]}; query() собирает из них запрос к коллекции
+    changed = Signal()
+
+    def __init__(self, date_field, choices):
+        super().__init__()
+        self.date_field = date_field
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.period_check = QCheckBox("За период")
+        self.date_from = QDateEdit()
+        self.date_to = QDateEdit()
+        for edit in (self.date_from, self.date_to):
+            edit.setCalendarPopup(True)
+            edit.setDate(date.today())
+        layout.addWidget(self.period_check)
+        layout.addWidget(self.date_from)
+        layout.addWidget(QLabel("—"))
+        layout.addWidget(self.date_to)
+
+        self.combos = {}
+        for field, (label, options) in choices.items():
+            combo = QComboBox()
+            for text, condition in [("Все", None)] + options:
+                combo.addItem(text, condition)
+            layout.addWidget(QLabel(label))
+            layout.addWidget(combo)
+            self.combos[field] = combo
+            combo.currentIndexChanged.connect(lambda *args: self.changed.emit())
+
+        self.waiter_combo = QComboBox()
+        self.waiter_combo.addItem("Все", None)
+        for waiter in waiter_collection.find():
+            self.waiter_combo.addItem(waiter["login"], waiter["login"])
+        layout.addWidget(QLabel("Официант:"))
+        layout.addWidget(self.waiter_combo)
+        layout.addStretch()
+
+        for signal in (self.period_check.toggled, self.date_from.dateChanged,
+                       self.date_to.dateChanged, self.waiter_combo.currentIndexChanged):
+            signal.connect(lambda *args: self.changed.emit())
+
+    def query(self):
+        query = {}
+        if self.period_check.isChecked():
+            start = self.date_from.date().toPython()
+            end = self.date_to.date().toPython() + timedelta(days=1)
+            query[self.date_field] = {"$gte": start.strftime("%Y-%m-%d"), "$lt": end.strftime("%Y-%m-%d")}
+        for field, combo in self.combos.items():
+            if combo.currentData() is not None:
+                query[field] = combo.currentData()
+        if self.waiter_combo.currentData():
+            query["waiterLogin"] = self.waiter_combo.currentData()
+        return query
+
+class Paginator(QWidget):
+    page_changed = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self.page = 0
+        self.total = 0
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.btn_prev = QPushButton("<")
+        self.btn_next = QPushButton(">")
+        self.label = QLabel()
+        layout.addStretch()
+        layout.addWidget(self.btn_prev)
+        layout.addWidget(self.label)
+        layout.addWidget(self.btn_next)
+        self.btn_prev.clicked.connect(lambda: self.go(self.page - 1))
+        self.btn_next.clicked.connect(lambda: self.go(self.page + 1))
+        self.set_total(0)
+
+    def pages(self):
+        return max(1, -(-self.total // PAGE_SIZE))
+
+    def skip(self):
+        return self.page * PAGE_SIZE
+
+    def reset(self):
+        self.page = 0
+
+    def go(self, page):
+        if 0 <= page < self.pages():
+            self.page = page
+            self.page_changed.emit()
+
+    def set_total(self, total):
+        self.total = total
+        self.page = min(self.page, self.pages() - 1)
+        self.label.setText(f"Страница {self.page + 1} из {self.pages()} (всего: {total})")
+        self.btn_prev.setEnabled(self.page > 0)
+        self.btn_next.setEnabled(self.page < self.pages() - 1)
 
 class LoginWindow(QWidget):
     def __init__(self):
@@ -237,13 +341,14 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Ошибка", "Пароль должен быть на латинице и не менее 4 символов")
             return
 
-        user = waiter_collection.find_one({"login": login, "password": password})
-        if user:
-            self.main_window = MainWindow(user)
-            self.main_window.show()
-            self.close()
-        else:
-            QMessageBox.warning(self, "Ошибка", "Неверный логин или пароль")
+        try:
+            user = services.authenticate(login=login, password=password)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        self.main_window = MainWindow(user, login_started=perf_time.perf_counter())
+        self.main_window.show()
+        self.close()
 
     def show_register_window(self):
         self.register_window = RegisterWindow()
@@ -338,32 +443,24 @@ class RegisterWindow(QWidget):
         password = self.pass_input.text().strip()
         password_confirm = self.pass_confirm_input.text().strip()
 
-        if not re.fullmatch(r'[A-Za-z0-9]{4,}', login):
-            QMessageBox.warning(self, "Ошибка", "Логин должен быть на латинице и не менее 4 символов")
-            return
-        if not re.fullmatch(r'[A-Za-z0-9]{4,}', password):
-            QMessageBox.warning(self, "Ошибка", "Пароль должен быть на латинице и не менее 4 символа")
-            return
         if password != password_confirm:
             QMessageBox.warning(self, "Ошибка", "Пароли не совпадают")
             return
 
-        if waiter_collection.find_one({"login": login}):
-            QMessageBox.warning(self, "Ошибка", "Пользователь с таким логином уже существует")
+        try:
+            services.register_waiter(login=login, password=password)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
             return
-
-        waiter_collection.insert_one({
-            "login": login,
-            "password": password,
-            "isAdmin": False
-        })
         QMessageBox.information(self, "Успешно", "Пользователь зарегистрирован")
         self.close()
 
 class MainWindow(QMainWindow):
-    def __init__(self, user):
+    def __init__(self, user, login_started=None):
         super().__init__()
         self.user = user
+        self.login_started = login_started if login_started is not None else perf_time.perf_counter()
+        self.first_paint_reported = False
         self.setWindowTitle(f"Ресторан — Пользователь: {user['login']}")
         self.resize(1000, 700)
         
@@ -371,36 +468,29 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
         main_layout = QVBoxLayout(central_widget)
         
+        # Вкладки создаются при первом переходе на них
+        is_admin = user.get("isAdmin", False)
+        self.tab_factories = {
+            "tables": lambda: TablesTab(is_admin=is_admin),
+            "reservations": ReservationsTab,
+            "kitchen": KitchenTab,
+            "menu": lambda: MenuTab(is_admin=is_admin)
+        }
+        # Добавляем дополнительные вкладки только для админа
+        if is_admin:
+            self.tab_factories.update({
+                "orders": lambda: OrdersTab(user),
+                "receipts": lambda: ReceiptsTab(user),
+                "stats": StatsTab
+            })
+        self.tabs = {}
+
         self.create_navigation_bar(main_layout)
         
         self.stack = QStackedWidget()
         main_layout.addWidget(self.stack)
         
-        self.tables_tab = TablesTab(is_admin=user.get("isAdmin", False))
-        self.reservations_tab = ReservationsTab()
-        self.menu_tab = MenuTab(is_admin=user.get("isAdmin", False))
-        
-        self.stack.addWidget(self.tables_tab)
-        self.stack.addWidget(self.reservations_tab)
-        self.stack.addWidget(self.menu_tab)
-        
-        # Добавляем дополнительные вкладки только для админа
-        if user.get("isAdmin", False):
-            self.orders_tab = OrdersTab(user)
-            self.receipts_tab = ReceiptsTab(user)
-            self.stats_tab = StatsTab()
-            
-            self.stack.addWidget(self.orders_tab)
-            self.stack.addWidget(self.receipts_tab)
-            self.stack.addWidget(self.stats_tab)
-            
-            self.orders_tab.order_updated.connect(self.reservations_tab.load_reservations)
-            self.orders_tab.receipt_created.connect(self.receipts_tab.load_receipts)
-            self.receipts_tab.receipt_paid.connect(self.orders_tab.load_orders)
-        
-        self.stack.setCurrentWidget(self.tables_tab)
-        
-        self.reservations_tab.reservation_created.connect(self.tables_tab.load_tables)
+        self.show_section("tables")
         
         btn_logout = QPushButton("Выйти из аккаунта")
         btn_logout.setStyleSheet("""
@@ -422,12 +512,16 @@ class MainWindow(QMainWindow):
         """)
         btn_logout.clicked.connect(self.logout)
         main_layout.addWidget(btn_logout)
+
+        if remote_changes is not None:
+            remote_changes.changed.connect(self.on_remote_changes)
     
     def create_navigation_bar(self, layout):
         nav_layout = QHBoxLayout()
         
         self.btn_tables = QPushButton("Столы")
         self.btn_reservations = QPushButton("Бронирования")
+        self.btn_kitchen = QPushButton("Кухня")
         self.btn_orders = QPushButton("Заказы")
         self.btn_receipts = QPushButton("Счета")
         self.btn_menu = QPushButton("Меню")
@@ -457,7 +551,7 @@ class MainWindow(QMainWindow):
             }
         """
         
-        for btn in [self.btn_tables, self.btn_reservations, self.btn_orders, 
+        for btn in [self.btn_tables, self.btn_reservations, self.btn_kitchen, self.btn_orders,
                    self.btn_receipts, self.btn_menu, self.btn_stats]:
             btn.setStyleSheet(button_style)
             btn.setCheckable(True)
@@ -467,6 +561,7 @@ class MainWindow(QMainWindow):
         # Показываем все кнопки для админа, скрываем некоторые для обычного пользователя
         nav_layout.addWidget(self.btn_tables)
         nav_layout.addWidget(self.btn_reservations)
+        nav_layout.addWidget(self.btn_kitchen)
         
         if self.user.get("isAdmin", False):
             nav_layout.addWidget(self.btn_orders)
@@ -481,40 +576,121 @@ class MainWindow(QMainWindow):
             self.btn_receipts.hide()
             self.btn_stats.hide()
         
-        self.btn_tables.clicked.connect(lambda: self.show_section(self.tables_tab))
-        self.btn_reservations.clicked.connect(lambda: self.show_section(self.reservations_tab))
-        self.btn_orders.clicked.connect(lambda: self.show_section(self.orders_tab))
-        self.btn_receipts.clicked.connect(lambda: self.show_section(self.receipts_tab))
-        self.btn_menu.clicked.connect(lambda: self.show_section(self.menu_tab))
-        self.btn_stats.clicked.connect(lambda: self.show_section(self.stats_tab))
+        self.btn_tables.clicked.connect(lambda: self.show_section("tables"))
+        self.btn_reservations.clicked.connect(lambda: self.show_section("reservations"))
+        self.btn_kitchen.clicked.connect(lambda: self.show_section("kitchen"))
+        self.btn_orders.clicked.connect(lambda: self.show_section("orders"))
+        self.btn_receipts.clicked.connect(lambda: self.show_section("receipts"))
+        self.btn_menu.clicked.connect(lambda: self.show_section("menu"))
+        self.btn_stats.clicked.connect(lambda: self.show_section("stats"))
         
         layout.addLayout(nav_layout)
+
+    def tab(self, name):
+        if name not in self.tabs:
+            started = perf_time.perf_counter()
+            widget = self.tab_factories[name]()
+            self.tabs[name] = widget
+            setattr(self, f"{name}_tab", widget)
+            self.stack.addWidget(widget)
+            self.connect_tab_signals(name, widget)
+            if GUI_MONITOR:
+                print(f"[gui] вкладка {name} создана за {(perf_time.perf_counter() - started) * 1000:.1f} мс",
+                      file=sys.stderr)
+        return self.tabs[name]
+
+    def refresh(self, name, method):
+        # Ещё не созданная вкладка загрузит свежие данные при первом открытии
+        if name in self.tabs:
+            getattr(self.tabs[name], method)()
+
+    def connect_tab_signals(self, name, widget):
+        if name == "reservations":
+            widget.reservation_created.connect(lambda: self.refresh("tables", "load_tables"))
+        elif name == "orders":
+            widget.order_updated.connect(lambda: self.refresh("reservations", "load_reservations"))
+            widget.receipt_created.connect(lambda: self.refresh("receipts", "load_receipts"))
+        elif name == "receipts":
+            widget.receipt_paid.connect(lambda: self.refresh("orders", "load_orders"))
+        elif name == "kitchen":
+            widget.order_updated.connect(lambda: self.refresh("orders", "load_orders"))
     
-    def show_section(self, section_widget):
-        self.stack.setCurrentWidget(section_widget)
-        
-        for btn in [self.btn_tables, self.btn_reservations, self.btn_orders, 
-                   self.btn_receipts, self.btn_menu, self.btn_stats]:
-            btn.setChecked(False)
+    def show_section(self, name):
+        if name not in self.tab_factories:
+            return
+        self.stack.setCurrentWidget(self.tab(name))
         
-        if section_widget == self.tables_tab:
-            self.btn_tables.setChecked(True)
-        elif section_widget == self.reservations_tab:
-            self.btn_reservations.setChecked(True)
-        elif section_widget == self.orders_tab:
-            self.btn_orders.setChecked(True)
-        elif section_widget == self.receipts_tab:
-            self.btn_receipts.setChecked(True)
-        elif section_widget == self.menu_tab:
-            self.btn_menu.setChecked(True)
-        elif section_widget == self.stats_tab:
-            self.btn_stats.setChecked(True)
+        buttons = {
+            "tables": self.btn_tables,
+            "reservations": self.btn_reservations,
+            "kitchen": self.btn_kitchen,
+            "orders": self.btn_orders,
+            "receipts": self.btn_receipts,
+            "menu": self.btn_menu,
+            "stats": self.btn_stats
+        }
+        for btn_name, btn in buttons.items():
+            btn.setChecked(btn_name == name)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if GUI_MONITOR and not self.first_paint_reported:
+            self.first_paint_reported = True
+            elapsed = (perf_time.perf_counter() - self.login_started) * 1000
+            print(f"[gui] вход -> первая отрисовка: {elapsed:.1f} мс", file=sys.stderr)
+
+    # Какие вкладки перезагружать, когда коллекцию изменил другой терминал
+    REMOTE_REFRESH = {
+        "order_collection": [("orders", "load_orders")],
+        "reservation_collection": [("reservations", "load_reservations"), ("tables", "load_tables")],
+        "table_collection": [("tables", "load_tables"), ("reservations", "load_reservations")],
+        "receipt_collection": [("receipts", "load_receipts")],
+        "menu_collection": [("menu", "load_menu")]
+    }
+
+    def on_remote_changes(self, names):
+        refreshed = set()
+        for name in names:
+            for tab, method in self.REMOTE_REFRESH.get(name, ()):
+                if (tab, method) not in refreshed:
+                    refreshed.add((tab, method))
+                    self.refresh(tab, method)
+
+    def closeEvent(self, event):
+        if "kitchen" in self.tabs:
+            self.tabs["kitchen"].detach()
+        super().closeEvent(event)
 
     def logout(self):
+        if remote_changes is not None:
+            remote_changes.changed.disconnect(self.on_remote_changes)
         self.close()
         self.login_window = LoginWindow()
         self.login_window.show()
 
+def import_from_file(parent, kind):
+    # Импорт всего файла одной записью в коллекцию; при любой ошибке не добавляется ничего
+    filename, _ = QFileDialog.getOpenFileName(parent, "Импорт", "", "CSV или JSON Lines (*.csv *.jsonl *.json)")
+    if not filename:
+        return False
+    try:
+        result = services.import_records(records={kind: list(read_records(filename))})
+    except (OSError, ValueError) as e:
+        QMessageBox.warning(parent, "Ошибка", f"Не удалось прочитать файл: {e}")
+        return False
+    except ServiceError as e:
+        QMessageBox.warning(parent, "Ошибка", str(e))
+        return False
+    errors = result["errors"]
+    if errors:
+        lines = [f"Строка {line}: {message}" for _, line, message in errors[:20]]
+        QMessageBox.warning(parent, "Ошибка импорта",
+                            f"Найдено ошибок: {len(errors)}. Ничего не импортировано.\n\n" + "\n".join(lines))
+        return False
+    counts = result["counts"]
+    QMessageBox.information(parent, "Успешно", f"Импортировано записей: {counts[kind]}")
+    return True
+
 class TablesTab(QWidget):
     def __init__(self, is_admin=False):
         super().__init__()
@@ -579,12 +755,18 @@ class TablesTab(QWidget):
             }
         """)
 
+        btn_import = QPushButton("Импорт столов")
+        btn_import.setStyleSheet(button_style)
+
         btn_layout = QHBoxLayout()
         if is_admin:
             btn_layout.addWidget(btn_add)
             btn_layout.addWidget(btn_delete)
             btn_layout.addWidget(btn_toggle)
+            btn_layout.addWidget(btn_import)
 
+        self.loader = BackgroundLoader(self, self.query_tables, self.render_tables)
+        layout.addWidget(self.loader.label)
         layout.addWidget(self.table_widget)
         if is_admin:
             layout.addLayout(btn_layout)
@@ -592,49 +774,111 @@ class TablesTab(QWidget):
         btn_add.clicked.connect(self.add_table)
         btn_delete.clicked.connect(self.delete_table)
         btn_toggle.clicked.connect(self.toggle_availability)
+        btn_import.clicked.connect(self.import_tables)
+
+        # Статус стола меняется только на границах бронирований: таймер будится
+        # к ближайшей из них и перерисовывает лишь строки, у которых статус сменился
+        self.rows_by_id = {}
+        self.boundaries = {}
+        self.status_timer = QTimer(self)
+        self.status_timer.setSingleShot(True)
+        self.status_timer.setTimerType(Qt.PreciseTimer)
+        self.status_timer.timeout.connect(self.refresh_due_statuses)
 
         self.load_tables()
 
     def load_tables(self):
-        self.table_widget.setRowCount(0)
-        now = datetime.now()
+        self.loader.request()
+
+    @staticmethod
+    def table_status(table, now, reservations=None):
+        # Возвращает статус стола на момент now и время следующей смены статуса;
+        # reservations — брони стола на сегодня, если уже выбраны
         today = now.date()
         current_time = now.time()
-
-        for table in table_collection.find():
-            row = self.table_widget.rowCount()
-            self.table_widget.insertRow(row)
-            self.table_widget.setItem(row, 0, QTableWidgetItem(str(table["tableNumber"])))
-            self.table_widget.setItem(row, 1, QTableWidgetItem(str(table["seats"])))
-            self.table_widget.setItem(row, 2, QTableWidgetItem("Да" if table.get("isAvailable", True) else "Нет"))
-
-            reservations = list(reservation_collection.find({
-                "tableId": table["id"],
-                "reservationDate": today.strftime("%Y-%m-%d"),
-                "status": {"$ne": "cancelled"}
-            }))
-
-            status = table.get("status", "free")
-            busy_now = False
-            reserved_today = False
-
-            for res in reservations:
-                start = datetime.strptime(res["startTime"], "%H:%M").time()
-                end = datetime.strptime(res["endTime"], "%H:%M").time()
-                if start <= current_time < end:
-                    busy_now = True
-                    break
+        if reservations is None:
+            reservations = table_reservations.execute(table_id=table["id"], date=today.strftime("%Y-%m-%d"))
+
+        busy_now = False
+        reserved_today = False
+        next_boundary = datetime.combine(today + timedelta(days=1), time(0, 0))
+
+        for res in reservations:
+            start = datetime.strptime(res["startTime"], "%H:%M").time()
+            end = datetime.strptime(res["endTime"], "%H:%M").time()
+            for moment in (start, end):
+                if moment > current_time:
+                    next_boundary = min(next_boundary, datetime.combine(today, moment))
+            if start <= current_time < end:
+                busy_now = True
+            else:
                 reserved_today = True
 
-            if busy_now:
-                status = "занят"
-            elif reserved_today:
-                status = "забронирован"
-            else:
-                status = "свободен" if table.get("isAvailable", True) else "недоступен"
+        if busy_now:
+            status = "занят"
+        elif reserved_today:
+            status = "забронирован"
+        else:
+            status = "свободен" if table.get("isAvailable", True) else "недоступен"
+        return status, next_boundary
 
+    @staticmethod
+    def query_tables():
+        rows = []
+        now = datetime.now()
+        tables = table_collection.find()
+        # Брони всех столов на сегодня одним проходом по индексу даты
+        reservations = table_reservations.execute_many(
+            "table_id", [table["id"] for table in tables], date=now.strftime("%Y-%m-%d")
+        )
+        for table in tables:
+            status, next_boundary = TablesTab.table_status(table, now, reservations[table["id"]])
+            rows.append((
+                table["id"],
+                str(table["tableNumber"]),
+                str(table["seats"]),
+                "Да" if table.get("isAvailable", True) else "Нет",
+                status,
+                next_boundary
+            ))
+        return rows
+
+    def render_tables(self, rows):
+        self.table_widget.setRowCount(0)
+        self.table_widget.setRowCount(len(rows))
+        self.rows_by_id = {}
+        self.boundaries = {}
+        for row, (table_id, number, seats, available, status, next_boundary) in enumerate(rows):
+            self.table_widget.setItem(row, 0, QTableWidgetItem(number))
+            self.table_widget.setItem(row, 1, QTableWidgetItem(seats))
+            self.table_widget.setItem(row, 2, QTableWidgetItem(available))
             self.table_widget.setItem(row, 3, QTableWidgetItem(status))
-            self.table_widget.item(row, 0).setData(Qt.UserRole, table["id"])
+            self.table_widget.item(row, 0).setData(Qt.UserRole, table_id)
+            self.rows_by_id[table_id] = row
+            self.boundaries[table_id] = next_boundary
+        self.schedule_status_timer()
+
+    def schedule_status_timer(self):
+        self.status_timer.stop()
+        if not self.boundaries:
+            return
+        delay = (min(self.boundaries.values()) - datetime.now()).total_seconds()
+        self.status_timer.start(max(0, int(delay * 1000)))
+
+    def refresh_due_statuses(self):
+        now = datetime.now()
+        for table_id, boundary in list(self.boundaries.items()):
+            if boundary > now:
+                continue
+            table = table_collection.find_one({"id": table_id})
+            if table is None:
+                del self.boundaries[table_id]
+                continue
+            status, self.boundaries[table_id] = self.table_status(table, now)
+            item = self.table_widget.item(self.rows_by_id[table_id], 3)
+            if item.text() != status:
+                item.setText(status)
+        self.schedule_status_timer()
 
     def add_table(self):
         dialog = QDialog(self)
@@ -691,15 +935,11 @@ class TablesTab(QWidget):
         layout.addRow(btn_box)
 
         def on_ok():
-            if table_collection.find_one({"tableNumber": str(spin_num.value())}):
-                QMessageBox.warning(dialog, "Ошибка", "Такой стол уже есть")
+            try:
+                services.add_table(table_number=str(spin_num.value()), seats=str(spin_seats.value()))
+            except ServiceError as e:
+                QMessageBox.warning(dialog, "Ошибка", str(e))
                 return
-            table_collection.insert_one({
-                "tableNumber": str(spin_num.value()),
-                "seats": str(spin_seats.value()),
-                "isAvailable": True,
-                "status": "free"
-            })
             self.load_tables()
             dialog.accept()
 
@@ -708,6 +948,10 @@ class TablesTab(QWidget):
 
         dialog.exec()
 
+    def import_tables(self):
+        if import_from_file(self, "tables"):
+            self.load_tables()
+
     def delete_table(self):
         selected = self.table_widget.selectedItems()
         if not selected:
@@ -715,8 +959,11 @@ class TablesTab(QWidget):
             return
         row = self.table_widget.currentRow()
         table_id = self.table_widget.item(row, 0).data(Qt.UserRole)
-        table_collection.delete_one({"id": table_id})
-        reservation_collection.delete_many({"tableId": table_id})
+        try:
+            services.delete_table(table_id=table_id)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
         self.load_tables()
 
     def toggle_availability(self):
@@ -726,9 +973,11 @@ class TablesTab(QWidget):
             return
         row = self.table_widget.currentRow()
         table_id = self.table_widget.item(row, 0).data(Qt.UserRole)
-        table = table_collection.find_one({"id": table_id})
-        new_status = not table.get("isAvailable", True)
-        table_collection.update_one({"id": table_id}, {"$set": {"isAvailable": new_status}})
+        try:
+            services.toggle_table_availability(table_id=table_id)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
         self.load_tables()
 
 class ReservationsTab(QWidget):
@@ -862,6 +1111,10 @@ class ReservationsTab(QWidget):
         self.reservations_list.setHorizontalHeaderLabels([
             "Клиент", "Телефон", "Стол", "Дата", "Время", "Статус"
         ])
+        self.tables_loader = BackgroundLoader(self, self.query_free_tables, self.render_free_tables)
+        self.loader = BackgroundLoader(self, self.query_reservations, self.render_reservations)
+        layout.addWidget(self.tables_loader.label)
+        layout.addWidget(self.loader.label)
         layout.addWidget(self.reservations_list)
 
         self.load_tables()
@@ -877,109 +1130,81 @@ class ReservationsTab(QWidget):
         btn_edit_res.clicked.connect(self.edit_reservation)
 
     def load_tables(self):
-        self.table_combo.clear()
-        res_date = self.date_edit.date().toPython()
-        start = self.start_time.time().toPython()
-        end = self.end_time.time().toPython()
+        self.tables_loader.request(
+            self.date_edit.date().toPython(),
+            self.start_time.time().toPython(),
+            self.end_time.time().toPython()
+        )
+
+    @staticmethod
+    def query_free_tables(res_date, start, end):
+        free = []
         if start >= end:
-            return
+            return free
 
-        res_date_str = res_date.strftime("%Y-%m-%d")
-        for table in table_collection.find({"isAvailable": True}):
+        tables = table_collection.find({"isAvailable": True})
+        reservations = table_reservations.execute_many(
+            "table_id", [table["id"] for table in tables], date=res_date.strftime("%Y-%m-%d")
+        )
+        for table in tables:
             busy = False
-            for res in reservation_collection.find({
-                "tableId": table["id"],
-                "reservationDate": res_date_str,
-                "status": {"$ne": "cancelled"}
-            }):
+            for res in reservations[table["id"]]:
                 res_start = datetime.strptime(res["startTime"], "%H:%M").time()
                 res_end = datetime.strptime(res["endTime"], "%H:%M").time()
                 if res_start < end and res_end > start:
                     busy = True
                     break
             if not busy:
-                self.table_combo.addItem(f"Стол {table['tableNumber']} (мест: {table['seats']})", table["id"])
+                free.append((f"Стол {table['tableNumber']} (мест: {table['seats']})", table["id"]))
+        return free
+
+    def render_free_tables(self, free):
+        self.table_combo.clear()
+        for text, table_id in free:
+            self.table_combo.addItem(text, table_id)
 
     def load_reservations(self):
-        self.reservations_list.setRowCount(0)
+        self.loader.request()
+
+    @staticmethod
+    def query_reservations():
+        rows = []
         for res in reservation_collection.find():
-            row = self.reservations_list.rowCount()
-            self.reservations_list.insertRow(row)
             customer = customer_collection.find_one({"id": res["customerId"]})
             table = table_collection.find_one({"id": res["tableId"]})
-            self.reservations_list.setItem(row, 0, QTableWidgetItem(customer.get("name", "") if customer else ""))
-            self.reservations_list.setItem(row, 1, QTableWidgetItem(customer.get("phone", "") if customer else ""))
-            self.reservations_list.setItem(row, 2, QTableWidgetItem(str(table["tableNumber"]) if table else ""))
-            self.reservations_list.setItem(row, 3, QTableWidgetItem(str(res["reservationDate"])))
-            self.reservations_list.setItem(row, 4, QTableWidgetItem(f"{res['startTime']} - {res['endTime']}"))
-            self.reservations_list.setItem(row, 5, QTableWidgetItem(res.get("status", "confirmed")))
-            self.reservations_list.item(row, 0).setData(Qt.UserRole, res["id"])
+            rows.append((
+                res["id"],
+                customer.get("name", "") if customer else "",
+                customer.get("phone", "") if customer else "",
+                str(table["tableNumber"]) if table else "",
+                str(res["reservationDate"]),
+                f"{res['startTime']} - {res['endTime']}",
+                res.get("status", "confirmed")
+            ))
+        return rows
+
+    def render_reservations(self, rows):
+        self.reservations_list.setRowCount(0)
+        self.reservations_list.setRowCount(len(rows))
+        for row, (res_id, *values) in enumerate(rows):
+            for column, value in enumerate(values):
+                self.reservations_list.setItem(row, column, QTableWidgetItem(value))
+            self.reservations_list.item(row, 0).setData(Qt.UserRole, res_id)
 
     def book_table(self):
-        name = self.name_input.text().strip()
-        phone = self.phone_input.text().strip()
-        table_id = self.table_combo.currentData()
-        res_date = self.date_edit.date().toPython()
-        start = self.start_time.time().toPython()
-        end = self.end_time.time().toPython()
-
-        today = datetime.now().date()
-        if res_date < today:
-            QMessageBox.warning(self, "Ошибка", "Нельзя бронировать на прошедшую дату")
-            return
-        if res_date == today and start <= datetime.now().time():
-            QMessageBox.warning(self, "Ошибка", "Время бронирования должно быть позже текущего")
-            return
-
-        if not name or not phone or not table_id:
-            QMessageBox.warning(self, "Ошибка", "Заполните все поля")
-            return
-        if start >= end:
-            QMessageBox.warning(self, "Ошибка", "Время начала должно быть меньше конца")
-            return
-
-        start_dt = datetime.combine(res_date, start)
-        end_dt = datetime.combine(res_date, end)
-        if (end_dt - start_dt).total_seconds() < 3600:
-            QMessageBox.warning(self, "Ошибка", "Минимальное время бронирования — 1 час")
-            return
-
-        open_time = time(8, 0)
-        close_time = time(22, 0)
-        if start < open_time or end > close_time:
-            QMessageBox.warning(self, "Ошибка", "Бронирование возможно только с 8:00 до 22:00")
-            return
-
-        res_date_str = res_date.strftime("%Y-%m-%d")
-
-        overlapping = reservation_collection.find_one({
-            "tableId": table_id,
-            "reservationDate": res_date_str,
-            "$or": [
-                {"startTime": {"$lt": end.strftime("%H:%M")}, "endTime": {"$gt": start.strftime("%H:%M")}}
-            ],
-            "status": {"$ne": "cancelled"}
-        })
-        if overlapping:
-            QMessageBox.warning(self, "Ошибка", "Стол в это время уже забронирован")
+        try:
+            services.book_table(
+                name=self.name_input.text(),
+                phone=self.phone_input.text(),
+                table_id=self.table_combo.currentData(),
+                reservation_date=self.date_edit.date().toPython().strftime("%Y-%m-%d"),
+                start_time=self.start_time.time().toPython().strftime("%H:%M"),
+                end_time=self.end_time.time().toPython().strftime("%H:%M")
+            )
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
             return
 
-        customer = customer_collection.find_one({"phone": phone})
-        if not customer:
-            customer = customer_collection.insert_one({"name": name, "phone": phone})
-            customer_id = customer["id"]
-        else:
-            customer_id = customer["id"]
-
-        reservation_collection.insert_one({
-            "tableId": table_id,
-            "customerId": customer_id,
-            "reservationDate": res_date_str,
-            "startTime": start.strftime("%H:%M"),
-            "endTime": end.strftime("%H:%M"),
-            "status": "confirmed"
-        })
-
         QMessageBox.information(self, "Успешно", "Бронирование создано")
         self.load_reservations()
         self.reservation_created.emit()
@@ -991,7 +1216,11 @@ class ReservationsTab(QWidget):
             return
         row = self.reservations_list.currentRow()
         res_id = self.reservations_list.item(row, 0).data(Qt.UserRole)
-        reservation_collection.update_one({"id": res_id}, {"$set": {"status": "cancelled"}})
+        try:
+            services.cancel_reservation(reservation_id=res_id)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
         QMessageBox.information(self, "Отмена", "Бронирование отменено")
         self.load_reservations()
         self.reservation_created.emit()
@@ -1005,7 +1234,11 @@ class ReservationsTab(QWidget):
         res_id = self.reservations_list.item(row, 0).data(Qt.UserRole)
         reply = QMessageBox.question(self, "Удалить", "Удалить выбранное бронирование?", QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            reservation_collection.delete_one({"id": res_id})
+            try:
+                services.delete_reservation(reservation_id=res_id)
+            except ServiceError as e:
+                QMessageBox.warning(self, "Ошибка", str(e))
+                return
             QMessageBox.information(self, "Удалено", "Бронирование удалено")
             self.load_reservations()
             self.reservation_created.emit()
@@ -1093,57 +1326,19 @@ class ReservationsTab(QWidget):
         layout.addRow(btn_box)
 
         def on_ok():
-            name = name_edit.text().strip()
-            phone = phone_edit.text().strip()
-            table_id = table_combo.currentData()
-            res_date = date_edit.date().toPython()
-            start = start_time.time().toPython()
-            end = end_time.time().toPython()
-
-            if not name or not phone or not table_id:
-                QMessageBox.warning(dialog, "Ошибка", "Заполните все поля")
-                return
-            if start >= end:
-                QMessageBox.warning(dialog, "Ошибка", "Время начала должно быть меньше конца")
-                return
-
-            res_date_str = res_date.strftime("%Y-%m-%d")
-
-            overlapping = reservation_collection.find_one({
-                "tableId": table_id,
-                "reservationDate": res_date_str,
-                "$or": [
-                    {"startTime": {"$lt": end.strftime("%H:%M")}, "endTime": {"$gt": start.strftime("%H:%M")}}
-                ],
-                "status": {"$ne": "cancelled"},
-                "id": {"$ne": res_id}
-            })
-            if overlapping:
-                QMessageBox.warning(dialog, "Ошибка", "Стол в это время уже забронирован")
-                return
-
-            customer = customer_collection.find_one({"phone": phone})
-            if customer:
-                customer_collection.update_one(
-                    {"id": customer["id"]},
-                    {"$set": {"name": name, "phone": phone}}
+            try:
+                services.update_reservation(
+                    reservation_id=res_id,
+                    name=name_edit.text(),
+                    phone=phone_edit.text(),
+                    table_id=table_combo.currentData(),
+                    reservation_date=date_edit.date().toPython().strftime("%Y-%m-%d"),
+                    start_time=start_time.time().toPython().strftime("%H:%M"),
+                    end_time=end_time.time().toPython().strftime("%H:%M")
                 )
-                customer_id = customer["id"]
-            else:
-                customer = customer_collection.insert_one({"name": name, "phone": phone})
-                customer_id = customer["id"]
-
-            reservation_collection.update_one(
-                {"id": res_id},
-                {"$set": {
-                    "tableId": table_id,
-                    "customerId": customer_id,
-                    "reservationDate": res_date_str,
-                    "startTime": start.strftime("%H:%M"),
-                    "endTime": end.strftime("%H:%M"),
-                    "status": "confirmed"
-                }}
-            )
+            except ServiceError as e:
+                QMessageBox.warning(dialog, "Ошибка", str(e))
+                return
             QMessageBox.information(dialog, "Успешно", "Бронирование обновлено")
             self.load_reservations()
             self.reservation_created.emit()
@@ -1163,12 +1358,25 @@ class OrdersTab(QWidget):
         layout = QVBoxLayout(self)
 
         self.orders_table = QTableWidget()
-        self.orders_table.setColumnCount(6)
+        self.orders_table.setColumnCount(7)
         self.orders_table.setHorizontalHeaderLabels([
-            "Клиент", "Стол", "Дата", "Блюда", "Статус", "Ответственный"
+            "Клиент", "Стол", "Дата", "Блюда", "Сумма", "Статус", "Ответственный"
         ])
 
+        self.filters = FilterBar("orderDate", {"status": ("Статус:", [
+            ("Открытые", {"$nin": ["cancelled", "paid"]}),
+            ("new", "new"), ("preparing", "preparing"), ("ready", "ready"),
+            ("delivered", "delivered"), ("cancelled", "cancelled"), ("paid", "paid")
+        ])})
+        self.paginator = Paginator()
+        self.filters.changed.connect(self.apply_filters)
+        self.paginator.page_changed.connect(self.load_orders)
+
+        self.loader = BackgroundLoader(self, self.query_orders, self.render_orders)
+        layout.addWidget(self.filters)
+        layout.addWidget(self.loader.label)
         layout.addWidget(self.orders_table)
+        layout.addWidget(self.paginator)
 
         order_button_style = """
             QPushButton {
@@ -1280,38 +1488,54 @@ class OrdersTab(QWidget):
         order_id = self.orders_table.item(row, 0).data(Qt.UserRole)
         reply = QMessageBox.question(self, "Удалить", "Удалить выбранный заказ?", QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            receipt_collection.delete_many({"orderId": order_id})
-            order_collection.delete_one({"id": order_id})
+            try:
+                services.delete_order(order_id=order_id)
+            except ServiceError as e:
+                QMessageBox.warning(self, "Ошибка", str(e))
+                return
             QMessageBox.information(self, "Удалено", "Заказ удален")
             self.load_orders()
             self.order_updated.emit()
 
+    def apply_filters(self):
+        self.paginator.reset()
+        self.load_orders()
+
     def load_orders(self):
+        self.loader.request(self.filters.query(), self.paginator.skip())
+
+    @staticmethod
+    def query_orders(query, skip):
+        # Из коллекции берём только заказы текущей страницы, строки — из read-model
+        # (или из самого документа, если read-model его ещё не получила)
+        total = order_collection.count(query)
+        rows = []
+        for order in order_collection.find(query, sort={"orderDate": -1}, skip=skip, limit=PAGE_SIZE):
+            row = order_view.row(order)
+            rows.append((
+                row["id"],
+                row["customerName"],
+                row["tableNumber"],
+                row["orderDate"],
+                row["dishesText"],
+                str(row["total"]),
+                row["status"],
+                row["waiterLogin"]
+            ))
+        return rows, total
+
+    def render_orders(self, result):
+        rows, total = result
+        self.paginator.set_total(total)
+        if not rows and total and self.paginator.skip() >= total:
+            self.load_orders()
+            return
         self.orders_table.setRowCount(0)
-        for order in order_collection.find():
-            row = self.orders_table.rowCount()
-            self.orders_table.insertRow(row)
-            customer = customer_collection.find_one({"id": order.get("customerId")})
-            table = table_collection.find_one({"id": order.get("tableId")})
-            
-            # Handle dishes data - it might be stored as a string or list
-            dishes = order.get("dishes", [])
-            if isinstance(dishes, str):
-                try:
-                    dishes = ast.literal_eval(dishes)
-                except (ValueError, SyntaxError):
-                    dishes = []
-            
-            dishes_text = ", ".join([f"{item['name']} x{item['quantity']}" for item in dishes]) if dishes else ""
-            
-            self.orders_table.setItem(row, 0, QTableWidgetItem(customer.get("name", "") if customer else ""))
-            self.orders_table.setItem(row, 1, QTableWidgetItem(str(table["tableNumber"]) if table else ""))
-            self.orders_table.setItem(row, 2, QTableWidgetItem(str(order.get("orderDate", ""))))
-            self.orders_table.setItem(row, 3, QTableWidgetItem(dishes_text))
-            self.orders_table.setItem(row, 4, QTableWidgetItem(order.get("status", "new")))
-            self.orders_table.setItem(row, 5, QTableWidgetItem(order.get("waiterLogin", "")))
-
-            self.orders_table.item(row, 0).setData(Qt.UserRole, order["id"])
+        self.orders_table.setRowCount(len(rows))
+        for row, (order_id, *values) in enumerate(rows):
+            for column, value in enumerate(values):
+                self.orders_table.setItem(row, column, QTableWidgetItem(value))
+            self.orders_table.item(row, 0).setData(Qt.UserRole, order_id)
 
     def create_order(self):
         dialog = OrderDialog(self.user)
@@ -1332,7 +1556,7 @@ class OrdersTab(QWidget):
             QMessageBox.warning(self, "Ошибка", "Заказ не найден")
             return
 
-        statuses = ["new", "preparing", "ready", "delivered", "cancelled", "paid"]
+        statuses = ORDER_STATUSES
         current_status = order.get("status", "new")
         try:
             current_index = statuses.index(current_status)
@@ -1340,7 +1564,11 @@ class OrdersTab(QWidget):
             current_index = 0
         next_status, ok = QInputDialog.getItem(self, "Изменить статус", "Новый статус", statuses, current_index, False)
         if ok and next_status:
-            order_collection.update_one({"id": order_id}, {"$set": {"status": next_status}})
+            try:
+                services.change_order_status(order_id=order_id, status=next_status)
+            except ServiceError as e:
+                QMessageBox.warning(self, "Ошибка", str(e))
+                return
             self.load_orders()
             self.order_updated.emit()
 
@@ -1351,34 +1579,12 @@ class OrdersTab(QWidget):
             return
         row = self.orders_table.currentRow()
         order_id = self.orders_table.item(row, 0).data(Qt.UserRole)
-        order = order_collection.find_one({"id": order_id})
-        if not order:
-            QMessageBox.warning(self, "Ошибка", "Заказ не найден")
-            return
-
-        existing = receipt_collection.find_one({"orderId": order_id})
-        if existing:
-            QMessageBox.information(self, "Инфо", "Счет на этот заказ уже выдан")
+        try:
+            services.create_receipt(order_id=order_id)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
             return
 
-        # Handle dishes data - it might be stored as a string or list
-        dishes = order.get("dishes", [])
-        if isinstance(dishes, str):
-            try:
-                dishes = ast.literal_eval(dishes)
-            except (ValueError, SyntaxError):
-                dishes = []
-
-        amount = sum(item["price"] * item["quantity"] for item in dishes)
-
-        receipt_collection.insert_one({
-            "orderId": order["id"],
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "amount": amount,
-            "paid": False,
-            "waiterLogin": order.get("waiterLogin", "")
-        })
-
         QMessageBox.information(self, "Успешно", "Счет выдан")
         self.receipt_created.emit()
 
@@ -1397,8 +1603,8 @@ class OrdersTab(QWidget):
         if order.get("status") in ["cancelled", "paid"]:
             QMessageBox.warning(self, "Ошибка", "Нельзя редактировать отменённый или оплаченный заказ")
             return
-        receipt = receipt_collection.find_one({"orderId": order_id})
-        if receipt:
+        # Сервис проверит ещё раз; здесь — чтобы не открывать диалог зря
+        if receipt_view.by_order.get(order_id):
             QMessageBox.warning(self, "Ошибка", "Нельзя редактировать заказ, по которому уже выдан счет")
             return
 
@@ -1425,16 +1631,8 @@ class OrdersTab(QWidget):
             lw_item.setData(Qt.UserRole, item)
             dishes_list.addItem(lw_item)
 
-        # Handle dishes data - it might be stored as a string or list
-        order_dishes = order.get("dishes", [])
-        if isinstance(order_dishes, str):
-            try:
-                order_dishes = ast.literal_eval(order_dishes)
-            except (ValueError, SyntaxError):
-                order_dishes = []
-
         selected_dishes = []
-        for d in order_dishes:
+        for d in parse_dishes(order.get("dishes", [])):
             for item in menu_items:
                 if item["name"] == d["name"]:
                     selected_dishes.append({"item": item, "quantity": d["quantity"]})
@@ -1565,32 +1763,18 @@ class OrdersTab(QWidget):
         layout.addRow(btn_box)
 
         def on_ok():
-            name = name_edit.text().strip()
-            phone = phone_edit.text().strip()
-            table_id = table_combo.currentData()
-
-            if not name or not phone or not table_id:
-                QMessageBox.warning(dialog, "Ошибка", "Заполните все поля")
-                return
-            if not selected_dishes:
-                QMessageBox.warning(dialog, "Ошибка", "Добавьте хотя бы одно блюдо")
+            dishes = [{"name": d["item"]["name"], "price": d["item"]["price"], "quantity": d["quantity"]} for d in selected_dishes]
+            try:
+                services.update_order(
+                    order_id=order_id,
+                    name=name_edit.text(),
+                    phone=phone_edit.text(),
+                    table_id=table_combo.currentData(),
+                    dishes=dishes
+                )
+            except ServiceError as e:
+                QMessageBox.warning(dialog, "Ошибка", str(e))
                 return
-
-            customer = customer_collection.find_one({"phone": phone})
-            if not customer:
-                customer = customer_collection.insert_one({"name": name, "phone": phone})
-                customer_id = customer["id"]
-            else:
-                customer_id = customer["id"]
-
-            order_collection.update_one(
-                {"id": order_id},
-                {"$set": {
-                    "customerId": customer_id,
-                    "tableId": table_id,
-                    "dishes": [{"name": d["item"]["name"], "price": d["item"]["price"], "quantity": d["quantity"]} for d in selected_dishes]
-                }}
-            )
             QMessageBox.information(dialog, "Успешно", "Заказ обновлен")
             self.load_orders()
             self.order_updated.emit()
@@ -1600,6 +1784,134 @@ class OrdersTab(QWidget):
         btn_cancel.clicked.connect(dialog.reject)
         dialog.exec()
 
+class KitchenTab(QWidget):
+    # Экран кухни: колонки по статусам из kitchen_queue. При смене статуса
+    # заказа переставляется только его карточка, остальные не трогаются
+    order_updated = Signal()
+    ticket_moved = Signal(object, object, object)
+    TITLES = {"new": "Новые", "preparing": "Готовятся", "ready": "Готовы к выдаче"}
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout(self)
+
+        columns = QHBoxLayout()
+        self.lists = {}
+        # Ключи сортировки карточек в колонке, в том же порядке, что и строки списка
+        self.keys = {}
+        self.items = {}
+        for status in kitchen_queue.STATUSES:
+            column = QVBoxLayout()
+            title = QLabel(self.TITLES[status])
+            title.setStyleSheet("font-size: 15px; font-weight: bold; margin: 5px;")
+            ticket_list = QListWidget()
+            ticket_list.itemSelectionChanged.connect(partial(self.clear_other_selections, status))
+            column.addWidget(title)
+            column.addWidget(ticket_list)
+            columns.addLayout(column)
+            self.lists[status] = ticket_list
+            self.keys[status] = []
+
+        btn_next = QPushButton("Следующий этап")
+        btn_next.setStyleSheet("""
+            QPushButton {
+                padding: 8px 16px;
+                font-size: 14px;
+                border-radius: 4px;
+                margin: 5px;
+                min-width: 120px;
+                background-color: #4CAF50;
+                color: white;
+                border: 1px solid #45a049;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+            QPushButton:pressed {
+                background-color: #3e8e41;
+            }
+        """)
+        btn_next.clicked.connect(self.advance_ticket)
+
+        layout.addLayout(columns)
+        layout.addWidget(btn_next)
+
+        # Сигнал доставляет перемещение в GUI-поток, откуда бы ни пришла запись
+        self.ticket_moved.connect(self.move_ticket)
+        self.listener = self.ticket_moved.emit
+        kitchen_queue.subscribe(self.listener)
+        self.destroyed.connect(partial(kitchen_queue.unsubscribe, self.listener))
+        self.load_queue()
+
+    def detach(self):
+        # Окно отписывает вкладку при закрытии: Qt может удалить виджет гораздо позже,
+        # а до тех пор очередь слала бы перемещения в закрытое окно
+        kitchen_queue.unsubscribe(self.listener)
+
+    @staticmethod
+    def ticket_key(order):
+        return (str(order.get("orderDate", "")), int(order["id"]))
+
+    @staticmethod
+    def ticket_text(order):
+        row = order_view.row(order)
+        return (f"№{order['id']}  Стол {row['tableNumber']}  {str(order.get('orderDate', ''))[11:16]}\n"
+                f"{row['dishesText']}")
+
+    def load_queue(self):
+        self.items = {}
+        for status, ticket_list in self.lists.items():
+            ticket_list.clear()
+            self.keys[status] = []
+            for order in kitchen_queue.tickets(status):
+                self.add_ticket(status, order)
+
+    def add_ticket(self, status, order):
+        key = self.ticket_key(order)
+        position = bisect_left(self.keys[status], key)
+        self.keys[status].insert(position, key)
+        item = QListWidgetItem(self.ticket_text(order))
+        item.setData(Qt.UserRole, (order["id"], status, key))
+        self.lists[status].insertItem(position, item)
+        self.items[order["id"]] = item
+
+    def remove_ticket(self, order_id):
+        item = self.items.pop(order_id, None)
+        if item is None:
+            return
+        _, status, key = item.data(Qt.UserRole)
+        position = bisect_left(self.keys[status], key)
+        del self.keys[status][position]
+        self.lists[status].takeItem(position)
+
+    def move_ticket(self, order_id, old_status, new_status):
+        if order_id is None:
+            self.load_queue()
+            return
+        self.remove_ticket(order_id)
+        order = kitchen_queue.buckets.get(new_status, {}).get(order_id)
+        if order is not None:
+            self.add_ticket(new_status, order)
+
+    def clear_other_selections(self, status):
+        if self.lists[status].selectedItems():
+            for other, ticket_list in self.lists.items():
+                if other != status:
+                    ticket_list.clearSelection()
+
+    def advance_ticket(self):
+        selected = [item for ticket_list in self.lists.values() for item in ticket_list.selectedItems()]
+        if not selected:
+            QMessageBox.warning(self, "Ошибка", "Выберите заказ")
+            return
+        order_id, status, _ = selected[0].data(Qt.UserRole)
+        try:
+            services.change_order_status(order_id=order_id, status=kitchen_queue.next_status(status))
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        self.order_updated.emit()
+
 class OrderDialog(QDialog):
     def __init__(self, user):
         super().__init__()
@@ -1701,14 +2013,13 @@ class OrderDialog(QDialog):
         now = datetime.now()
         today = now.date()
         current_time = now.time()
-        for table in table_collection.find({"isAvailable": True}):
-            reservations = reservation_collection.find({
-                "tableId": table["id"],
-                "reservationDate": today.strftime("%Y-%m-%d"),
-                "status": {"$ne": "cancelled"}
-            })
+        tables = table_collection.find({"isAvailable": True})
+        reservations = table_reservations.execute_many(
+            "table_id", [table["id"] for table in tables], date=today.strftime("%Y-%m-%d")
+        )
+        for table in tables:
             busy_now = False
-            for res in reservations:
+            for res in reservations[table["id"]]:
                 start = datetime.strptime(res["startTime"], "%H:%M").time()
                 end = datetime.strptime(res["endTime"], "%H:%M").time()
                 if start <= current_time < end:
@@ -1757,33 +2068,19 @@ class OrderDialog(QDialog):
             self.order_dishes_list.addItem(f"{d['item']['name']} x{d['quantity']}")
 
     def submit_order(self):
-        name = self.customer_name.text().strip()
-        phone = self.customer_phone.text().strip()
-        table_id = self.table_combo.currentData()
-
-        if not name or not phone or not table_id:
-            QMessageBox.warning(self, "Ошибка", "Заполните все поля")
-            return
-        if not self.selected_dishes:
-            QMessageBox.warning(self, "Ошибка", "Добавьте хотя бы одно блюдо")
+        dishes = [{"name": d["item"]["name"], "price": d["item"]["price"], "quantity": d["quantity"]} for d in self.selected_dishes]
+        try:
+            services.submit_order(
+                name=self.customer_name.text(),
+                phone=self.customer_phone.text(),
+                table_id=self.table_combo.currentData(),
+                dishes=dishes,
+                waiter_login=self.user["login"]
+            )
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
             return
 
-        customer = customer_collection.find_one({"phone": phone})
-        if not customer:
-            customer = customer_collection.insert_one({"name": name, "phone": phone})
-            customer_id = customer["id"]
-        else:
-            customer_id = customer["id"]
-
-        order_collection.insert_one({
-            "customerId": customer_id,
-            "tableId": table_id,
-            "orderDate": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "dishes": [{"name": d["item"]["name"], "price": d["item"]["price"], "quantity": d["quantity"]} for d in self.selected_dishes],
-            "status": "new",
-            "waiterLogin": self.user["login"]
-        })
-
         QMessageBox.information(self, "Успешно", "Заказ создан")
         self.accept()
 
@@ -1841,7 +2138,18 @@ class ReceiptsTab(QWidget):
             }
         """)
         
+        self.filters = FilterBar("date", {"paid": ("Оплата:", [
+            ("Оплаченные", True), ("Неоплаченные", False)
+        ])})
+        self.paginator = Paginator()
+        self.filters.changed.connect(self.apply_filters)
+        self.paginator.page_changed.connect(self.load_receipts)
+
+        self.loader = BackgroundLoader(self, self.query_receipts, self.render_receipts)
+        layout.addWidget(self.filters)
+        layout.addWidget(self.loader.label)
         layout.addWidget(self.receipts_table)
+        layout.addWidget(self.paginator)
         layout.addWidget(btn_create_total)
         layout.addWidget(btn_pay)
 
@@ -1850,30 +2158,43 @@ class ReceiptsTab(QWidget):
 
         self.load_receipts()
 
+    def apply_filters(self):
+        self.paginator.reset()
+        self.load_receipts()
+
     def load_receipts(self):
+        self.loader.request(self.filters.query(), self.paginator.skip())
+
+    @staticmethod
+    def query_receipts(query, skip):
+        total = receipt_collection.count(query)
+        rows = []
+        for receipt in receipt_collection.find(query, sort={"date": -1}, skip=skip, limit=PAGE_SIZE):
+            row = receipt_view.row(receipt)
+            rows.append((
+                row["id"],
+                row["customerName"],
+                row["date"],
+                ",".join(row["orderIds"]),
+                str(row["amount"]),
+                "Да" if row["paid"] else "Нет",
+                row["waiterLogin"],
+                row["closedBy"]
+            ))
+        return rows, total
+
+    def render_receipts(self, result):
+        rows, total = result
+        self.paginator.set_total(total)
+        if not rows and total and self.paginator.skip() >= total:
+            self.load_receipts()
+            return
         self.receipts_table.setRowCount(0)
-        for receipt in receipt_collection.find():
-            row = self.receipts_table.rowCount()
-            self.receipts_table.insertRow(row)
-
-            order = None
-            customer = None
-            if "orderId" in receipt:
-                order = order_collection.find_one({"id": receipt["orderId"]})
-                if order:
-                    customer = customer_collection.find_one({"id": order["customerId"]})
-            elif "customerId" in receipt:
-                customer = customer_collection.find_one({"id": receipt["customerId"]})
-
-            self.receipts_table.setItem(row, 0, QTableWidgetItem(customer.get("name", "") if customer else ""))
-            self.receipts_table.setItem(row, 1, QTableWidgetItem(str(receipt.get("date", ""))))
-            self.receipts_table.setItem(row, 2, QTableWidgetItem(str(order["id"]) if order else ""))
-            self.receipts_table.setItem(row, 3, QTableWidgetItem(str(receipt.get("amount", 0))))
-            self.receipts_table.setItem(row, 4, QTableWidgetItem("Да" if receipt.get("paid", False) else "Нет"))
-            self.receipts_table.setItem(row, 5, QTableWidgetItem(receipt.get("waiterLogin", "")))
-            self.receipts_table.setItem(row, 6, QTableWidgetItem(receipt.get("closedBy", "") if receipt.get("paid") else ""))
-
-            self.receipts_table.item(row, 0).setData(Qt.UserRole, receipt["id"])
+        self.receipts_table.setRowCount(len(rows))
+        for row, (receipt_id, *values) in enumerate(rows):
+            for column, value in enumerate(values):
+                self.receipts_table.setItem(row, column, QTableWidgetItem(value))
+            self.receipts_table.item(row, 0).setData(Qt.UserRole, receipt_id)
 
     def pay_receipt(self):
         selected = self.receipts_table.selectedItems()
@@ -1882,28 +2203,12 @@ class ReceiptsTab(QWidget):
             return
         row = self.receipts_table.currentRow()
         receipt_id = self.receipts_table.item(row, 0).data(Qt.UserRole)
-        receipt = receipt_collection.find_one({"id": receipt_id})
-        if not receipt:
-            QMessageBox.warning(self, "Ошибка", "Счет не найден")
-            return
-        if receipt.get("paid", False):
-            QMessageBox.information(self, "Инфо", "Счет уже оплачен")
-            return
-
         closed_by = getattr(self, "user", {}).get("login", "Неизвестно")
-
-        receipt_collection.update_one(
-            {"id": receipt_id},
-            {"$set": {"paid": True, "paymentDate": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "closedBy": closed_by}}
-        )
-
-        if "orderIds" in receipt:
-            order_collection.update_many(
-                {"id": {"$in": receipt["orderIds"]}},
-                {"$set": {"status": "paid"}}
-            )
-        elif "orderId" in receipt:
-            order_collection.update_one({"id": receipt["orderId"]}, {"$set": {"status": "paid"}})
+        try:
+            services.pay_receipt(receipt_id=receipt_id, closed_by=closed_by)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
 
         QMessageBox.information(self, "Оплата", "Счет оплачен")
         self.load_receipts()
@@ -1919,46 +2224,19 @@ class ReceiptsTab(QWidget):
             QMessageBox.warning(self, "Ошибка", "Выберите счет клиента")
             return
         row = self.receipts_table.currentRow()
-        customer_name = self.receipts_table.item(row, 0).text()
-        customer = customer_collection.find_one({"name": customer_name})
-        if not customer:
+        receipt_id = self.receipts_table.item(row, 0).data(Qt.UserRole)
+        receipt_row = receipt_view.rows.get(receipt_id)
+        customer_id = receipt_row["customerId"] if receipt_row else None
+        if not customer_id:
             QMessageBox.warning(self, "Ошибка", "Клиент не найден")
             return
 
-        orders = list(order_collection.find({
-            "customerId": customer["id"],
-            "status": {"$ne": "paid"}
-        }))
-        if not orders:
-            QMessageBox.information(self, "Инфо", "Нет неоплаченных заказов для этого клиента")
-            return
-
-        order_ids = [o["id"] for o in orders]
-        existing = receipt_collection.find_one({"orderIds": ",".join(order_ids)})
-        if existing:
-            QMessageBox.information(self, "Инфо", "Общий счет уже создан")
+        try:
+            services.create_combined_receipt(customer_id=customer_id)
+        except ServiceError as e:
+            QMessageBox.information(self, "Инфо", str(e))
             return
 
-        amount = 0
-        for order in orders:
-            # Handle dishes data - it might be stored as a string or list
-            dishes = order.get("dishes", [])
-            if isinstance(dishes, str):
-                try:
-                    dishes = ast.literal_eval(dishes)
-                except (ValueError, SyntaxError):
-                    dishes = []
-            amount += sum(item["price"] * item["quantity"] for item in dishes)
-
-        receipt_collection.insert_one({
-            "orderIds": ",".join(order_ids),
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "amount": amount,
-            "paid": False,
-            "waiterLogin": orders[0].get("waiterLogin", "") if orders else "",
-            "customerId": customer["id"]
-        })
-
         QMessageBox.information(self, "Успешно", "Общий счет создан")
         self.load_receipts()
 
@@ -2026,12 +2304,18 @@ class MenuTab(QWidget):
             }
         """)
 
+        btn_import = QPushButton("Импорт меню")
+        btn_import.setStyleSheet(button_style)
+
         btn_layout = QHBoxLayout()
         if is_admin:
             btn_layout.addWidget(btn_add)
             btn_layout.addWidget(btn_edit)
             btn_layout.addWidget(btn_delete)
+            btn_layout.addWidget(btn_import)
 
+        self.loader = BackgroundLoader(self, self.query_menu, self.render_menu)
+        layout.addWidget(self.loader.label)
         layout.addWidget(self.menu_table)
         if is_admin:
             layout.addLayout(btn_layout)
@@ -2040,24 +2324,38 @@ class MenuTab(QWidget):
             btn_add.clicked.connect(self.add_item)
             btn_edit.clicked.connect(self.edit_item)
             btn_delete.clicked.connect(self.delete_item)
+            btn_import.clicked.connect(self.import_menu)
 
         self.setLayout(layout)
         self.load_menu()
 
     def load_menu(self):
-        self.menu_table.setRowCount(0)
+        self.loader.request()
+
+    @staticmethod
+    def query_menu():
+        rows = []
         for item in menu_collection.find():
-            row = self.menu_table.rowCount()
-            self.menu_table.insertRow(row)
-            self.menu_table.setItem(row, 0, QTableWidgetItem(item.get("name", "")))
-            self.menu_table.setItem(row, 1, QTableWidgetItem(item.get("description", "")))
-            self.menu_table.setItem(row, 2, QTableWidgetItem(str(item.get("price", ""))))
-            self.menu_table.setItem(row, 3, QTableWidgetItem(str(item.get("category", ""))))
             ingredients = item.get("ingredients", [])
             if isinstance(ingredients, str):
                 ingredients = ingredients.split(',')
-            self.menu_table.setItem(row, 4, QTableWidgetItem(", ".join(ingredients)))
-            self.menu_table.item(row, 0).setData(Qt.UserRole, item["id"])
+            rows.append((
+                item["id"],
+                item.get("name", ""),
+                item.get("description", ""),
+                str(item.get("price", "")),
+                str(item.get("category", "")),
+                ", ".join(ingredients)
+            ))
+        return rows
+
+    def render_menu(self, rows):
+        self.menu_table.setRowCount(0)
+        self.menu_table.setRowCount(len(rows))
+        for row, (item_id, *values) in enumerate(rows):
+            for column, value in enumerate(values):
+                self.menu_table.setItem(row, column, QTableWidgetItem(value))
+            self.menu_table.item(row, 0).setData(Qt.UserRole, item_id)
 
     def add_item(self):
         dialog = QDialog(self)
@@ -2119,16 +2417,17 @@ class MenuTab(QWidget):
         layout.addRow(btn_box)
 
         def on_ok():
-            if not name_edit.text().strip():
-                QMessageBox.warning(dialog, "Ошибка", "Введите название блюда")
+            try:
+                services.add_menu_item(
+                    name=name_edit.text(),
+                    description=desc_edit.text(),
+                    price=price_edit.value(),
+                    category=category_edit.text(),
+                    ingredients=ingredients_edit.text()
+                )
+            except ServiceError as e:
+                QMessageBox.warning(dialog, "Ошибка", str(e))
                 return
-            menu_collection.insert_one({
-                "name": name_edit.text().strip(),
-                "description": desc_edit.text().strip(),
-                "price": price_edit.value(),
-                "category": category_edit.text().strip(),
-                "ingredients": ingredients_edit.text().strip()
-            })
             self.load_menu()
             dialog.accept()
 
@@ -2136,6 +2435,10 @@ class MenuTab(QWidget):
         btn_cancel.clicked.connect(dialog.reject)
         dialog.exec()
 
+    def import_menu(self):
+        if import_from_file(self, "menu"):
+            self.load_menu()
+
     def edit_item(self):
         selected = self.menu_table.selectedItems()
         if not selected:
@@ -2207,19 +2510,18 @@ class MenuTab(QWidget):
         layout.addRow(btn_box)
 
         def on_ok():
-            if not name_edit.text().strip():
-                QMessageBox.warning(dialog, "Ошибка", "Введите название блюда")
+            try:
+                services.update_menu_item(
+                    item_id=item_id,
+                    name=name_edit.text(),
+                    description=desc_edit.text(),
+                    price=price_edit.value(),
+                    category=category_edit.text(),
+                    ingredients=ingredients_edit.text()
+                )
+            except ServiceError as e:
+                QMessageBox.warning(dialog, "Ошибка", str(e))
                 return
-            menu_collection.update_one(
-                {"id": item_id},
-                {"$set": {
-                    "name": name_edit.text().strip(),
-                    "description": desc_edit.text().strip(),
-                    "price": price_edit.value(),
-                    "category": category_edit.text().strip(),
-                    "ingredients": ingredients_edit.text().strip()
-                }}
-            )
             self.load_menu()
             dialog.accept()
 
@@ -2236,40 +2538,228 @@ class MenuTab(QWidget):
         item_id = self.menu_table.item(row, 0).data(Qt.UserRole)
         reply = QMessageBox.question(self, "Удалить", "Удалить выбранное блюдо?", QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            menu_collection.delete_one({"id": item_id})
+            try:
+                services.delete_menu_item(item_id=item_id)
+            except ServiceError as e:
+                QMessageBox.warning(self, "Ошибка", str(e))
+                return
             self.load_menu()
 
+class ExportDialog(QDialog):
+    KINDS = [("Чеки", "receipts"), ("Заказы", "orders"), ("Бронирования", "reservations")]
+    FORMATS = [("CSV", "csv"), ("JSON Lines", "jsonl")]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Экспорт данных")
+        layout = QFormLayout(self)
+
+        self.kind_combo = QComboBox()
+        for text, kind in self.KINDS:
+            self.kind_combo.addItem(text, kind)
+        self.format_combo = QComboBox()
+        for text, fmt in self.FORMATS:
+            self.format_combo.addItem(text, fmt)
+        self.date_from = QDateEdit()
+        self.date_to = QDateEdit()
+        for edit in (self.date_from, self.date_to):
+            edit.setCalendarPopup(True)
+            edit.setDate(date.today())
+        self.date_from.setDate(date.today() - timedelta(days=30))
+
+        btn_export = QPushButton("Экспортировать")
+        btn_export.clicked.connect(self.accept)
+        layout.addRow("Данные:", self.kind_combo)
+        layout.addRow("Формат:", self.format_combo)
+        layout.addRow("С:", self.date_from)
+        layout.addRow("По:", self.date_to)
+        layout.addRow(btn_export)
+
+    def params(self):
+        return (
+            self.kind_combo.currentData(),
+            self.format_combo.currentData(),
+            self.date_from.date().toPython().strftime("%Y-%m-%d"),
+            self.date_to.date().toPython().strftime("%Y-%m-%d")
+        )
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}:{seconds:02d}"
+
 class StatsTab(QWidget):
+    # (название, ключ группировки, заголовок первого столбца)
+    REPORTS = [
+        ("Официанты", None, "Официант"),
+        ("Выручка по дням", "day", "День"),
+        ("Выручка по часам", "hour", "Час"),
+        ("Выручка по столам", "table", "Стол"),
+        ("Выручка по блюдам", "dish", "Блюдо"),
+        ("Выручка по категориям", "category", "Категория"),
+        ("Выручка по официантам", "waiter", "Официант"),
+        ("Блюда: по количеству", "dishes:quantity", "Блюдо"),
+        ("Блюда: по выручке", "dishes:revenue", "Блюдо"),
+        ("Блюда: по тренду", "dishes:trend", "Блюдо"),
+        ("Время обслуживания: по часам", "latency:hour", "Час"),
+        ("Время обслуживания: по официантам", "latency:waiter", "Официант")
+    ]
+
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout(self)
 
-        self.stats_table = QTableWidget()
-        self.stats_table.setColumnCount(2)
-        self.stats_table.setHorizontalHeaderLabels(["Официант", "Закрыто счетов"])
+        controls = QHBoxLayout()
+        self.report_combo = QComboBox()
+        for text, key, title in self.REPORTS:
+            self.report_combo.addItem(text, (key, title))
+        self.period_check = QCheckBox("За период")
+        self.date_from = QDateEdit()
+        self.date_to = QDateEdit()
+        for edit in (self.date_from, self.date_to):
+            edit.setCalendarPopup(True)
+            edit.setDate(date.today())
+        controls.addWidget(QLabel("Отчёт:"))
+        controls.addWidget(self.report_combo)
+        controls.addWidget(self.period_check)
+        controls.addWidget(self.date_from)
+        controls.addWidget(QLabel("—"))
+        controls.addWidget(self.date_to)
+        controls.addStretch()
+        btn_export = QPushButton("Экспорт...")
+        btn_export.clicked.connect(self.export_data)
+        controls.addWidget(btn_export)
+        if sales is None:
+            # Отчёты на NumPy отключаем, остальные работают без него
+            for i, (text, key, title) in enumerate(self.REPORTS):
+                if key is not None and not key.startswith(("dishes:", "latency:")):
+                    self.report_combo.model().item(i).setEnabled(False)
+            self.report_combo.setToolTip("Для отчётов по продажам установите NumPy")
 
+        self.stats_table = QTableWidget()
+        self.stats_table.setColumnCount(4)
+        self.stats_table.setHorizontalHeaderLabels(["Официант", "Закрыто счетов", "Выручка", "Средний чек"])
+
+        self.loader = BackgroundLoader(self, self.query_stats, self.render_stats)
+        self.exporter = BackgroundLoader(self, self.run_export, self.export_finished)
+        self.exporter.label.setText("Экспорт...")
+        layout.addLayout(controls)
+        layout.addWidget(self.loader.label)
+        layout.addWidget(self.exporter.label)
         layout.addWidget(self.stats_table)
         self.setLayout(layout)
+
+        self.report_combo.currentIndexChanged.connect(lambda *args: self.load_stats())
+        for signal in (self.period_check.toggled, self.date_from.dateChanged, self.date_to.dateChanged):
+            signal.connect(lambda *args: self.load_stats())
         self.load_stats()
 
     def load_stats(self):
+        start = end = None
+        if self.period_check.isChecked():
+            start = self.date_from.date().toPython().strftime("%Y-%m-%d")
+            end = (self.date_to.date().toPython() + timedelta(days=1)).strftime("%Y-%m-%d")
+        self.loader.request(self.report_combo.currentData(), start, end)
+
+    @staticmethod
+    def query_stats(report, start, end):
+        report, title = report
+        if report is None:
+            headers = ["Официант", "Закрыто счетов", "Выручка", "Средний чек"]
+            return headers, [(
+                str(stat["waiter"]),
+                str(stat["receiptsClosed"]),
+                f"{stat['revenue']:.2f}",
+                f"{stat['averageBill']:.2f}"
+            ) for stat in waiter_stats.list()]
+
+        if report.startswith("dishes:"):
+            # Без периода показываем последние 30 дней и сравниваем с 30 днями до них
+            end = end or (date.today() + timedelta(days=1)).strftime("%Y-%m-%d")
+            start = start or (date.today() - timedelta(days=29)).strftime("%Y-%m-%d")
+            headers = [title, "Продано", "Выручка", "Пред. период", "Тренд"]
+            return headers, [(
+                row["dish"],
+                str(row["quantity"]),
+                f"{row['revenue']:.2f}",
+                str(row["previousQuantity"]),
+                "новое" if row["trend"] is None else f"{row['trend']:+.0f}%"
+            ) for row in order_lines.dish_performance(start, end, sort_by=report.split(":")[1])]
+
+        if report.startswith("latency:"):
+            headers = [title, "Этап", "Замеров", "p50", "p95", "p99"]
+            return headers, [
+                (label, stage, str(count), *(format_duration(seconds) for seconds in percentiles))
+                for label, stage, count, *percentiles in service_times.percentiles(report.split(":")[1], start, end)
+            ]
+
+        if report == "day":
+            groups = sales.revenue_by_day(start, end)
+        elif report == "hour":
+            groups = sales.revenue_by_hour(start, end)
+        else:
+            groups = sales.revenue_by(report, start, end)
+        headers = [title, "Выручка", "Продано позиций"]
+        return headers, [(label, f"{revenue:.2f}", str(quantity)) for label, revenue, quantity in groups]
+
+    def render_stats(self, result):
+        headers, rows = result
         self.stats_table.setRowCount(0)
-        stats = receipt_collection.aggregate([
-            {"$match": {"paid": True, "closedBy": {"$ne": None}}},
-            {"$group": {"_id": "$closedBy", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ])
-        for stat in stats:
-            row = self.stats_table.rowCount()
-            self.stats_table.insertRow(row)
-            self.stats_table.setItem(row, 0, QTableWidgetItem(str(stat["_id"])))
-            self.stats_table.setItem(row, 1, QTableWidgetItem(str(stat["count"])))
+        self.stats_table.setColumnCount(len(headers))
+        self.stats_table.setHorizontalHeaderLabels(headers)
+        self.stats_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.stats_table.setItem(row, column, QTableWidgetItem(value))
 
         if hasattr(self.parent(), "stats_tab"):
             self.parent().stats_tab.load_stats()
 
+    def export_data(self):
+        dialog = ExportDialog(self)
+        if not dialog.exec():
+            return
+        kind, fmt, start, end = dialog.params()
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить выгрузку", f"{kind}_{start}_{end}.{fmt}", "Все файлы (*)"
+        )
+        if filename:
+            self.exporter.request(kind, filename, fmt, start, end)
+
+    @staticmethod
+    def run_export(kind, filename, fmt, start, end):
+        return filename, export_to_file(kind, filename, fmt, start, end, collection=loaded_collection(kind))
+
+    def export_finished(self, result):
+        filename, (count, seconds, skipped) = result
+        warning = f"\n{skipped_warning(skipped)}" if skipped else ""
+        QMessageBox.information(self, "Экспорт", f"Экспортировано {throughput(count, seconds)}\n{filename}{warning}")
+
+# Что замерять: методы вкладок (загрузка, отрисовка, кнопки) и переключение вкладок
+MONITORED = [TablesTab, ReservationsTab, OrdersTab, ReceiptsTab, MenuTab, StatsTab]
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    monitor = None
+    if GUI_MONITOR:
+        from gui_monitor import ResponsivenessMonitor
+        monitor = ResponsivenessMonitor("gui_report.txt" if GUI_MONITOR == "1" else GUI_MONITOR)
+        for cls in MONITORED:
+            monitor.instrument(cls)
+        monitor.instrument(MainWindow, ["show_section"])
+        BackgroundLoader.monitor = monitor
+    if database.SERVER_URL:
+        # Изменения других терминалов приходят потоком событий и применяются в GUI-потоке
+        from remote import get_client
+        invoker = GuiInvoker()
+        client = get_client()
+        client.on_change = remote_changes.add
+        client.start_events(invoker.dispatch)
     window = LoginWindow()
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    if database.SERVER_URL:
+        client.stop_events()
+    if monitor is not None:
+        monitor.write_report()
+    flush_pool.waitForDone()
+    sys.exit(exit_code)
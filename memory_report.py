@@ -0,0 +1,191 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+import database
+from database import COLLECTIONS, iter_rows, read_headers
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")
+    ])
+
+def traced():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+def intern_values(row):
+    return {key: sys.intern(value) if isinstance(value, str) else value for key, value in row.items()}
+
+# Варианты хранения строк коллекции: каждый строится заново из файла,
+# чтобы в замер попали и сами значения, а не только контейнеры
+REPRESENTATIONS = [
+    ("dict (сейчас)", lambda path, headers: list(iter_rows(path))),
+    ("dict + intern", lambda path, headers: [intern_values(row) for row in iter_rows(path)]),
+    ("tuple", lambda path, headers: [tuple(row.get(header) for header in headers) for row in iter_rows(path)]),
+    ("столбцы", lambda path, headers: columns(iter_rows(path), headers)),
+    ("строки файла", lambda path, headers: raw_lines(path))
+]
+
+def columns(rows, headers):
+    result = {header: [] for header in headers}
+    for row in rows:
+        for header in headers:
+            result[header].append(row.get(header))
+    return result
+
+def raw_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.readlines()[1:]
+
+def measure_collections():
+    # Память каждой коллекции: строки с индексом id и остальные индексы отдельно
+    results = []
+    for name, (filename, indexes) in COLLECTIONS.items():
+        before = traced()
+        collection = database.TextFileDatabase(filename)
+        loaded = traced()
+        for field, ordered in indexes:
+            collection.create_index(field, ordered=ordered)
+        indexed = traced()
+        # Дальше коллекцией пользуются read-model, как в окне
+        setattr(database, name, collection)
+        rows = len(collection.data)
+        results.append({
+            "collection": name,
+            "file": filename,
+            "rows": rows,
+            "fileBytes": os.path.getsize(collection.filename) if os.path.exists(collection.filename) else 0,
+            "dataBytes": loaded - before,
+            "indexBytes": indexed - loaded,
+            "bytesPerRow": round((indexed - before) / rows) if rows else 0
+        })
+    return results
+
+def measure_read_models():
+    before = traced()
+    import read_models
+    return traced() - before
+
+def measure_representations():
+    results = []
+    for name, (filename, indexes) in COLLECTIONS.items():
+        path = os.path.join(database.DATA_DIR, filename)
+        if not os.path.exists(path):
+            continue
+        headers = read_headers(path)
+        row = {"collection": name}
+        for title, build in REPRESENTATIONS:
+            before = traced()
+            data = build(path, headers)
+            row[title] = traced() - before
+            del data
+        results.append(row)
+    return results
+
+def measure_reloads(count, top):
+    # Повторные загрузки вкладок (без окна): рост памяти после них — кандидат в утечки
+    from main import TablesTab, ReservationsTab, OrdersTab, ReceiptsTab, StatsTab
+    from datetime import date, time
+
+    def reload_tabs():
+        TablesTab.query_tables()
+        ReservationsTab.query_free_tables(date.today(), time(18, 0), time(20, 0))
+        ReservationsTab.query_reservations()
+        OrdersTab.query_orders({}, 0)
+        ReceiptsTab.query_receipts({}, 0)
+        StatsTab.query_stats((None, "Официант"), None, None)
+
+    reload_tabs()
+    gc.collect()
+    before = take_snapshot()
+    start = traced()
+    for _ in range(count):
+        reload_tabs()
+    growth = traced() - start
+    after = take_snapshot()
+    diff = [stat for stat in after.compare_to(before, "lineno") if stat.size_diff > 0][:top]
+    return growth, [(str(stat.traceback[0]), stat.size_diff, stat.count_diff) for stat in diff]
+
+def top_sites(top):
+    return [(str(stat.traceback[0]), stat.size, stat.count) for stat in take_snapshot().statistics("lineno")[:top]]
+
+def format_bytes(size):
+    for unit in ("Б", "КБ", "МБ"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} ГБ"
+
+def print_report(report):
+    print(f"{'Коллекция':<26} {'Строк':>8} {'Файл':>10} {'Строки':>10} {'Индексы':>10} {'На строку':>10}")
+    for row in report["collections"]:
+        print(f"{row['collection']:<26} {row['rows']:>8} {format_bytes(row['fileBytes']):>10} "
+              f"{format_bytes(row['dataBytes']):>10} {format_bytes(row['indexBytes']):>10} {format_bytes(row['bytesPerRow']):>10}")
+    total = sum(row["dataBytes"] + row["indexBytes"] for row in report["collections"])
+    print(f"Всего коллекции: {format_bytes(total)}")
+    if "readModels" in report:
+        print(f"Read-model (read_models.py): {format_bytes(report['readModels'])}")
+
+    if report.get("representations"):
+        titles = [title for title, build in REPRESENTATIONS]
+        print("\nПамять строк при разных способах хранения (без индексов):")
+        print(f"{'Коллекция':<26} " + " ".join(f"{title:>14}" for title in titles))
+        for row in report["representations"]:
+            base = row[titles[0]] or 1
+            print(f"{row['collection']:<26} " + " ".join(
+                f"{format_bytes(row[title]):>9} {row[title] / base:>4.0%}" if title != titles[0] else f"{format_bytes(row[title]):>14}"
+                for title in titles
+            ))
+
+    print("\nГде выделена память (tracemalloc):")
+    for site, size, count in report["topSites"]:
+        print(f"  {format_bytes(size):>10} {count:>9} блоков  {site}")
+
+    if "reloads" in report:
+        reloads = report["reloads"]
+        print(f"\nПосле {reloads['count']} перезагрузок вкладок память выросла на {format_bytes(reloads['growth'])}")
+        for site, size, count in reloads["sites"]:
+            print(f"  {format_bytes(size):>10} {count:>+9} блоков  {site}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сколько памяти занимают коллекции, индексы и read-model")
+    parser.add_argument("--data-dir", help=f"каталог с данными (по умолчанию {database.DATA_DIR})")
+    parser.add_argument("--top", type=int, default=15, help="сколько мест выделения памяти показать")
+    parser.add_argument("--no-read-models", action="store_true", help="не загружать read-model")
+    parser.add_argument("--compare", action="store_true", help="сравнить способы хранения строк")
+    parser.add_argument("--reloads", type=int, default=0, metavar="N",
+                        help="N раз загрузить данные вкладок и показать рост памяти")
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    args = parser.parse_args(argv)
+    if args.data_dir:
+        database.DATA_DIR = args.data_dir
+    # Замеряем только локальные файлы, даже если задан сервер
+    database.SERVER_URL = None
+
+    tracemalloc.start()
+    report = {"collections": measure_collections()}
+    if not args.no_read_models:
+        report["readModels"] = measure_read_models()
+    report["topSites"] = top_sites(args.top)
+    if args.compare:
+        report["representations"] = measure_representations()
+    if args.reloads:
+        growth, sites = measure_reloads(args.reloads, args.top)
+        report["reloads"] = {"count": args.reloads, "growth": growth, "sites": sites}
+    tracemalloc.stop()
+
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    else:
+        print_report(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import atexit
+import functools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from database import TextFileDatabase
+
+# Методы TextFileDatabase, которые замеряются после enable()
+OPERATIONS = ("load", "save", "write_rows", "find", "find_one", "count", "insert_one", "insert_many",
+              "update_one", "update_many", "delete_one", "delete_many", "aggregate")
+# Операции, у которых первый аргумент — запрос (или конвейер aggregate), его и пишем в лог
+QUERY_OPERATIONS = ("find", "find_one", "count", "update_one", "update_many", "delete_one", "delete_many", "aggregate")
+SLOW_MS = 100
+# Сколько последних медленных запросов держать в памяти
+SLOW_KEEP = 200
+
+_current = threading.local()
+
+def returned_rows(result):
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, bool) or result is None:
+        return 0
+    if isinstance(result, int):
+        return result
+    return 1
+
+def find_caller():
+    # Первый кадр стека вне хранилища и этого модуля — тот, кто сделал запрос
+    frame = sys._getframe(2)
+    skip = {os.path.abspath(__file__), os.path.abspath(sys.modules[TextFileDatabase.__module__].__file__)}
+    while frame is not None and os.path.abspath(frame.f_code.co_filename) in skip:
+        frame = frame.f_back
+    if frame is None:
+        return ""
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+def format_query(query):
+    text = json.dumps(query, ensure_ascii=False, default=str)
+    return text if len(text) <= 300 else text[:300] + "..."
+
+class OperationStats:
+    # Счётчики по (файл коллекции, операция) и лог медленных запросов. Вложенные
+    # вызовы (find_one внутри update_one, запись файла внутри save) входят во внешний
+    def __init__(self, slow_ms=SLOW_MS, log=None):
+        self.slow_ms = slow_ms
+        self.log = log
+        self.lock = threading.Lock()
+        self.started = datetime.now()
+        self.totals = {}
+        self.slow = deque(maxlen=SLOW_KEEP)
+
+    def install(self):
+        for op in OPERATIONS:
+            setattr(TextFileDatabase, op, self.wrap(op, getattr(TextFileDatabase, op)))
+        TextFileDatabase.profiler = self
+
+    def wrap(self, op, method):
+        @functools.wraps(method)
+        def wrapper(collection, *args, **kwargs):
+            if getattr(_current, "counters", None) is not None:
+                return method(collection, *args, **kwargs)
+            counters = _current.counters = {"scanned": 0, "written": 0}
+            started = time.perf_counter()
+            try:
+                result = method(collection, *args, **kwargs)
+            finally:
+                _current.counters = None
+            seconds = time.perf_counter() - started
+            query = None
+            if op in QUERY_OPERATIONS:
+                query = args[0] if args else kwargs.get("query", kwargs.get("pipeline"))
+            slow = seconds * 1000 >= self.slow_ms
+            self.record(
+                os.path.basename(collection.filename), op, seconds, counters["scanned"],
+                len(collection.data) if op == "load" else returned_rows(result), counters["written"],
+                query, find_caller() if slow else None
+            )
+            return result
+        return wrapper
+
+    # Вызываются хранилищем изнутри операции
+    def scanned(self, count):
+        counters = getattr(_current, "counters", None)
+        if counters is not None:
+            counters["scanned"] += count
+
+    def written(self, size):
+        counters = getattr(_current, "counters", None)
+        if counters is not None:
+            counters["written"] += size
+
+    def record(self, collection, op, seconds, scanned, returned, written, query, caller):
+        with self.lock:
+            total = self.totals.get((collection, op))
+            if total is None:
+                total = self.totals[(collection, op)] = {
+                    "calls": 0, "seconds": 0.0, "max": 0.0, "scanned": 0, "returned": 0, "written": 0
+                }
+            total["calls"] += 1
+            total["seconds"] += seconds
+            total["max"] = max(total["max"], seconds)
+            total["scanned"] += scanned
+            total["returned"] += returned
+            total["written"] += written
+            if caller is None:
+                return
+            entry = {
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "collection": collection,
+                "op": op,
+                "ms": round(seconds * 1000, 1),
+                "scanned": scanned,
+                "returned": returned,
+                "written": written,
+                "query": query,
+                "caller": caller
+            }
+            self.slow.append(entry)
+        if self.log is not None:
+            print(f"[slow] {entry['time']} {collection} {op} {entry['ms']} мс, просмотрено {scanned}, "
+                  f"возвращено {returned}, записано {written} Б"
+                  f"{', запрос ' + format_query(query) if query is not None else ''} — {caller}",
+                  file=self.log, flush=True)
+
+    def reset(self):
+        with self.lock:
+            self.totals = {}
+            self.slow.clear()
+            self.started = datetime.now()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "since": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+                "slowMs": self.slow_ms,
+                "operations": [
+                    {"collection": collection, "op": op, **total}
+                    for (collection, op), total in sorted(self.totals.items(), key=lambda item: -item[1]["seconds"])
+                ],
+                "slow": list(self.slow)
+            }
+
+    def summary(self, slowest=10):
+        data = self.snapshot()
+        lines = [
+            f"Операции хранилища с {data['since']}",
+            f"{'Коллекция':<22} {'Операция':<12} {'Вызовов':>8} {'Всего, мс':>10} {'Сред., мс':>10} "
+            f"{'Макс, мс':>9} {'Просмотрено':>12} {'Возвращено':>11} {'Записано, Б':>12}"
+        ]
+        for row in data["operations"]:
+            lines.append(
+                f"{row['collection']:<22} {row['op']:<12} {row['calls']:>8} {row['seconds'] * 1000:>10.1f} "
+                f"{row['seconds'] * 1000 / row['calls']:>10.2f} {row['max'] * 1000:>9.1f} "
+                f"{row['scanned']:>12} {row['returned']:>11} {row['written']:>12}"
+            )
+        slow = sorted(data["slow"], key=lambda entry: -entry["ms"])[:slowest]
+        if slow:
+            lines.append(f"Самые медленные запросы (от {self.slow_ms:g} мс):")
+            for entry in slow:
+                query = f" {format_query(entry['query'])}" if entry["query"] is not None else ""
+                lines.append(f"  {entry['ms']:>8.1f} мс  {entry['collection']} {entry['op']}{query} — {entry['caller']}")
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        print(self.summary(), file=file or sys.stderr, flush=True)
+
+def enable(slow_ms=None, log_path=None):
+    # Включает замер для всех коллекций процесса. Порог и файл лога берутся из
+    # RESTAURANT_SLOW_MS и RESTAURANT_SLOW_LOG; без файла медленные запросы идут в stderr.
+    # Сводка печатается при выходе и по сигналу SIGUSR1
+    if TextFileDatabase.profiler is not None:
+        return TextFileDatabase.profiler
+    if slow_ms is None:
+        slow_ms = float(os.environ.get("RESTAURANT_SLOW_MS", SLOW_MS))
+    log_path = log_path or os.environ.get("RESTAURANT_SLOW_LOG")
+    log = open(log_path, "a", encoding="utf-8") if log_path else sys.stderr
+    profiler = OperationStats(slow_ms, log)
+    profiler.install()
+    atexit.register(profiler.dump)
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.dump())
+    return profiler
@@ -0,0 +1,658 @@
+import math
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from database import (
+    customer_collection, table_collection, order_collection, receipt_collection,
+    menu_collection, waiter_stats_collection, parse_dishes, order_total, is_null
+)
+
+def format_dishes(dishes):
+    return ", ".join([f"{item['name']} x{item['quantity']}" for item in dishes]) if dishes else ""
+
+class OrderReadModel:
+    # Заказы, заранее соединённые с клиентом и столом. Строки обновляются
+    # по событиям коллекций, поэтому список заказов строится за один проход
+    def __init__(self, orders, customers, tables):
+        self.orders = orders
+        self.customers = customers
+        self.tables = tables
+        self.rows = {}
+        self.by_customer = {}
+        self.by_table = {}
+        orders.subscribe(self.on_order)
+        customers.subscribe(self.on_customer)
+        tables.subscribe(self.on_table)
+        self.rebuild()
+
+    def rebuild(self):
+        customers = {c["id"]: c for c in self.customers.find()}
+        tables = {t["id"]: t for t in self.tables.find()}
+        self.rows = {}
+        self.by_customer = {}
+        self.by_table = {}
+        for order in self.orders.find():
+            self.add(order, customers.get(order.get("customerId")), tables.get(order.get("tableId")))
+
+    @staticmethod
+    def build(order, customer, table):
+        dishes = parse_dishes(order.get("dishes", []))
+        return {
+            "id": order["id"],
+            "customerId": order.get("customerId"),
+            "tableId": order.get("tableId"),
+            "customerName": customer.get("name", "") if customer else "",
+            "tableNumber": str(table["tableNumber"]) if table else "",
+            "orderDate": str(order.get("orderDate", "")),
+            "dishesText": format_dishes(dishes),
+            "total": order_total(order),
+            "status": order.get("status", "new"),
+            "waiterLogin": order.get("waiterLogin", "")
+        }
+
+    def add(self, order, customer, table):
+        self.rows[order["id"]] = self.build(order, customer, table)
+        self.by_customer.setdefault(order.get("customerId"), set()).add(order["id"])
+        self.by_table.setdefault(order.get("tableId"), set()).add(order["id"])
+
+    def remove(self, order_id):
+        row = self.rows.pop(order_id, None)
+        if row:
+            self.by_customer.get(row["customerId"], set()).discard(order_id)
+            self.by_table.get(row["tableId"], set()).discard(order_id)
+
+    def on_order(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        if old:
+            self.remove(old["id"])
+        if new:
+            self.add(
+                new,
+                self.customers.find_one({"id": new.get("customerId")}),
+                self.tables.find_one({"id": new.get("tableId")})
+            )
+
+    def on_customer(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        customer_id = (new or old)["id"]
+        name = new.get("name", "") if new else ""
+        for order_id in self.by_customer.get(customer_id, ()):
+            self.rows[order_id]["customerName"] = name
+
+    def on_table(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        table_id = (new or old)["id"]
+        number = str(new["tableNumber"]) if new else ""
+        for order_id in self.by_table.get(table_id, ()):
+            self.rows[order_id]["tableNumber"] = number
+
+    def row(self, order):
+        # Строка для документа заказа. Подписчики срабатывают после записи, поэтому
+        # фоновый запрос может увидеть заказ раньше read-model — тогда строим строку сами
+        row = self.rows.get(order["id"])
+        if row is None:
+            row = self.build(
+                order,
+                self.customers.find_one({"id": order.get("customerId")}),
+                self.tables.find_one({"id": order.get("tableId")})
+            )
+        return row
+
+    def list(self):
+        return list(self.rows.values())
+
+def receipt_order_ids(receipt):
+    # У обычного счета один orderId, у общего — orderIds через запятую
+    if receipt.get("orderIds"):
+        return [order_id for order_id in str(receipt["orderIds"]).split(",") if order_id]
+    if receipt.get("orderId"):
+        return [str(receipt["orderId"])]
+    return []
+
+class ReceiptReadModel:
+    # Счета, соединённые с заказами и клиентом. Поддерживается записями
+    # в коллекции счетов, заказов и клиентов
+    def __init__(self, receipts, orders, customers):
+        self.receipts = receipts
+        self.orders = orders
+        self.customers = customers
+        self.rows = {}
+        self.by_order = {}
+        self.by_customer = {}
+        receipts.subscribe(self.on_receipt)
+        orders.subscribe(self.on_order)
+        customers.subscribe(self.on_customer)
+        self.rebuild()
+
+    def rebuild(self):
+        orders = {o["id"]: o for o in self.orders.find()}
+        customers = {c["id"]: c for c in self.customers.find()}
+        self.rows = {}
+        self.by_order = {}
+        self.by_customer = {}
+        for receipt in self.receipts.find():
+            self.add(receipt, orders.get, customers.get)
+
+    @staticmethod
+    def build(receipt, get_order, get_customer):
+        order_ids = receipt_order_ids(receipt)
+        customer_id = receipt.get("customerId")
+        if not customer_id and order_ids:
+            order = get_order(order_ids[0])
+            customer_id = order.get("customerId") if order else None
+        customer = get_customer(customer_id) if customer_id else None
+        return {
+            "id": receipt["id"],
+            "orderIds": order_ids,
+            "customerId": customer_id,
+            "customerName": customer.get("name", "") if customer else "",
+            "date": str(receipt.get("date", "")),
+            "amount": receipt.get("amount", 0),
+            "paid": receipt.get("paid", False),
+            "waiterLogin": receipt.get("waiterLogin", ""),
+            "closedBy": receipt.get("closedBy", "") if receipt.get("paid") else ""
+        }
+
+    def add(self, receipt, get_order, get_customer):
+        row = self.rows[receipt["id"]] = self.build(receipt, get_order, get_customer)
+        for order_id in row["orderIds"]:
+            self.by_order.setdefault(order_id, set()).add(receipt["id"])
+        self.by_customer.setdefault(row["customerId"], set()).add(receipt["id"])
+
+    def remove(self, receipt_id):
+        row = self.rows.pop(receipt_id, None)
+        if row:
+            for order_id in row["orderIds"]:
+                self.by_order.get(order_id, set()).discard(receipt_id)
+            self.by_customer.get(row["customerId"], set()).discard(receipt_id)
+
+    def find_order(self, order_id):
+        return self.orders.find_one({"id": order_id})
+
+    def find_customer(self, customer_id):
+        return self.customers.find_one({"id": customer_id})
+
+    def on_receipt(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        if old:
+            self.remove(old["id"])
+        if new:
+            self.add(new, self.find_order, self.find_customer)
+
+    def on_order(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        # Клиент берётся из заказа, поэтому пересобираем только счета этого заказа
+        order_id = (new or old)["id"]
+        for receipt_id in list(self.by_order.get(order_id, ())):
+            receipt = self.receipts.find_one({"id": receipt_id})
+            self.remove(receipt_id)
+            if receipt:
+                self.add(receipt, self.find_order, self.find_customer)
+
+    def on_customer(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        customer_id = (new or old)["id"]
+        name = new.get("name", "") if new else ""
+        for receipt_id in self.by_customer.get(customer_id, ()):
+            self.rows[receipt_id]["customerName"] = name
+
+    def row(self, receipt):
+        # Как OrderReadModel.row: счёт, которого read-model ещё не видела, собираем из документа
+        row = self.rows.get(receipt["id"])
+        if row is None:
+            row = self.build(receipt, self.find_order, self.find_customer)
+        return row
+
+    def list(self):
+        return list(self.rows.values())
+
+class CustomerLedger:
+    # Неоплаченные заказы и текущий долг по каждому клиенту. Обновляется
+    # при создании, редактировании, отмене, оплате и удалении заказов
+    CLOSED_STATUSES = ("paid", "cancelled")
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.accounts = {}
+        self.order_customer = {}
+        orders.subscribe(self.on_order)
+        self.rebuild()
+
+    def rebuild(self):
+        self.accounts = {}
+        self.order_customer = {}
+        for order in self.orders.find():
+            self.add(order)
+
+    def add(self, order):
+        if order.get("status", "new") in self.CLOSED_STATUSES:
+            return
+        account = self.accounts.setdefault(order.get("customerId"), {"orders": {}, "balance": 0})
+        total = order_total(order)
+        account["orders"][order["id"]] = total
+        account["balance"] += total
+        self.order_customer[order["id"]] = order.get("customerId")
+
+    def remove(self, order_id):
+        if order_id not in self.order_customer:
+            return
+        customer_id = self.order_customer.pop(order_id)
+        account = self.accounts[customer_id]
+        account["balance"] -= account["orders"].pop(order_id)
+        if not account["orders"]:
+            del self.accounts[customer_id]
+
+    def on_order(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        if old:
+            self.remove(old["id"])
+        if new:
+            self.add(new)
+
+    def open_orders(self, customer_id):
+        account = self.accounts.get(customer_id)
+        if not account:
+            return [], 0
+        return sorted(account["orders"], key=int), account["balance"]
+
+class WaiterStats:
+    # Счётчики закрытых счетов и выручки по официантам. Хранятся в отдельной
+    # коллекции и меняются только при оплате (или удалении оплаченного) счета.
+    # Рядом, в строке без официанта, хранится отметка о том, с каким состоянием
+    # счетов они сходятся; если счета меняли в обход (старый файл статистики,
+    # импорт, другой терминал без сервера), при запуске счётчики пересчитываются
+    def __init__(self, receipts, stats):
+        self.receipts = receipts
+        self.stats = stats
+        receipts.subscribe(self.on_receipt)
+        if not stats.replica and self.stored_watermark() != self.watermark():
+            self.rebuild()
+
+    def watermark(self):
+        # Число счетов и число оплаченных — оба берутся без прохода по строкам
+        return f"{self.receipts.count()}/{self.receipts.estimate('paid', True) or 0}"
+
+    def stored_watermark(self):
+        row = self.stats.find_one({"watermark": {"$exists": True}})
+        return row["watermark"] if row else None
+
+    def mark(self):
+        watermark = self.watermark()
+        row = self.stats.find_one({"watermark": {"$exists": True}})
+        if row is None:
+            self.stats.insert_one({"watermark": watermark})
+        elif row["watermark"] != watermark:
+            self.stats.update_one({"id": row["id"]}, {"$set": {"watermark": watermark}})
+
+    def rebuild(self):
+        totals = {}
+        for receipt in self.receipts.find({"paid": True, "closedBy": {"$ne": None}}):
+            entry = totals.setdefault(receipt["closedBy"], [0, 0])
+            entry[0] += 1
+            entry[1] += float(receipt.get("amount") or 0)
+        self.stats.delete_many({})
+        self.stats.insert_many([
+            {"waiter": waiter, "receiptsClosed": count, "revenue": revenue}
+            for waiter, (count, revenue) in totals.items()
+        ] + [{"watermark": self.watermark()}])
+
+    @staticmethod
+    def contribution(receipt):
+        if not receipt or not receipt.get("paid") or is_null(receipt.get("closedBy")):
+            return None
+        return receipt["closedBy"], float(receipt.get("amount") or 0)
+
+    def apply(self, contribution, sign):
+        if contribution is None:
+            return
+        waiter, amount = contribution
+        row = self.stats.find_one({"waiter": waiter})
+        if row is None:
+            self.stats.insert_one({"waiter": waiter, "receiptsClosed": sign, "revenue": sign * amount})
+        else:
+            self.stats.update_one({"id": row["id"]}, {"$set": {
+                "receiptsClosed": row["receiptsClosed"] + sign,
+                "revenue": row["revenue"] + sign * amount
+            }})
+
+    def on_receipt(self, op, old, new):
+        # Счётчики реплики ведёт сервер и присылает их изменения сам
+        if self.stats.replica:
+            return
+        if op == "load":
+            self.rebuild()
+            return
+        before, after = self.contribution(old), self.contribution(new)
+        if before != after:
+            self.apply(before, -1)
+            self.apply(after, 1)
+        self.mark()
+
+    def list(self):
+        rows = []
+        for row in self.stats.find({"waiter": {"$exists": True}}, sort={"receiptsClosed": -1}):
+            count = row["receiptsClosed"]
+            rows.append({
+                "waiter": row["waiter"],
+                "receiptsClosed": count,
+                "revenue": row["revenue"],
+                "averageBill": row["revenue"] / count if count else 0
+            })
+        return rows
+
+class OrderLineIndex:
+    # Нормализованные строки заказов (заказ, блюдо, id в меню, количество, цена, время)
+    # с упорядоченной по времени шкалой заказов. Отменённые заказы не индексируются
+    def __init__(self, orders, menu):
+        self.orders = orders
+        self.menu = menu
+        self.lines = {}
+        self.timeline = []
+        self.menu_ids = {}
+        self.by_dish = {}
+        orders.subscribe(self.on_order)
+        menu.subscribe(self.on_menu)
+        self.rebuild()
+
+    def rebuild(self):
+        self.menu_ids = {item["name"]: item["id"] for item in self.menu.find()}
+        self.lines = {}
+        self.timeline = []
+        self.by_dish = {}
+        for order in self.orders.find():
+            self.add(order)
+
+    def add(self, order):
+        if order.get("status") == "cancelled":
+            return
+        timestamp = str(order.get("orderDate", ""))
+        self.lines[order["id"]] = [{
+            "orderId": order["id"],
+            "dish": line["name"],
+            "menuId": self.menu_ids.get(line["name"]),
+            "quantity": line["quantity"],
+            "price": line["price"],
+            "timestamp": timestamp
+        } for line in parse_dishes(order.get("dishes", []))]
+        for line in self.lines[order["id"]]:
+            self.by_dish.setdefault(line["dish"], set()).add(order["id"])
+        insort(self.timeline, (timestamp, order["id"]))
+
+    def remove(self, order):
+        lines = self.lines.pop(order["id"], None)
+        if lines is None:
+            return
+        for line in lines:
+            self.by_dish.get(line["dish"], set()).discard(order["id"])
+        entry = (str(order.get("orderDate", "")), order["id"])
+        pos = bisect_left(self.timeline, entry)
+        if pos < len(self.timeline) and self.timeline[pos] == entry:
+            del self.timeline[pos]
+
+    def on_order(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        if old:
+            self.remove(old)
+        if new:
+            self.add(new)
+
+    def on_menu(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            return
+        if old:
+            self.menu_ids.pop(old.get("name"), None)
+        if new:
+            self.menu_ids[new.get("name")] = new["id"]
+        # Строки заказов с переименованным, удалённым или новым блюдом получают
+        # тот же menuId, что дала бы пересборка
+        for name in {(old or {}).get("name"), (new or {}).get("name")}:
+            menu_id = self.menu_ids.get(name)
+            for order_id in self.by_dish.get(name, ()):
+                for line in self.lines[order_id]:
+                    if line["dish"] == name:
+                        line["menuId"] = menu_id
+
+    def lines_between(self, start, end):
+        # Строки заказов с orderDate в [start, end); границы — строки "YYYY-MM-DD"
+        lo = bisect_left(self.timeline, (start, ""))
+        hi = bisect_left(self.timeline, (end, ""))
+        for _, order_id in self.timeline[lo:hi]:
+            yield from self.lines.get(order_id, ())
+
+    def totals_between(self, start, end):
+        totals = {}
+        for line in self.lines_between(start, end):
+            entry = totals.setdefault(line["dish"], {"menuId": line["menuId"], "quantity": 0, "revenue": 0})
+            entry["quantity"] += line["quantity"]
+            entry["revenue"] += line["quantity"] * line["price"]
+        return totals
+
+    def dish_performance(self, start, end, sort_by="revenue"):
+        # Продажи блюд за [start, end) и тренд относительно предыдущего периода той же длины
+        days = (datetime.strptime(end, "%Y-%m-%d") - datetime.strptime(start, "%Y-%m-%d")).days
+        previous_start = (datetime.strptime(start, "%Y-%m-%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+        current = self.totals_between(start, end)
+        previous = self.totals_between(previous_start, start)
+
+        rows = []
+        for dish, entry in current.items():
+            before = previous.get(dish, {}).get("quantity", 0)
+            rows.append({
+                "dish": dish,
+                "menuId": entry["menuId"],
+                "quantity": entry["quantity"],
+                "revenue": entry["revenue"],
+                "previousQuantity": before,
+                "trend": (entry["quantity"] - before) / before * 100 if before else None
+            })
+        for dish, entry in previous.items():
+            if dish not in current:
+                rows.append({
+                    "dish": dish,
+                    "menuId": entry["menuId"],
+                    "quantity": 0,
+                    "revenue": 0,
+                    "previousQuantity": entry["quantity"],
+                    "trend": -100.0
+                })
+        if sort_by == "trend":
+            rows.sort(key=lambda row: float("inf") if row["trend"] is None else row["trend"], reverse=True)
+        else:
+            rows.sort(key=lambda row: row[sort_by], reverse=True)
+        return rows
+
+class KitchenQueue:
+    # Заказы кухни по статусам. Корзина — словарь id -> заказ, поэтому переход
+    # между статусами стоит O(1); порядок по времени заказа восстанавливается
+    # только при выводе корзины. Подписчики узнают, какой заказ куда переехал
+    STATUSES = ("new", "preparing", "ready")
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.buckets = {status: {} for status in self.STATUSES}
+        self.listeners = []
+        orders.subscribe(self.on_order)
+        self.rebuild()
+
+    def subscribe(self, callback):
+        # callback(order_id, old_status, new_status); order_id None — очередь пересобрана
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def notify(self, order_id, old_status, new_status):
+        for callback in self.listeners:
+            callback(order_id, old_status, new_status)
+
+    def rebuild(self):
+        self.buckets = {status: {} for status in self.STATUSES}
+        for order in self.orders.find({"status": {"$in": list(self.STATUSES)}}):
+            self.buckets[order["status"]][order["id"]] = order
+
+    def on_order(self, op, old, new):
+        if op == "load":
+            self.rebuild()
+            self.notify(None, None, None)
+            return
+        order_id = (new or old)["id"]
+        old_status = old.get("status") if old else None
+        new_status = new.get("status") if new else None
+        if old_status in self.buckets:
+            self.buckets[old_status].pop(order_id, None)
+        if new_status in self.buckets:
+            self.buckets[new_status][order_id] = new
+        if old_status in self.buckets or new_status in self.buckets:
+            self.notify(order_id, old_status, new_status)
+
+    def tickets(self, status):
+        return sorted(self.buckets[status].values(), key=lambda order: (str(order.get("orderDate", "")), int(order["id"])))
+
+    def next_status(self, status):
+        # Следующий шаг кухни; после ready заказ отдаётся в зал
+        index = self.STATUSES.index(status)
+        return self.STATUSES[index + 1] if index + 1 < len(self.STATUSES) else "delivered"
+
+# Верхние границы корзин гистограмм в секундах: шаг 10%, от 1 секунды до ~3 суток
+LATENCY_BOUNDS = [1.1 ** i for i in range(130)]
+
+def parse_timestamp(value):
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+def histogram_percentile(histogram, percent):
+    # histogram — {номер корзины: количество}; возвращает верхнюю границу корзины
+    total = sum(histogram.values())
+    rank = max(1, math.ceil(total * percent / 100))
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return LATENCY_BOUNDS[min(bucket, len(LATENCY_BOUNDS) - 1)]
+    return 0
+
+class ServiceTimes:
+    # Длительности этапов обслуживания в разреженных гистограммах по ключу
+    # (этап, день, час начала, официант). Запись меняет пару счётчиков,
+    # перцентили за период считаются слиянием нужных гистограмм. Отчёт строится
+    # в фоновом потоке, поэтому гистограммы меняются и читаются под self.lock
+    ORDER_STAGES = [
+        ("Ожидание кухни", "orderDate", "preparingAt"),
+        ("Приготовление", "preparingAt", "readyAt"),
+        ("Выдача", "readyAt", "deliveredAt"),
+        ("От заказа до счёта", "orderDate", "billedAt"),
+    ]
+    RECEIPT_STAGES = [
+        ("Оплата счёта", "date", "paymentDate"),
+    ]
+    STAGES = [stage for stage, _, _ in ORDER_STAGES + RECEIPT_STAGES]
+
+    def __init__(self, orders, receipts):
+        self.orders = orders
+        self.receipts = receipts
+        self.histograms = {}
+        self.lock = threading.Lock()
+        orders.subscribe(self.on_order)
+        receipts.subscribe(self.on_receipt)
+        self.rebuild()
+
+    def rebuild(self):
+        # Коллекции читаются без self.lock, готовые гистограммы подменяются целиком
+        histograms = {}
+        for order in self.orders.find():
+            self.apply(histograms, self.samples(order, self.ORDER_STAGES), 1)
+        for receipt in self.receipts.find():
+            self.apply(histograms, self.samples(receipt, self.RECEIPT_STAGES), 1)
+        with self.lock:
+            self.histograms = histograms
+
+    @staticmethod
+    def samples(document, stages):
+        result = []
+        if not document:
+            return result
+        for stage, start_field, end_field in stages:
+            start = parse_timestamp(document.get(start_field))
+            end = parse_timestamp(document.get(end_field))
+            if start and end and end >= start:
+                result.append((stage, start.strftime("%Y-%m-%d"), start.hour,
+                               document.get("waiterLogin", ""), (end - start).total_seconds()))
+        return result
+
+    @staticmethod
+    def apply(histograms, samples, sign):
+        for stage, day, hour, waiter, seconds in samples:
+            key = (stage, day, hour, waiter)
+            histogram = histograms.setdefault(key, {})
+            bucket = bisect_left(LATENCY_BOUNDS, seconds)
+            count = histogram.get(bucket, 0) + sign
+            if count:
+                histogram[bucket] = count
+            else:
+                histogram.pop(bucket, None)
+                if not histogram:
+                    del histograms[key]
+
+    def on_change(self, op, old, new, stages):
+        if op == "load":
+            self.rebuild()
+            return
+        before, after = self.samples(old, stages), self.samples(new, stages)
+        if before == after:
+            return
+        with self.lock:
+            self.apply(self.histograms, before, -1)
+            self.apply(self.histograms, after, 1)
+
+    def on_order(self, op, old, new):
+        self.on_change(op, old, new, self.ORDER_STAGES)
+
+    def on_receipt(self, op, old, new):
+        self.on_change(op, old, new, self.RECEIPT_STAGES)
+
+    def percentiles(self, by, start=None, end=None):
+        # by: "hour" или "waiter"; период [start, end) по дню начала этапа.
+        # Строки: (час или официант, этап, замеров, p50, p95, p99) в секундах
+        merged = {}
+        with self.lock:
+            for (stage, day, hour, waiter), histogram in self.histograms.items():
+                if (start and day < start) or (end and day >= end):
+                    continue
+                label = f"{hour:02d}:00" if by == "hour" else waiter
+                target = merged.setdefault((label, stage), {})
+                for bucket, count in histogram.items():
+                    target[bucket] = target.get(bucket, 0) + count
+        rows = []
+        for label, stage in sorted(merged, key=lambda key: (key[0], self.STAGES.index(key[1]))):
+            histogram = merged[(label, stage)]
+            rows.append((label, stage, sum(histogram.values()),
+                         *(histogram_percentile(histogram, percent) for percent in (50, 95, 99))))
+        return rows
+
+order_view = OrderReadModel(order_collection, customer_collection, table_collection)
+receipt_view = ReceiptReadModel(receipt_collection, order_collection, customer_collection)
+customer_ledger = CustomerLedger(order_collection)
+waiter_stats = WaiterStats(receipt_collection, waiter_stats_collection)
+order_lines = OrderLineIndex(order_collection, menu_collection)
+kitchen_queue = KitchenQueue(order_collection)
+service_times = ServiceTimes(order_collection, receipt_collection)
@@ -0,0 +1,200 @@
+import http.client
+import json
+import socket
+import threading
+import uuid
+from urllib.parse import urlsplit
+
+import database
+from database import TextFileDatabase, writing
+
+class RemoteClient:
+    # Соединение с server.py. Изменения, которые сервер вернул в ответе,
+    # применяются к локальным репликам, чтобы сработали их подписчики
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 8765
+        self.client_id = uuid.uuid4().hex
+        self.replicas = {}
+        self.connection = None
+        self.lock = threading.Lock()
+        # Поток событий: dispatch переносит обработку в нужный поток (в окне — GUI),
+        # on_change получает имена коллекций, изменённых другими терминалами
+        self.dispatch = lambda fn, *args: fn(*args)
+        self.on_change = None
+        self.events_thread = None
+        self.stopped = threading.Event()
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json", "X-Client-Id": self.client_id}
+        with self.lock:
+            # Соединение держим открытым; если сервер его закрыл, переподключаемся один раз
+            for attempt in range(2):
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+                try:
+                    self.connection.request(method, path, body=payload, headers=headers)
+                    response = self.connection.getresponse()
+                    data = json.loads(response.read() or b"null")
+                    break
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    self.connection.close()
+                    self.connection = None
+                    if attempt:
+                        raise
+        self.apply_changes(data.get("changes", ()))
+        if response.status >= 400:
+            from services import ServiceError
+            raise ServiceError(data.get("error") or f"Ошибка сервера: {response.status}")
+        return data
+
+    def apply_changes(self, changes):
+        changed = set()
+        for change in changes:
+            replica = self.replicas.get(change["collection"])
+            if replica is not None and replica.apply_change(change["op"], change["old"], change["new"], change.get("seq")):
+                changed.add(change["collection"])
+        return changed
+
+    def start_events(self, dispatch=None):
+        if dispatch is not None:
+            self.dispatch = dispatch
+        if self.events_thread is None:
+            self.events_thread = threading.Thread(target=self.listen_events, daemon=True)
+            self.events_thread.start()
+
+    def stop_events(self):
+        self.stopped.set()
+
+    def listen_events(self):
+        # Начинаем с самого раннего состояния, которое уже есть в репликах;
+        # повторно пришедшие изменения реплики отбрасывают по номеру
+        seq = min((replica.loaded_seq for replica in list(self.replicas.values())), default=0)
+        while not self.stopped.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=60) as sock:
+                    sock.sendall(
+                        f"GET /events?since={seq} HTTP/1.1\r\nHost: {self.host}\r\n"
+                        f"X-Client-Id: {self.client_id}\r\n\r\n".encode("latin-1")
+                    )
+                    stream = sock.makefile("rb")
+                    while stream.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    for line in stream:
+                        event = json.loads(line)
+                        if event.get("heartbeat"):
+                            continue
+                        seq = event["seq"]
+                        self.dispatch(self.apply_event, event)
+                        if self.stopped.is_set():
+                            break
+            except (OSError, ValueError):
+                pass
+            self.stopped.wait(1)
+
+    def apply_event(self, event):
+        if event.get("reset"):
+            for replica in list(self.replicas.values()):
+                replica.load()
+            changed = set(self.replicas)
+        else:
+            changed = self.apply_changes([event])
+        if changed and self.on_change is not None:
+            self.on_change(changed)
+
+    def call(self, name, params):
+        return self.request("POST", f"/api/{name}", params)["result"]
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = RemoteClient(database.SERVER_URL)
+    return _client
+
+class RemoteCollection(TextFileDatabase):
+    # Реплика коллекции сервера: чтение идёт из памяти с теми же индексами.
+    # Меняют данные операции services на сервере; изменения приходят в ответе
+    # на вызов и в потоке событий
+    replica = True
+
+    def __init__(self, name, filename):
+        self.name = name
+        self.client = get_client()
+        self.client.replicas[name] = self
+        super().__init__(filename)
+
+    def load(self):
+        # Запрос к серверу — без блокировки, чтобы чтение не ждало сеть
+        self.apply_snapshot(self.client.request("GET", f"/collections/{self.name}"))
+
+    @writing
+    def apply_snapshot(self, response):
+        self.data = response["rows"]
+        # Номер изменения на сервере, которому соответствует снимок, и номера
+        # последних применённых изменений по документам
+        self.loaded_seq = response.get("seq", 0)
+        self.versions = {}
+        self.rebuild_indexes()
+        self.notify("load")
+
+    def save(self):
+        # Файлы пишет сервер
+        pass
+
+    @writing
+    def apply_change(self, op, old, new, seq=None):
+        # Изменение приходит и в ответе на свою запись, и в потоке событий;
+        # устаревшее или уже применённое пропускаем. True — реплика изменилась
+        if seq is not None:
+            doc_id = (new or old)["id"]
+            if seq <= max(self.loaded_seq, self.versions.get(doc_id, 0)):
+                return False
+            self.versions[doc_id] = seq
+        if op == "insert":
+            item = dict(new)
+            self.data.append(item)
+            self.index_item(item)
+            self.notify("insert", None, item)
+        elif op == "update":
+            item = self.find_one({"id": new["id"]})
+            if item is None:
+                return self.apply_change("insert", None, new)
+            new = dict(new)
+            self.replace_items({id(item): new})
+            self.notify("update", item, new)
+        elif op == "delete":
+            item = self.find_one({"id": old["id"]})
+            if item is not None:
+                self.data.remove(item)
+                self.unindex_item(item)
+                self.notify("delete", item, None)
+        return True
+
+    def read_only(self, method):
+        # Сервер принимает изменения только операциями services (POST /api/<операция>)
+        from services import ServiceError
+        raise ServiceError(f"{self.name}.{method}: реплика только для чтения, изменения идут через services")
+
+    def insert_one(self, document):
+        self.read_only("insert_one")
+
+    def insert_many(self, documents):
+        self.read_only("insert_many")
+
+    def update_one(self, query, update):
+        self.read_only("update_one")
+
+    def update_many(self, query, update):
+        self.read_only("update_many")
+
+    def delete_one(self, query):
+        self.read_only("delete_one")
+
+    def delete_many(self, query):
+        self.read_only("delete_many")
@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+import database
+
+# Сервер сам владеет файлами, даже если в окружении задан адрес сервера
+database.SERVER_URL = None
+
+from database import COLLECTIONS, TextFileDatabase
+
+# Поля, которые не отдаются клиентам ни в снимках, ни в потоке изменений
+PRIVATE_FIELDS = {"waiter_collection": ("password",)}
+# Сколько последних изменений помнить для переподключившихся клиентов
+HISTORY_SIZE = 10000
+# Пустое событие раз в столько секунд, чтобы обрыв соединения замечали обе стороны
+HEARTBEAT = 15
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+def public(name, row):
+    private = PRIVATE_FIELDS.get(name)
+    if row is None or not private:
+        return row
+    return {field: value for field, value in row.items() if field not in private}
+
+class DataServer:
+    # Один процесс держит все коллекции в памяти; запросы выполняются по очереди
+    # в цикле asyncio, поэтому каждая операция атомарна для остальных терминалов.
+    # Клиенты читают снимки коллекций, а меняют данные только операциями services
+    def __init__(self):
+        # services подтягивает read_models, а они загружают коллекции, поэтому
+        # импортируем их здесь, когда каталог данных уже выбран
+        from services import OPERATIONS, ServiceError
+        self.operations = OPERATIONS
+        self.errors = (ServiceError, ValueError, TypeError, KeyError)
+        self.collections = {name: getattr(database, name) for name in COLLECTIONS}
+        self.changes = None
+        # Номер последнего изменения, история и очереди подписчиков потока событий
+        self.seq = 0
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.subscribers = set()
+        for name, collection in self.collections.items():
+            collection.subscribe(partial(self.record, name))
+
+    def record(self, name, op, old, new):
+        if op == "load":
+            return
+        self.seq += 1
+        change = {
+            "seq": self.seq,
+            "collection": name,
+            "op": op,
+            "old": public(name, dict(old)) if old else None,
+            "new": public(name, dict(new)) if new else None
+        }
+        if self.changes is not None:
+            self.changes.append(change)
+        self.history.append(change)
+        for queue in self.subscribers:
+            queue.put_nowait(change)
+
+    def run(self, fn, *args, **kwargs):
+        # Результат и все изменения коллекций, сделанные за время вызова
+        self.changes = []
+        try:
+            return 200, {"result": fn(*args, **kwargs), "changes": self.changes}
+        except self.errors as e:
+            return 400, {"error": str(e), "changes": self.changes}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}", "changes": self.changes}
+        finally:
+            self.changes = None
+
+    def dispatch(self, method, target, body):
+        path = urlsplit(target).path.strip("/").split("/")
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {"error": "Тело запроса должно быть JSON"}
+        if not isinstance(params, dict):
+            return 400, {"error": "Тело запроса должно быть JSON-объектом"}
+
+        if path[0] == "collections" and len(path) >= 2 and path[1] not in self.collections:
+            return 404, {"error": f"Нет коллекции {path[1]}"}
+        if method == "GET" and len(path) == 2 and path[0] == "collections":
+            rows = [public(path[1], row) for row in self.collections[path[1]].find()]
+            return 200, {"rows": rows, "seq": self.seq}
+        if method == "POST" and len(path) == 2 and path[0] == "api" and path[1] in self.operations:
+            return self.run(self.operations[path[1]], **params)
+        if method == "GET" and path == ["stats"]:
+            if TextFileDatabase.profiler is None:
+                return 404, {"error": "Замер операций выключен (--profile)"}
+            return 200, TextFileDatabase.profiler.snapshot()
+        return 404, {"error": f"Неизвестный запрос: {method} {target}"}
+
+    async def stream_events(self, writer, since):
+        # Изменения построчно в JSON (NDJSON), начиная с since+1. Если их уже нет
+        # в истории, клиент получает reset и перечитывает коллекции целиком
+        queue = asyncio.Queue()
+        self.subscribers.add(queue)
+        try:
+            if since < self.seq:
+                if self.history and self.history[0]["seq"] <= since + 1:
+                    for change in self.history:
+                        if change["seq"] > since:
+                            queue.put_nowait(change)
+                else:
+                    queue.put_nowait({"reset": True, "seq": self.seq})
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    event = {"heartbeat": True}
+                writer.write(json.dumps(event, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                url = urlsplit(target)
+                if method == "GET" and url.path == "/events":
+                    since = int(parse_qs(url.query).get("since", ["0"])[0])
+                    await self.stream_events(writer, since)
+                    break
+                status, payload = self.dispatch(method, target, body)
+                data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host, port):
+    server = DataServer()
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Сервер данных слушает http://{host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер данных ресторана (HTTP/JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", help=f"каталог с данными (по умолчанию {database.DATA_DIR})")
+    parser.add_argument("--profile", action="store_true",
+                        help="считать операции хранилища и писать медленные запросы в stderr; сводка — GET /stats")
+    args = parser.parse_args(argv)
+    if args.data_dir:
+        database.DATA_DIR = args.data_dir
+    if args.profile:
+        database.PROFILE = True
+
+    # Файлы пишутся в отдельном потоке, чтобы запись не останавливала цикл событий
+    executor = ThreadPoolExecutor(max_workers=1)
+    TextFileDatabase.flush_executor = executor.submit
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(wait=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import functools
+import re
+from datetime import datetime, time
+
+import database
+from database import ORDER_STATUSES, dishes_summary, order_total, status_change
+from import_data import KINDS, BulkImporter
+from read_models import receipt_order_ids, receipt_view, customer_ledger, waiter_stats, service_times
+
+# Операции над данными, общие для окна и сервера. Параметры и результаты —
+# то, что переносится через JSON: строки дат "YYYY-MM-DD", времени "HH:MM"
+OPERATIONS = {}
+
+class ServiceError(Exception):
+    pass
+
+def operation(fn):
+    # В удалённом режиме вызов уходит на сервер, который выполняет исходную функцию
+    OPERATIONS[fn.__name__] = fn
+
+    @functools.wraps(fn)
+    def wrapper(**params):
+        if database.SERVER_URL:
+            from remote import get_client
+            return get_client().call(fn.__name__, params)
+        return fn(**params)
+    return wrapper
+
+# Логин и пароль официанта — латиница и цифры, не короче 4 символов
+CREDENTIALS = re.compile(r"[A-Za-z0-9]{4,}")
+
+def find_or_create_customer(name, phone):
+    customer = database.customer_collection.find_one({"phone": phone})
+    if not customer:
+        customer = database.customer_collection.insert_one({"name": name, "phone": phone})
+    return customer["id"]
+
+@operation
+def authenticate(login, password):
+    # Пароли не покидают процесс, который владеет файлами: возвращаем официанта без пароля
+    user = database.waiter_collection.find_one({"login": login, "password": password})
+    if not user:
+        raise ServiceError("Неверный логин или пароль")
+    return {field: value for field, value in user.items() if field != "password"}
+
+@operation
+def register_waiter(login, password):
+    if not CREDENTIALS.fullmatch(login):
+        raise ServiceError("Логин должен быть на латинице и не менее 4 символов")
+    if not CREDENTIALS.fullmatch(password):
+        raise ServiceError("Пароль должен быть на латинице и не менее 4 символа")
+    if database.waiter_collection.find_one({"login": login}):
+        raise ServiceError("Пользователь с таким логином уже существует")
+    database.waiter_collection.insert_one({"login": login, "password": password, "isAdmin": False})
+    return {"login": login, "isAdmin": False}
+
+@operation
+def add_table(table_number, seats):
+    table_number, seats = str(table_number), str(seats)
+    if database.table_collection.find_one({"tableNumber": table_number}):
+        raise ServiceError("Такой стол уже есть")
+    return database.table_collection.insert_one({
+        "tableNumber": table_number,
+        "seats": seats,
+        "isAvailable": True,
+        "status": "free"
+    })
+
+@operation
+def delete_table(table_id):
+    if not database.table_collection.delete_one({"id": table_id}):
+        raise ServiceError("Стол не найден")
+    database.reservation_collection.delete_many({"tableId": table_id})
+
+@operation
+def toggle_table_availability(table_id):
+    table = database.table_collection.find_one({"id": table_id})
+    if not table:
+        raise ServiceError("Стол не найден")
+    return database.table_collection.update_one(
+        {"id": table_id}, {"$set": {"isAvailable": not table.get("isAvailable", True)}}
+    )
+
+@operation
+def book_table(name, phone, table_id, reservation_date, start_time, end_time):
+    name, phone = name.strip(), phone.strip()
+    if not name or not phone or not table_id:
+        raise ServiceError("Заполните все поля")
+    try:
+        res_date = datetime.strptime(reservation_date, "%Y-%m-%d").date()
+        start = datetime.strptime(start_time, "%H:%M").time()
+        end = datetime.strptime(end_time, "%H:%M").time()
+    except ValueError:
+        raise ServiceError("Неверная дата или время бронирования")
+
+    now = datetime.now()
+    if res_date < now.date():
+        raise ServiceError("Нельзя бронировать на прошедшую дату")
+    if res_date == now.date() and start <= now.time():
+        raise ServiceError("Время бронирования должно быть позже текущего")
+    if start >= end:
+        raise ServiceError("Время начала должно быть меньше конца")
+    if (datetime.combine(res_date, end) - datetime.combine(res_date, start)).total_seconds() < 3600:
+        raise ServiceError("Минимальное время бронирования — 1 час")
+    if start < time(8, 0) or end > time(22, 0):
+        raise ServiceError("Бронирование возможно только с 8:00 до 22:00")
+
+    overlapping = database.reservation_collection.find_one({
+        "tableId": table_id,
+        "reservationDate": reservation_date,
+        "$or": [
+            {"startTime": {"$lt": end_time}, "endTime": {"$gt": start_time}}
+        ],
+        "status": {"$ne": "cancelled"}
+    })
+    if overlapping:
+        raise ServiceError("Стол в это время уже забронирован")
+
+    return database.reservation_collection.insert_one({
+        "tableId": table_id,
+        "customerId": find_or_create_customer(name, phone),
+        "reservationDate": reservation_date,
+        "startTime": start_time,
+        "endTime": end_time,
+        "status": "confirmed"
+    })
+
+@operation
+def update_reservation(reservation_id, name, phone, table_id, reservation_date, start_time, end_time):
+    name, phone = name.strip(), phone.strip()
+    if not name or not phone or not table_id:
+        raise ServiceError("Заполните все поля")
+    if start_time >= end_time:
+        raise ServiceError("Время начала должно быть меньше конца")
+    overlapping = database.reservation_collection.find_one({
+        "tableId": table_id,
+        "reservationDate": reservation_date,
+        "$or": [
+            {"startTime": {"$lt": end_time}, "endTime": {"$gt": start_time}}
+        ],
+        "status": {"$ne": "cancelled"},
+        "id": {"$ne": reservation_id}
+    })
+    if overlapping:
+        raise ServiceError("Стол в это время уже забронирован")
+
+    # При правке бронирования имя клиента с этим телефоном обновляется
+    customer = database.customer_collection.find_one({"phone": phone})
+    if customer:
+        database.customer_collection.update_one({"id": customer["id"]}, {"$set": {"name": name}})
+        customer_id = customer["id"]
+    else:
+        customer_id = database.customer_collection.insert_one({"name": name, "phone": phone})["id"]
+
+    reservation = database.reservation_collection.update_one(
+        {"id": reservation_id},
+        {"$set": {
+            "tableId": table_id,
+            "customerId": customer_id,
+            "reservationDate": reservation_date,
+            "startTime": start_time,
+            "endTime": end_time,
+            "status": "confirmed"
+        }}
+    )
+    if not reservation:
+        raise ServiceError("Бронирование не найдено")
+    return reservation
+
+@operation
+def cancel_reservation(reservation_id):
+    reservation = database.reservation_collection.update_one({"id": reservation_id}, {"$set": {"status": "cancelled"}})
+    if not reservation:
+        raise ServiceError("Бронирование не найдено")
+    return reservation
+
+@operation
+def delete_reservation(reservation_id):
+    if not database.reservation_collection.delete_one({"id": reservation_id}):
+        raise ServiceError("Бронирование не найдено")
+
+@operation
+def submit_order(name, phone, table_id, dishes, waiter_login):
+    # dishes — [{"name", "price", "quantity"}]
+    name, phone = name.strip(), phone.strip()
+    if not name or not phone or not table_id:
+        raise ServiceError("Заполните все поля")
+    if not dishes:
+        raise ServiceError("Добавьте хотя бы одно блюдо")
+
+    customer_id = find_or_create_customer(name, phone)
+    total, item_count = dishes_summary(dishes)
+    return database.order_collection.insert_one({
+        "customerId": customer_id,
+        "tableId": table_id,
+        "orderDate": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "dishes": dishes,
+        "total": total,
+        "itemCount": item_count,
+        "status": "new",
+        "waiterLogin": waiter_login
+    })
+
+@operation
+def update_order(order_id, name, phone, table_id, dishes):
+    order = database.order_collection.find_one({"id": order_id})
+    if not order:
+        raise ServiceError("Заказ не найден")
+    if order.get("status") in ("cancelled", "paid"):
+        raise ServiceError("Нельзя редактировать отменённый или оплаченный заказ")
+    # by_order знает и об общих счетах, где заказ указан в orderIds
+    if receipt_view.by_order.get(order_id):
+        raise ServiceError("Нельзя редактировать заказ, по которому уже выдан счет")
+    name, phone = name.strip(), phone.strip()
+    if not name or not phone or not table_id:
+        raise ServiceError("Заполните все поля")
+    if not dishes:
+        raise ServiceError("Добавьте хотя бы одно блюдо")
+
+    total, item_count = dishes_summary(dishes)
+    return database.order_collection.update_one(
+        {"id": order_id},
+        {"$set": {
+            "customerId": find_or_create_customer(name, phone),
+            "tableId": table_id,
+            "dishes": dishes,
+            "total": total,
+            "itemCount": item_count
+        }}
+    )
+
+@operation
+def delete_order(order_id):
+    if not database.order_collection.find_one({"id": order_id}):
+        raise ServiceError("Заказ не найден")
+    database.receipt_collection.delete_many({"orderId": order_id})
+    database.order_collection.delete_one({"id": order_id})
+
+@operation
+def change_order_status(order_id, status):
+    if status not in ORDER_STATUSES:
+        raise ServiceError(f"Неизвестный статус: {status}")
+    order = database.order_collection.update_one({"id": order_id}, {"$set": status_change(status)})
+    if not order:
+        raise ServiceError("Заказ не найден")
+    return order
+
+@operation
+def create_receipt(order_id):
+    order = database.order_collection.find_one({"id": order_id})
+    if not order:
+        raise ServiceError("Заказ не найден")
+    if database.receipt_collection.find_one({"orderId": order_id}):
+        raise ServiceError("Счет на этот заказ уже выдан")
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    receipt = database.receipt_collection.insert_one({
+        "orderId": order["id"],
+        "date": now,
+        "amount": order_total(order),
+        "paid": False,
+        "waiterLogin": order.get("waiterLogin", "")
+    })
+    database.order_collection.update_one({"id": order["id"]}, {"$set": {"billedAt": now}})
+    return receipt
+
+@operation
+def create_combined_receipt(customer_id):
+    # Общий счет на все неоплаченные заказы клиента из customer_ledger
+    order_ids, amount = customer_ledger.open_orders(customer_id)
+    if not order_ids:
+        raise ServiceError("Нет неоплаченных заказов для этого клиента")
+    for existing_id in receipt_view.by_order.get(order_ids[0], ()):
+        if receipt_view.rows[existing_id]["orderIds"] == order_ids:
+            raise ServiceError("Общий счет уже создан")
+
+    first_order = database.order_collection.find_one({"id": order_ids[0]})
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    receipt = database.receipt_collection.insert_one({
+        "orderIds": ",".join(order_ids),
+        "date": now,
+        "amount": amount,
+        "paid": False,
+        "waiterLogin": first_order.get("waiterLogin", "") if first_order else "",
+        "customerId": customer_id
+    })
+    database.order_collection.update_many({"id": {"$in": order_ids}}, {"$set": {"billedAt": now}})
+    return receipt
+
+@operation
+def pay_receipt(receipt_id, closed_by):
+    receipt = database.receipt_collection.find_one({"id": receipt_id})
+    if not receipt:
+        raise ServiceError("Счет не найден")
+    if receipt.get("paid", False):
+        raise ServiceError("Счет уже оплачен")
+
+    receipt = database.receipt_collection.update_one(
+        {"id": receipt_id},
+        {"$set": {"paid": True, "paymentDate": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "closedBy": closed_by}}
+    )
+    # orderIds общего счета хранятся строкой через запятую
+    database.order_collection.update_many(
+        {"id": {"$in": receipt_order_ids(receipt)}},
+        {"$set": status_change("paid")}
+    )
+    return receipt
+
+@operation
+def add_menu_item(name, description, price, category, ingredients):
+    name = name.strip()
+    if not name:
+        raise ServiceError("Введите название блюда")
+    return database.menu_collection.insert_one({
+        "name": name,
+        "description": description.strip(),
+        "price": float(price),
+        "category": category.strip(),
+        "ingredients": ingredients.strip()
+    })
+
+@operation
+def update_menu_item(item_id, name, description, price, category, ingredients):
+    name = name.strip()
+    if not name:
+        raise ServiceError("Введите название блюда")
+    item = database.menu_collection.update_one(
+        {"id": item_id},
+        {"$set": {
+            "name": name,
+            "description": description.strip(),
+            "price": float(price),
+            "category": category.strip(),
+            "ingredients": ingredients.strip()
+        }}
+    )
+    if not item:
+        raise ServiceError("Блюдо не найдено")
+    return item
+
+@operation
+def delete_menu_item(item_id):
+    if not database.menu_collection.delete_one({"id": item_id}):
+        raise ServiceError("Блюдо не найдено")
+
+@operation
+def import_records(records, partial=False):
+    # records — {вид: [[номер строки, запись], ...]} в порядке KINDS. Проверка и запись
+    # идут там, где лежат файлы; без partial при любой ошибке не пишется ничего
+    importer = BulkImporter()
+    for kind in KINDS:
+        if kind in records:
+            importer.add(kind, records[kind])
+    errors = [list(error) for error in importer.errors]
+    if errors and not partial:
+        return {"counts": None, "errors": errors}
+    return {"counts": importer.commit(), "errors": errors}
+
+@operation
+def waiter_report():
+    return waiter_stats.list()
+
+@operation
+def service_time_report(by="hour", start=None, end=None):
+    return service_times.percentiles(by, start, end)
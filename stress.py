@@ -0,0 +1,261 @@
+import argparse
+import itertools
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from database import Param, TextFileDatabase
+
+FILENAME = "stress.txt"
+# Пара коллекций для встречных записей, как заказы и счета у read-model
+CROSS_FILENAMES = ("left.txt", "right.txt")
+# Сколько значений у поля группы: по нему есть индекс и идёт aggregate
+GROUPS = 10
+# Сколько ждать потоки после остановки, прежде чем считать их зависшими
+JOIN_TIMEOUT = 10
+
+class Stress:
+    # Писатели меняют строки так, что у каждой строки поля a и b всегда равны,
+    # число строк с kind="row" постоянно, а строки kind="temp" вставляются и
+    # удаляются. Читатели проверяют, что ни один ответ не видит строку или
+    # индекс посреди записи
+    def __init__(self, collection, rows, seed):
+        self.collection = collection
+        self.rows = rows
+        self.seed = seed
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.ops = Counter()
+        self.violations = []
+        self.by_group = collection.prepare({"kind": "row", "group": Param("group")})
+
+    def violation(self, text):
+        with self.lock:
+            if len(self.violations) < 20:
+                self.violations.append(text)
+            self.ops["violations"] += 1
+
+    def count(self, counter):
+        with self.lock:
+            self.ops.update(counter)
+
+    def writer(self, number):
+        rng = random.Random(self.seed * 1000 + number)
+        counter = Counter()
+        while not self.stop.is_set():
+            value = rng.randrange(1000000)
+            choice = rng.random()
+            if choice < 0.4:
+                self.collection.update_one({"id": str(rng.randint(1, self.rows))},
+                                           {"$set": {"a": value, "b": value, "group": str(rng.randrange(GROUPS))}})
+                counter["update_one"] += 1
+            elif choice < 0.6:
+                self.collection.update_many({"kind": "row", "group": str(rng.randrange(GROUPS))},
+                                            {"$set": {"a": value, "b": value}})
+                counter["update_many"] += 1
+            elif choice < 0.8:
+                self.collection.insert_one({"kind": "temp", "group": "temp", "a": value, "b": value, "writer": number})
+                counter["insert_one"] += 1
+            else:
+                self.collection.delete_many({"kind": "temp", "writer": number})
+                counter["delete_many"] += 1
+        self.count(counter)
+
+    def check_rows(self, rows, source):
+        for row in rows:
+            if row.get("a") != row.get("b"):
+                self.violation(f"{source}: у строки {row.get('id')} a={row.get('a')} b={row.get('b')}")
+                return
+
+    def reader(self, number):
+        rng = random.Random(self.seed * 1000 + 500 + number)
+        counter = Counter()
+        while not self.stop.is_set():
+            choice = rng.randrange(5)
+            if choice == 0:
+                rows = self.collection.find()
+                self.check_rows(rows, "find()")
+                bench = sum(1 for row in rows if row.get("kind") == "row")
+                if bench != self.rows:
+                    self.violation(f"find(): строк kind=row {bench} вместо {self.rows}")
+                ids = [row["id"] for row in rows]
+                if len(ids) != len(set(ids)):
+                    self.violation("find(): одна строка попала в снимок дважды")
+            elif choice == 1:
+                group = str(rng.randrange(GROUPS))
+                rows = self.collection.find({"group": group})
+                self.check_rows(rows, "find(group)")
+                if any(row["group"] != group for row in rows):
+                    self.violation(f"find(group={group}): индекс вернул строку другой группы")
+            elif choice == 2:
+                groups = self.collection.aggregate([
+                    {"$match": {"kind": "row"}},
+                    {"$group": {"_id": "$group"}}
+                ])
+                total = sum(group["count"] for group in groups)
+                if total != self.rows:
+                    self.violation(f"aggregate: в группах {total} строк вместо {self.rows}")
+            elif choice == 3:
+                found = self.by_group.execute_many("group", [str(group) for group in range(GROUPS)])
+                total = sum(len(rows) for rows in found.values())
+                for group, rows in found.items():
+                    self.check_rows(rows, "execute_many")
+                    if any(row["group"] != group for row in rows):
+                        self.violation(f"execute_many: строка другой группы у {group}")
+                if total != self.rows:
+                    self.violation(f"execute_many: найдено {total} строк вместо {self.rows}")
+            else:
+                row = self.collection.find_one({"id": str(rng.randint(1, self.rows))})
+                if row is None:
+                    self.violation("find_one: строка пропала")
+                else:
+                    self.check_rows([row], "find_one")
+                    # Прочитанная строка — снимок: позже её не перепишут на месте
+                    a = row["a"]
+                    time.sleep(0)
+                    if row["a"] != a or row["b"] != a:
+                        self.violation(f"find_one: строка {row['id']} изменилась после чтения")
+            counter["read"] += 1
+        self.count(counter)
+
+    def run(self, seconds, readers, writers):
+        threads = [threading.Thread(target=self.writer, args=(number,), daemon=True) for number in range(writers)]
+        threads += [threading.Thread(target=self.reader, args=(number,), daemon=True) for number in range(readers)]
+        run_threads(self, threads, seconds)
+
+class CrossStress(Stress):
+    # Две коллекции, у каждой подписчик читает другую, а подписчик левой ещё и
+    # пишет в правую — как read-model заказов и счетов. Писатели меняют обе
+    # вперемешку. Проверяем, что никто не завис и что каждая коллекция рассылает
+    # изменения по порядку: old в событии — это new предыдущего события той же строки
+    def __init__(self, left, right, rows, seed):
+        super().__init__(left, rows, seed)
+        self.pair = (left, right)
+        self.versions = itertools.count(1)
+        self.seen = {}
+        left.subscribe(self.listener(0))
+        right.subscribe(self.listener(1))
+
+    def listener(self, side):
+        collection, other = self.pair[side], self.pair[1 - side]
+
+        def on_change(op, old, new):
+            if op != "update":
+                return
+            key = (side, new["id"])
+            with self.lock:
+                previous = self.seen.get(key, 0)
+                self.seen[key] = new["v"]
+            if old["v"] != previous:
+                self.violation(f"{collection.filename}: строка {new['id']} v={old['v']} -> {new['v']}, "
+                               f"а до этого разослано v={previous}")
+            if other.find_one({"id": new["id"]}) is None or other.count() != self.rows:
+                self.violation(f"{other.filename}: подписчик не нашёл строку {new['id']}")
+            if side == 0 and new["v"] % 3 == 0:
+                other.update_one({"id": new["id"]}, {"$set": {"v": next(self.versions)}})
+        return on_change
+
+    def writer(self, number):
+        rng = random.Random(self.seed * 1000 + number)
+        counter = Counter()
+        while not self.stop.is_set():
+            side = rng.randrange(2)
+            self.pair[side].update_one({"id": str(rng.randint(1, self.rows))}, {"$set": {"v": next(self.versions)}})
+            counter["update_left" if side == 0 else "update_right"] += 1
+        self.count(counter)
+
+    def reader(self, number):
+        rng = random.Random(self.seed * 1000 + 500 + number)
+        counter = Counter()
+        while not self.stop.is_set():
+            for collection in self.pair:
+                if len(collection.find({"v": {"$gte": 0}})) != self.rows:
+                    self.violation(f"{collection.filename}: find() вернул не все строки")
+            counter["read"] += 1
+        self.count(counter)
+
+def run_threads(stress, threads, seconds):
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stress.stop.set()
+    deadline = time.monotonic() + JOIN_TIMEOUT
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    stuck = sum(thread.is_alive() for thread in threads)
+    if stuck:
+        stress.violation(f"{stuck} потоков не завершились за {JOIN_TIMEOUT} с — взаимная блокировка")
+
+def single(workdir, args):
+    collection = TextFileDatabase(FILENAME, data_dir=workdir)
+    collection.create_index("group")
+    collection.create_index("kind")
+    collection.insert_many([
+        {"id": str(number), "kind": "row", "group": str(number % GROUPS), "a": 0, "b": 0}
+        for number in range(1, args.rows + 1)
+    ])
+    return Stress(collection, args.rows, args.seed), ("read", "update_one", "update_many", "insert_one", "delete_many")
+
+def cross(workdir, args):
+    pair = []
+    for filename in CROSS_FILENAMES:
+        collection = TextFileDatabase(filename, data_dir=workdir)
+        collection.insert_many([{"id": str(number), "v": 0} for number in range(1, args.rows + 1)])
+        pair.append(collection)
+    return CrossStress(*pair, args.rows, args.seed), ("read", "update_left", "update_right")
+
+def report(title, stress, names, elapsed, args):
+    ops = stress.ops
+    print(f"{title}: {elapsed:.1f} с, читателей {args.readers}, писателей {args.writers}, строк {args.rows}")
+    for name in names:
+        print(f"  {name:<12} {ops[name]:>9}  {ops[name] / elapsed:>9.0f}/с")
+    if ops["violations"]:
+        print(f"Нарушений: {ops['violations']}")
+        for text in stress.violations:
+            print(f"  {text}")
+        return False
+    print("Нарушений нет")
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Параллельные чтения и записи коллекций: "
+                                                 "читатели не должны видеть недописанных строк и индексов, "
+                                                 "а встречные записи двух коллекций с подписчиками — зависать")
+    parser.add_argument("--seconds", type=float, default=10,
+                        help="сколько секунд гонять каждый сценарий (по умолчанию %(default)s)")
+    parser.add_argument("--readers", type=int, default=4, help="потоков чтения (по умолчанию %(default)s)")
+    parser.add_argument("--writers", type=int, default=2, help="потоков записи (по умолчанию %(default)s)")
+    parser.add_argument("--rows", type=int, default=2000, help="строк в коллекции (по умолчанию %(default)s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenario", choices=("single", "cross", "all"), default="all",
+                        help="одна коллекция, встречные записи двух коллекций или оба по очереди")
+    args = parser.parse_args(argv)
+
+    scenarios = [("single", single), ("cross", cross)]
+    ok = True
+    for title, build in scenarios:
+        if args.scenario not in (title, "all"):
+            continue
+        workdir = tempfile.mkdtemp(prefix="restaurant_stress_")
+        flush_pool = ThreadPoolExecutor(1)
+        # Запись файла — в фоне, как в окне и на сервере
+        TextFileDatabase.flush_executor = flush_pool.submit
+        try:
+            stress, names = build(workdir, args)
+            started = time.perf_counter()
+            stress.run(args.seconds, args.readers, args.writers)
+            elapsed = time.perf_counter() - started
+            flush_pool.shutdown(wait=not stress.ops["violations"])
+        finally:
+            TextFileDatabase.flush_executor = None
+            shutil.rmtree(workdir, ignore_errors=True)
+        ok = report(title, stress, names, elapsed, args) and ok
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+# read_models и services при импорте открывают коллекции каталога данных:
+# тесты не должны трогать restaurant_data и ходить на сервер
+database.DATA_DIR = tempfile.mkdtemp(prefix="restaurant_tests_")
+database.SERVER_URL = None
+database.PROFILE = None
+
+import pytest
+
+from database import TextFileDatabase
+
+@pytest.fixture
+def make_collection(tmp_path):
+    def make(filename, rows=(), indexes=()):
+        collection = TextFileDatabase(filename, data_dir=str(tmp_path))
+        for field, ordered in indexes:
+            collection.create_index(field, ordered=ordered)
+        if rows:
+            collection.insert_many([dict(row) for row in rows])
+        return collection
+    return make
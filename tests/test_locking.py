@@ -0,0 +1,127 @@
+import threading
+import time
+
+from database import RWLock
+
+def run_threads(targets, timeout=20):
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=guarded, args=(target,), daemon=True) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout)
+    # Поток, не закончившийся за timeout, — зависание на блокировках
+    assert not any(thread.is_alive() for thread in threads), "потоки зависли"
+    assert not errors, errors
+
+def test_listener_runs_after_write_lock_is_released(make_collection):
+    orders = make_collection("orders.txt")
+    seen = []
+
+    def listener(op, old, new):
+        seen.append((op, orders.lock.writer))
+        # Запись той же коллекции из другого потока не ждёт снятия блокировки подписчиком
+        if op == "insert" and new.get("source") == "main":
+            run_threads([lambda: orders.insert_one({"source": "listener"})])
+
+    orders.subscribe(listener)
+    orders.insert_one({"source": "main"})
+    assert [op for op, _ in seen] == ["insert", "insert"]
+    assert all(writer is None for _, writer in seen)
+    assert orders.count({"source": "listener"}) == 1
+
+def test_events_of_one_row_arrive_in_order(make_collection):
+    orders = make_collection("orders.txt", [{"n": 0}])
+    seen = []
+    orders.subscribe(lambda op, old, new: op == "update" and seen.append((old["n"], new["n"])))
+
+    def bump():
+        for _ in range(200):
+            row = orders.find_one({"id": "1"})
+            orders.update_one({"id": "1"}, {"$set": {"n": row["n"] + 1}})
+
+    # find_one и update_one не атомарны вместе, поэтому значения могут повторяться,
+    # но каждое событие продолжает предыдущее
+    run_threads([bump, bump, bump])
+    assert len(seen) == 600
+    assert all(previous[1] == current[0] for previous, current in zip(seen, seen[1:]))
+    assert seen[-1][1] == orders.find_one({"id": "1"})["n"]
+
+def test_cross_collection_listeners_do_not_deadlock(make_collection):
+    orders = make_collection("orders.txt")
+    receipts = make_collection("receipts.txt")
+    # Подписчик каждой коллекции пишет в другую — раньше встречные записи зависали
+    orders.subscribe(lambda op, old, new: op == "insert" and new.get("echo") is None
+                     and receipts.insert_one({"echo": new["id"]}))
+    receipts.subscribe(lambda op, old, new: op == "insert" and new.get("echo") is None
+                       and orders.insert_one({"echo": new["id"]}))
+
+    def write(collection):
+        return lambda: [collection.insert_one({"n": n}) for n in range(100)]
+
+    run_threads([write(orders), write(receipts), write(orders), write(receipts)])
+    assert orders.count({"echo": {"$exists": False}}) == 200
+    assert orders.count({"echo": {"$exists": True}}) == 200
+    assert receipts.count({"echo": {"$exists": True}}) == 200
+
+def test_reads_inside_write_do_not_wait():
+    lock = RWLock()
+    lock.acquire_write()
+    lock.acquire_read()
+    lock.acquire_read()
+    lock.release_read()
+    lock.release_read()
+    lock.acquire_write()
+    lock.release_write()
+    lock.release_write()
+    assert lock.writer is None and lock.readers == 0
+
+def test_readers_share_the_lock_and_writer_waits_for_them():
+    lock = RWLock()
+    inside = threading.Barrier(3, timeout=5)
+    events = []
+
+    def reader():
+        lock.acquire_read()
+        try:
+            # Все три читателя одновременно внутри — иначе барьер не пройдёт
+            inside.wait()
+            time.sleep(0.05)
+            events.append("read")
+        finally:
+            lock.release_read()
+
+    def writer():
+        time.sleep(0.02)
+        lock.acquire_write()
+        events.append("write")
+        lock.release_write()
+
+    run_threads([reader, reader, reader, writer])
+    assert events == ["read", "read", "read", "write"]
+
+def test_snapshot_from_find_survives_concurrent_writes(make_collection):
+    orders = make_collection("orders.txt", [{"status": "new"} for _ in range(200)], [("status", False)])
+    stop = threading.Event()
+
+    def write():
+        for row in orders.find():
+            orders.update_one({"id": row["id"]}, {"$set": {"status": "paid"}})
+        stop.set()
+
+    def read():
+        while not stop.is_set():
+            rows = orders.find({"status": "new"})
+            assert all(row["status"] == "new" for row in rows)
+            snapshot = orders.find()
+            assert len(snapshot) == 200 and len({row["id"] for row in snapshot}) == 200
+
+    run_threads([write, read, read])
+    assert orders.count({"status": "paid"}) == 200
@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from database import Param
+
+STATUSES = ["new", "preparing", "paid", "cancelled"]
+WAITERS = ["w1", "w2", "w3", "w4", "w5"]
+INDEXES = [("status", False), ("waiter", False), ("orderDate", True)]
+
+def random_row(rng):
+    row = {
+        "status": rng.choice(STATUSES),
+        "waiter": rng.choice(WAITERS),
+        "amount": round(rng.uniform(0, 100), 2),
+    }
+    # Несколько строк без даты и много совпадающих дат — проверка порядка и страниц на повторах
+    if rng.random() > 0.05:
+        row["orderDate"] = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.choice(['12:00', '19:30'])}"
+    return row
+
+# Запрос и то же условие, проверенное напрямую по строке
+QUERIES = [
+    ({}, lambda r: True),
+    ({"status": "paid"}, lambda r: r["status"] == "paid"),
+    ({"status": {"$in": ["new", "preparing"]}}, lambda r: r["status"] in ("new", "preparing")),
+    ({"status": {"$ne": "cancelled"}}, lambda r: r["status"] != "cancelled"),
+    ({"status": {"$nin": ["paid", "new"]}}, lambda r: r["status"] not in ("paid", "new")),
+    ({"orderDate": {"$gte": "2026-03-01", "$lt": "2026-06-01"}},
+     lambda r: "orderDate" in r and "2026-03-01" <= r["orderDate"] < "2026-06-01"),
+    ({"waiter": "w1", "orderDate": {"$gte": "2026-06-01"}},
+     lambda r: r["waiter"] == "w1" and r.get("orderDate", "") >= "2026-06-01"),
+    ({"status": "paid", "waiter": {"$in": ["w1", "w2"]}},
+     lambda r: r["status"] == "paid" and r["waiter"] in ("w1", "w2")),
+    ({"amount": {"$gt": 50}}, lambda r: r["amount"] > 50),
+    ({"orderDate": {"$exists": False}}, lambda r: "orderDate" not in r),
+    ({"$or": [{"status": "new"}, {"waiter": "w3"}]}, lambda r: r["status"] == "new" or r["waiter"] == "w3"),
+]
+
+def reference_key(field):
+    # Строки без поля — меньше любых значений, как sort_key(None)
+    return lambda row: (field in row, row.get(field))
+
+def ids(rows):
+    return sorted(row["id"] for row in rows)
+
+@pytest.fixture
+def orders(make_collection):
+    rng = random.Random(7)
+    collection = make_collection("orders.txt", [random_row(rng) for _ in range(600)], INDEXES)
+    # Обновления переставляют строки в корзинах индекса относительно порядка data
+    for _ in range(150):
+        row = rng.choice(collection.find())
+        collection.update_one({"id": row["id"]}, {"$set": random_row(rng)})
+    return collection
+
+@pytest.mark.parametrize("query, predicate", QUERIES)
+def test_find_matches_brute_force(orders, query, predicate):
+    expected = [row for row in orders.find() if predicate(row)]
+    assert ids(orders.find(query)) == ids(expected)
+    assert orders.count(query) == len(expected)
+    found = orders.find_one(query)
+    assert (found is None) == (not expected)
+    if found is not None:
+        assert predicate(found)
+
+@pytest.mark.parametrize("query, predicate", QUERIES)
+@pytest.mark.parametrize("field, direction", [("orderDate", -1), ("orderDate", 1), ("amount", -1)])
+def test_sorted_pages_match_brute_force(orders, query, predicate, field, direction):
+    expected = sorted((row for row in orders.find() if predicate(row)),
+                      key=reference_key(field), reverse=direction == -1)
+    for skip, limit in [(0, 1), (0, 10), (5, 10), (len(expected) - 3, 10), (len(expected) + 5, 10)]:
+        skip = max(skip, 0)
+        page = orders.find(query, sort={field: direction}, skip=skip, limit=limit)
+        assert [reference_key(field)(row) for row in page] == \
+               [reference_key(field)(row) for row in expected[skip:skip + limit]]
+        assert all(predicate(row) for row in page)
+
+@pytest.mark.parametrize("query, predicate", QUERIES)
+def test_paging_through_results_returns_every_row_once(orders, query, predicate):
+    # Равные даты идут по id, иначе страницы из обхода индекса и из кучи пересекаются
+    expected = sorted((row for row in orders.find() if predicate(row)),
+                      key=lambda row: (reference_key("orderDate")(row), int(row["id"])), reverse=True)
+    pages = []
+    for skip in range(0, len(expected) + 25, 25):
+        pages += orders.find(query, sort={"orderDate": -1}, skip=skip, limit=25)
+    assert [row["id"] for row in pages] == [row["id"] for row in expected]
+    assert [row["id"] for row in orders.find(query, sort={"orderDate": -1})] == [row["id"] for row in expected]
+
+@pytest.mark.parametrize("query, predicate", QUERIES)
+def test_explain_agrees_with_find(orders, query, predicate):
+    plan = orders.explain(query, sort={"orderDate": -1}, skip=3, limit=20)
+    page = orders.find(query, sort={"orderDate": -1}, skip=3, limit=20)
+    total = len([row for row in orders.find() if predicate(row)])
+    # Обход упорядоченного индекса останавливается, набрав skip + limit строк
+    assert plan["matched"] == (min(total, 23) if plan["plan"] == "ordered" else total)
+    assert plan["examined"] >= plan["matched"]
+    assert plan["returned"] == len(page)
+
+def test_prepared_execute_matches_brute_force(orders):
+    prepared = orders.prepare({"waiter": Param("waiter"), "status": {"$ne": "cancelled"},
+                               "orderDate": {"$gte": Param("since")}})
+    for waiter in WAITERS + ["nobody"]:
+        for since in ["2026-01-01", "2026-07-15", "2027-01-01"]:
+            expected = [row for row in orders.find() if row["waiter"] == waiter and row["status"] != "cancelled"
+                        and row.get("orderDate", "") >= since and "orderDate" in row]
+            assert ids(prepared.execute(waiter=waiter, since=since)) == ids(expected)
+
+def test_prepared_execute_many_matches_brute_force(orders):
+    prepared = orders.prepare({"waiter": Param("waiter"), "status": Param("status")})
+    values = WAITERS + ["nobody"]
+    for status in STATUSES:
+        found = prepared.execute_many("waiter", values, status=status)
+        assert set(found) == set(values)
+        for waiter in values:
+            expected = [row for row in orders.find() if row["waiter"] == waiter and row["status"] == status]
+            assert ids(found[waiter]) == ids(expected)
+
+def test_prepared_query_sees_rows_added_after_prepare(orders):
+    prepared = orders.prepare({"waiter": Param("waiter"), "status": "paid"})
+    before = len(prepared.execute(waiter="w9"))
+    orders.insert_many([{"waiter": "w9", "status": "paid", "amount": 1.0} for _ in range(50)])
+    assert len(prepared.execute(waiter="w9")) == before + 50
+    assert len(prepared.execute_many("waiter", ["w9"])["w9"]) == before + 50
@@ -0,0 +1,223 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import ORDER_STATUSES, status_change
+from read_models import (
+    OrderReadModel, ReceiptReadModel, CustomerLedger, WaiterStats, OrderLineIndex,
+    KitchenQueue, ServiceTimes
+)
+
+WAITERS = ["anna", "boris", "vera"]
+START = datetime(2026, 3, 1, 9, 0)
+
+def timestamp(rng):
+    return (START + timedelta(minutes=rng.randint(0, 60 * 24 * 20))).strftime("%Y-%m-%d %H:%M:%S")
+
+def later(value, rng):
+    when = datetime.strptime(value, "%Y-%m-%d %H:%M:%S") + timedelta(seconds=rng.randint(30, 5000))
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+class Restaurant:
+    # Временные коллекции и модели, подписанные на них, как в read_models
+    def __init__(self, make_collection):
+        self.customers = make_collection("customers.txt")
+        self.tables = make_collection("tables.txt")
+        self.menu = make_collection("menu.txt")
+        self.orders = make_collection("orders.txt", indexes=[("status", False), ("orderDate", True)])
+        self.receipts = make_collection("receipts.txt", indexes=[("paid", False)])
+        self.stats = make_collection("waiter_stats.txt", indexes=[("waiter", False)])
+        self.models = self.build()
+        self.waiter_stats = WaiterStats(self.receipts, self.stats)
+        self.names = 0
+
+    def build(self):
+        return {
+            "orders": OrderReadModel(self.orders, self.customers, self.tables),
+            "receipts": ReceiptReadModel(self.receipts, self.orders, self.customers),
+            "ledger": CustomerLedger(self.orders),
+            "lines": OrderLineIndex(self.orders, self.menu),
+            "kitchen": KitchenQueue(self.orders),
+            "service": ServiceTimes(self.orders, self.receipts),
+        }
+
+    def pick(self, collection, rng):
+        rows = collection.find()
+        return rng.choice(rows) if rows else None
+
+    def new_name(self):
+        # Названия блюд не повторяются: меню сопоставляет блюдо заказа по названию
+        self.names += 1
+        return f"Блюдо {self.names}"
+
+    def dishes(self, rng):
+        menu = self.menu.find()
+        if not menu:
+            return []
+        return [{"name": item["name"], "quantity": rng.randint(1, 3), "price": item["price"]}
+                for item in rng.sample(menu, min(len(menu), rng.randint(1, 3)))]
+
+    def step(self, rng):
+        action = rng.choice([
+            "customer", "customer", "rename_customer", "delete_customer", "table", "renumber_table",
+            "delete_table", "menu", "menu", "rename_menu", "delete_menu", "order", "order", "order",
+            "edit_order", "advance_order", "cancel_order", "delete_order", "receipt", "combined_receipt",
+            "pay_receipt", "delete_receipt",
+        ])
+        customer = self.pick(self.customers, rng)
+        table = self.pick(self.tables, rng)
+        order = self.pick(self.orders, rng)
+        receipt = self.pick(self.receipts, rng)
+        if action == "customer":
+            self.customers.insert_one({"name": f"Клиент {rng.randint(1, 999)}", "phone": "555"})
+        elif action == "rename_customer" and customer:
+            self.customers.update_one({"id": customer["id"]}, {"$set": {"name": f"Клиент {rng.randint(1, 999)}"}})
+        elif action == "delete_customer" and customer:
+            self.customers.delete_one({"id": customer["id"]})
+        elif action == "table":
+            self.tables.insert_one({"tableNumber": rng.randint(1, 50), "seats": 4, "isAvailable": True})
+        elif action == "renumber_table" and table:
+            self.tables.update_one({"id": table["id"]}, {"$set": {"tableNumber": rng.randint(1, 50)}})
+        elif action == "delete_table" and table:
+            self.tables.delete_one({"id": table["id"]})
+        elif action == "menu":
+            self.menu.insert_one({"name": self.new_name(), "price": float(rng.randint(100, 900))})
+        elif action == "rename_menu":
+            item = self.pick(self.menu, rng)
+            if item:
+                self.menu.update_one({"id": item["id"]}, {"$set": {"name": self.new_name()}})
+        elif action == "delete_menu":
+            item = self.pick(self.menu, rng)
+            if item:
+                self.menu.delete_one({"id": item["id"]})
+        elif action == "order":
+            dishes = self.dishes(rng)
+            self.orders.insert_one({
+                "customerId": customer["id"] if customer else "",
+                "tableId": table["id"] if table else "",
+                "orderDate": timestamp(rng),
+                "dishes": dishes,
+                "total": sum(item["price"] * item["quantity"] for item in dishes),
+                "status": "new",
+                "waiterLogin": rng.choice(WAITERS),
+            })
+        elif action == "edit_order" and order:
+            dishes = self.dishes(rng)
+            self.orders.update_one({"id": order["id"]}, {"$set": {
+                "dishes": dishes,
+                "total": sum(item["price"] * item["quantity"] for item in dishes),
+                "customerId": customer["id"] if customer else order["customerId"],
+            }})
+        elif action == "advance_order" and order and order["status"] in ("new", "preparing", "ready"):
+            status = ORDER_STATUSES[ORDER_STATUSES.index(order["status"]) + 1]
+            when = datetime.strptime(later(order["orderDate"], rng), "%Y-%m-%d %H:%M:%S")
+            self.orders.update_one({"id": order["id"]}, {"$set": status_change(status, when)})
+        elif action == "cancel_order" and order:
+            self.orders.update_one({"id": order["id"]}, {"$set": {"status": "cancelled"}})
+        elif action == "delete_order" and order:
+            self.orders.delete_one({"id": order["id"]})
+        elif action == "receipt" and order:
+            self.receipts.insert_one({
+                "orderId": order["id"], "date": later(order["orderDate"], rng),
+                "amount": order["total"], "paid": False, "waiterLogin": order["waiterLogin"],
+            })
+        elif action == "combined_receipt" and customer:
+            orders = self.orders.find({"customerId": customer["id"]})
+            if orders:
+                self.receipts.insert_one({
+                    "orderIds": ",".join(o["id"] for o in orders), "customerId": customer["id"],
+                    "date": timestamp(rng), "amount": sum(o["total"] for o in orders), "paid": False,
+                    "waiterLogin": rng.choice(WAITERS),
+                })
+        elif action == "pay_receipt" and receipt and not receipt["paid"]:
+            self.receipts.update_one({"id": receipt["id"]}, {"$set": {
+                "paid": True, "closedBy": rng.choice(WAITERS), "paymentDate": later(receipt["date"], rng),
+            }})
+        elif action == "delete_receipt" and receipt:
+            self.receipts.delete_one({"id": receipt["id"]})
+
+def without_empty(index):
+    # Удаление оставляет в обратных индексах пустые множества, rebuild их не создаёт
+    return {key: ids for key, ids in index.items() if ids}
+
+@pytest.fixture
+def restaurant(make_collection):
+    restaurant = Restaurant(make_collection)
+    rng = random.Random(11)
+    for _ in range(800):
+        restaurant.step(rng)
+    # Перечитывание файла посреди работы — событие load и полная пересборка моделей
+    restaurant.orders.load()
+    for _ in range(400):
+        restaurant.step(rng)
+    return restaurant
+
+def test_order_view_matches_rebuild(restaurant):
+    incremental = restaurant.models["orders"]
+    fresh = restaurant.build()["orders"]
+    assert incremental.rows == fresh.rows
+    assert without_empty(incremental.by_customer) == without_empty(fresh.by_customer)
+    assert without_empty(incremental.by_table) == without_empty(fresh.by_table)
+    for order in restaurant.orders.find():
+        assert incremental.row(order) == OrderReadModel.build(
+            order, restaurant.customers.find_one({"id": order.get("customerId")}),
+            restaurant.tables.find_one({"id": order.get("tableId")}))
+
+def test_receipt_view_matches_rebuild(restaurant):
+    incremental = restaurant.models["receipts"]
+    fresh = restaurant.build()["receipts"]
+    assert incremental.rows == fresh.rows
+    assert without_empty(incremental.by_order) == without_empty(fresh.by_order)
+    assert without_empty(incremental.by_customer) == without_empty(fresh.by_customer)
+
+def test_customer_ledger_matches_rebuild(restaurant):
+    incremental = restaurant.models["ledger"]
+    fresh = restaurant.build()["ledger"]
+    assert incremental.order_customer == fresh.order_customer
+    assert incremental.accounts.keys() == fresh.accounts.keys()
+    for customer_id, account in fresh.accounts.items():
+        assert incremental.accounts[customer_id]["orders"] == account["orders"]
+        assert incremental.accounts[customer_id]["balance"] == pytest.approx(account["balance"])
+
+def test_order_lines_match_rebuild(restaurant):
+    incremental = restaurant.models["lines"]
+    fresh = restaurant.build()["lines"]
+    assert incremental.menu_ids == fresh.menu_ids
+    assert incremental.lines == fresh.lines
+    assert incremental.timeline == fresh.timeline
+    assert incremental.dish_performance("2026-03-08", "2026-03-15") == \
+           fresh.dish_performance("2026-03-08", "2026-03-15")
+
+def test_kitchen_queue_matches_rebuild(restaurant):
+    incremental = restaurant.models["kitchen"]
+    fresh = restaurant.build()["kitchen"]
+    assert incremental.buckets == fresh.buckets
+    for status in KitchenQueue.STATUSES:
+        assert incremental.tickets(status) == fresh.tickets(status)
+
+def test_service_times_match_rebuild(restaurant):
+    incremental = restaurant.models["service"]
+    fresh = restaurant.build()["service"]
+    assert incremental.histograms == fresh.histograms
+    assert incremental.histograms
+    for by in ("hour", "waiter"):
+        assert incremental.percentiles(by) == fresh.percentiles(by)
+        assert incremental.percentiles(by, "2026-03-05", "2026-03-12") == \
+               fresh.percentiles(by, "2026-03-05", "2026-03-12")
+
+def test_waiter_stats_match_paid_receipts(restaurant):
+    totals = {}
+    for receipt in restaurant.receipts.find():
+        if receipt["paid"]:
+            entry = totals.setdefault(receipt["closedBy"], [0, 0])
+            entry[0] += 1
+            entry[1] += receipt["amount"]
+    rows = restaurant.waiter_stats.list()
+    assert {row["waiter"] for row in rows if row["receiptsClosed"]} == set(totals)
+    for row in rows:
+        count, revenue = totals.get(row["waiter"], (0, 0))
+        assert row["receiptsClosed"] == count
+        assert row["revenue"] == pytest.approx(revenue)
+    assert [row["receiptsClosed"] for row in rows] == sorted((row["receiptsClosed"] for row in rows), reverse=True)
+    assert restaurant.waiter_stats.stored_watermark() == restaurant.waiter_stats.watermark()